@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import Dict, Any, List
 from ..dependencies import get_db, get_current_user
 from ..services.model_manager import ModelManager
+from ..services.model_benchmark import model_benchmark
 from ..models.sql_models import Model, User
 from ..schemas.model import ModelCreate, ModelResponse, ModelUpdate
 
@@ -84,11 +85,15 @@ async def optimize_model(
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
     
-    success = await model_manager.optimize_model(model_id, optimization_config)
+    success = await model_manager.optimize_model(model_id, optimization_config, db)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to optimize model")
     
-    return {"message": "Model optimized successfully"}
+    db.refresh(model)
+    return {
+        "message": "Model optimized successfully",
+        "optimization": (model.configuration or {}).get('optimization')
+    }
 
 @router.post("/models/{model_id}/load")
 async def load_model(
@@ -120,3 +125,52 @@ async def unload_model(
     
     await model_manager.unload_model(model_id)
     return {"message": "Model unloaded successfully"}
+
+@router.post("/models/{model_id}/benchmark")
+async def benchmark_model(
+    model_id: str,
+    sweep: Dict[str, Any] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Benchmark a model on CPU across batch sizes, resolutions and thread counts."""
+    model = db.query(Model).filter(Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    try:
+        return await model_benchmark.benchmark_model(model, sweep)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Benchmark failed: {str(e)}")
+
+@router.post("/models/{model_id}/benchmark/thread-layouts")
+async def benchmark_thread_layouts(
+    model_id: str,
+    layouts: List[Dict[str, Any]] = None,
+    duration: float = Query(None, gt=0, le=300),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Compare total CPU throughput of worker/thread layouts for a model."""
+    model = db.query(Model).filter(Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    try:
+        return await model_benchmark.benchmark_thread_layouts(model, layouts, duration)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Benchmark failed: {str(e)}")
+
+@router.get("/models/{model_id}/benchmarks")
+async def get_model_benchmarks(
+    model_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get recorded benchmark results for a model."""
+    model = db.query(Model).filter(Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    return await model_benchmark.get_benchmarks(model_id, limit)
@@ -152,6 +152,27 @@ async def get_camera_status(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/{camera_id}/trends")
+async def get_camera_trends(
+    camera_id: int,
+    start: datetime,
+    end: Optional[datetime] = None,
+    metric: str = "object_count",
+    granularity: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """Bucketed analytics trend for a camera from the rollup collections"""
+    from ....services.rollups import GRANULARITIES, get_query_store
+
+    if granularity is not None and granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown granularity: {granularity}")
+    try:
+        return await get_query_store().query(
+            str(camera_id), metric, start, end or datetime.utcnow(), granularity=granularity
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.websocket("/{camera_id}/ws")
 async def camera_websocket(
     websocket: WebSocket,
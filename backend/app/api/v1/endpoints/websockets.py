@@ -25,8 +25,9 @@ async def websocket_endpoint(websocket: WebSocket, module: str):
                     nparr = np.frombuffer(frame_bytes, np.uint8)
                     frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
                     
-                    # Process frame
-                    results = await video_analytics_service.process_frame(frame, module)
+                    # Process frame; the camera id lets an unchanged scene reuse cached results
+                    camera_id = frame_data.get('camera_id') or f"{module}:{id(websocket):x}"
+                    results = await video_analytics_service.process_frame(frame, module, camera_id=camera_id)
                     
                     # Send results back to client
                     await manager.send_personal_message({
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 from pathlib import Path
 
@@ -22,6 +22,121 @@ class Settings(BaseSettings):
     UPLOAD_DIR: Path = Path("uploads")
     MODEL_DIR: Path = Path("models")
     
+    # Local model artifact store (no network access needed once populated)
+    MODEL_STORE_DIR: Path = Path("models/store")
+    MODEL_STORE_ALLOW_DOWNLOAD: bool = True  # Disable on air-gapped sites; use import_archive
+    YOLOV5_RELEASE: str = "v7.0"
+    
+    # Vision Models (loaded lazily on first use)
+    YOLO_MODEL_PATH: Path = Path("models/yolov5s.pt")
+    PPE_MODEL_PATH: Path = Path("models/ppe_yolov5s.pt")
+    FACE_PROTO_PATH: Path = Path("models/face_detector/deploy.prototxt")
+    FACE_MODEL_PATH: Path = Path("models/face_detector/res10_300x300_ssd_iter_140000.caffemodel")
+    EMOTION_MODEL_PATH: Path = Path("models/emotion_model.h5")
+    MIN_SAFE_DISTANCE: float = 100.0  # Pixels between people before a proximity violation
+    PPE_MIN_CONTAINMENT: float = 0.5  # Fraction of a PPE box inside a person box to credit it
+    PPE_DETECT_ON_CROPS: bool = False  # Run the PPE detector on a mosaic of person crops
+    PPE_CROP_TILE: int = 256  # Mosaic cell size for person crops
+    
+    # Face detection (classroom attention)
+    FACE_DETECTOR_BACKEND: str = "haar"  # "haar" or "dnn"
+    FACE_DETECTION_MAX_SIDE: int = 640  # Frames are downscaled to this longest side first
+    FACE_MIN_SIZE: int = 32  # Smallest face in original frame pixels
+    FACE_DNN_CONFIDENCE: float = 0.5
+    
+    # Pose estimation (unsafe behaviour on person crops)
+    POSE_BACKEND: str = "keypointrcnn"  # "keypointrcnn" or "onnx" (heatmap top-down model)
+    POSE_MODEL_PATH: Path = Path("models/pose_lite.onnx")
+    POSE_CROP_WIDTH: int = 192
+    POSE_CROP_HEIGHT: int = 256
+    POSE_MAX_BATCH: int = 8
+    POSE_CACHE_FRAMES: int = 5  # Reuse a person's pose for this many frames
+    POSE_MIN_CONFIDENCE: float = 0.7
+    
+    # Zone membership masks
+    ZONE_MASK_MAX_SIDE: int = 1024  # Longest side of the rasterized zone mask
+    ZONE_INDEX_CACHE_SIZE: int = 256  # Zone layouts kept rasterized
+    
+    # Scene-change result cache for static cameras
+    SCENE_CACHE_ENABLED: bool = True
+    SCENE_CACHE_TOLERANCE: float = 3.0  # Mean absolute luminance difference of the signature
+    SCENE_CACHE_MAX_AGE: float = 30.0  # Seconds before a cached result is recomputed anyway
+    SCENE_CACHE_SIGNATURE_SIZE: int = 16
+    
+    # CPU thread layout for inference processes
+    INFERENCE_WORKERS: int = 1  # Inference processes sharing this node's cores
+    INFERENCE_WORKER_INDEX: int = 0  # This process's slot, used for the core slice
+    INFERENCE_THREADS: int = 0  # Intra-op threads per process; 0 = cores / workers
+    INFERENCE_INTEROP_THREADS: int = 1
+    OPENCV_THREADS: int = 1  # 0 = same as INFERENCE_THREADS
+    CPU_AFFINITY: bool = False  # Pin each worker to its own slice of cores
+    
+    # Inference worker processes (frames passed through shared memory)
+    INFERENCE_POOL_ENABLED: bool = False
+    INFERENCE_POOL_START_METHOD: str = "spawn"  # "spawn" or "forkserver"
+    INFERENCE_POOL_SLOTS: int = 4  # Frames in flight per worker
+    INFERENCE_MAX_FRAME_BYTES: int = 1920 * 1080 * 3  # Size of one shared frame slot
+    INFERENCE_DRAIN_TIMEOUT: float = 30.0  # Seconds to wait for in-flight frames on restart
+    INFERENCE_REQUEST_TIMEOUT: float = 10.0  # Seconds before a frame fails and its hung worker is recycled
+    
+    # Backpressure and load shedding for camera pipelines
+    CAPTURE_QUEUE_SIZE: int = 30  # Frames buffered between capture and analysis per camera
+    CAPTURE_QUEUE_POLICY: str = "drop_oldest"
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 100  # Messages queued per WebSocket client
+    WEBSOCKET_SEND_POLICY: str = "drop_oldest"  # Slow clients skip to the newest messages
+    BACKPRESSURE_SAMPLE_EVERY: int = 4  # 'sample' policy keeps one item in N ...
+    BACKPRESSURE_SAMPLE_ABOVE: float = 0.5  # ... once a stage is this full
+    LOAD_HIGH_WATERMARK: float = 0.8  # Pressure above which a camera is degraded
+    LOAD_LOW_WATERMARK: float = 0.4  # Pressure below which a camera is restored
+    LOAD_LATENCY_BUDGET_MS: float = 200.0  # Per-frame stage latency counted as full load
+    LOAD_GOVERNOR_INTERVAL: float = 1.0  # Seconds between degrade steps
+    LOAD_RESTORE_COOLDOWN: float = 10.0  # Seconds of low pressure between restore steps
+    MAX_FRAME_AGE: float = 1.0  # Frames older than this are dropped unprocessed
+    
+    # Realtime Kafka ingestion pipeline
+    REALTIME_PROCESSOR_ENABLED: bool = False
+    REALTIME_CONSUMER_PROCESSES: int = 1  # >1 runs that many consumer processes in one group
+    MESSAGE_BUS: str = "kafka"  # "kafka", or "inprocess" for single-node sites without a broker
+    MESSAGE_BUS_QUEUE_SIZE: int = 10000  # Messages per topic held by the in-process bus
+    KAFKA_BOOTSTRAP_SERVERS: str = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+    KAFKA_CONSUMER_GROUP: str = "visioncave-realtime"
+    SOCKETIO_MESSAGE_QUEUE: Optional[str] = None  # e.g. redis://localhost:6379/0; required for consumer processes
+    REALTIME_QUEUE_SIZE: int = 1000  # Bounded queue per stage; a full queue pauses the consumer
+    REALTIME_INGEST_POLICY: str = "block"  # Overflow policy per stage: block, drop_oldest or sample
+    REALTIME_EMIT_POLICY: str = "drop_oldest"  # Live updates favour freshness over completeness
+    REALTIME_PERSIST_POLICY: str = "block"
+    REALTIME_EMIT_WORKERS: int = 2
+    REALTIME_PERSIST_WORKERS: int = 2
+    REALTIME_AGGREGATION_INTERVAL: float = 1.0  # Seconds between checks for windows of quiet cameras
+    REALTIME_WINDOW_SIZE: float = 60.0  # Aggregation window length in seconds of event time
+    REALTIME_WINDOW_SLIDE: float = 0.0  # Sliding step in seconds; 0 = tumbling windows
+    REALTIME_WINDOW_LATENESS: float = 5.0  # Seconds a window stays open for out-of-order events
+    REALTIME_WINDOW_IDLE_TIMEOUT: float = 10.0  # Seconds without events before a camera's windows are closed by the clock
+    REALTIME_SHUTDOWN_TIMEOUT: float = 10.0  # Seconds to drain queued work on shutdown
+    SOCKET_EMIT_MAX_RATE: float = 4.0  # Updates per second per room and event; extra ones coalesce
+    ROLLUP_MINUTE_RETENTION_DAYS: int = 7  # TTL of minute rollup buckets
+    ROLLUP_HOUR_RETENTION_DAYS: int = 90  # TTL of hour rollup buckets; day buckets are kept
+    ROLLUP_MAX_POINTS: int = 1000  # Trend queries pick the finest granularity within this
+    RAW_ANALYTICS_RETENTION_DAYS: int = 3  # TTL of raw detections/analytics documents
+    ANOMALY_METRICS: List[str] = ["object_count", "average_speed"]  # Analytics fields scored per event
+    ANOMALY_Z_THRESHOLD: float = 4.0  # Deviation (in standard deviations) that raises an alert
+    ANOMALY_MIN_SAMPLES: int = 30  # Events an hour-of-week slot needs before it can alert
+    ANOMALY_EWMA_ALPHA: float = 0.02  # Weight of each new event in the drifting baseline
+    ANOMALY_MIN_STD: float = 1.0  # Floor on the baseline deviation, so flat slots do not alert on noise
+    ANOMALY_ALERT_COOLDOWN: float = 60.0  # Seconds of event time between alerts per camera and metric
+    ANOMALY_CHECKPOINT_INTERVAL: float = 60.0  # Seconds between baseline saves to MongoDB
+    MONGO_BATCH_SIZE: int = 500  # Documents per insert_many
+    MONGO_BATCH_MAX_DELAY: float = 0.5  # Seconds a document may wait before a flush
+    MONGO_BATCH_MAX_PENDING: int = 5000  # Buffered documents per collection before writers wait
+    
+    # Model Optimization
+    CALIBRATION_FRAMES_DIR: Path = Path("uploads/calibration")
+    CALIBRATION_SAMPLE_SIZE: int = 64
+    OPTIMIZATION_MIN_AGREEMENT: float = 0.95
+    OPTIMIZATION_VALIDATION_FRACTION: float = 0.25  # Frames held out of calibration to check agreement
+    OPTIMIZATION_BENCHMARK_RUNS: int = 50
+    BENCHMARK_REGRESSION_TOLERANCE: float = 0.1  # Allowed p50 latency increase between versions
+    
     # Camera Settings
     DEFAULT_FRAME_RATE: int = 30
     DEFAULT_RESOLUTION: tuple = (1280, 720)
@@ -0,0 +1,158 @@
+import os
+import sys
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_layout: Optional[Dict[str, Any]] = None
+_layout_lock = threading.Lock()
+_configured_frameworks = set()
+
+# Read by OpenMP/BLAS and TensorFlow when their thread pools are created
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+def available_cores() -> List[int]:
+    """CPU cores this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def thread_layout(workers: Optional[int] = None, worker_index: Optional[int] = None,
+                  threads: Optional[int] = None) -> Dict[str, Any]:
+    """Split the node's cores between inference workers.
+
+    Every worker gets a disjoint, contiguous slice of cores and as many
+    intra-op threads as cores in its slice, so N workers never run more
+    compute threads than there are cores.
+    """
+    workers = max(1, workers or settings.INFERENCE_WORKERS)
+    worker_index = (settings.INFERENCE_WORKER_INDEX if worker_index is None else worker_index) % workers
+    cores = available_cores()
+
+    per_worker = max(1, len(cores) // workers)
+    start = (worker_index * per_worker) % len(cores)
+    worker_cores = cores[start:start + per_worker]
+
+    intra = threads or settings.INFERENCE_THREADS or len(worker_cores)
+    return {
+        'workers': workers,
+        'worker_index': worker_index,
+        'cores': worker_cores,
+        'intra_op_threads': intra,
+        'inter_op_threads': max(1, settings.INFERENCE_INTEROP_THREADS),
+        'opencv_threads': settings.OPENCV_THREADS or intra,
+        'affinity': settings.CPU_AFFINITY
+    }
+
+
+def configure_runtime(workers: Optional[int] = None, worker_index: Optional[int] = None,
+                      threads: Optional[int] = None, affinity: Optional[bool] = None,
+                      force: bool = False) -> Dict[str, Any]:
+    """Apply the thread layout for this process; call once at process start.
+
+    Environment variables are set before any framework creates its pools,
+    OpenCV and CPU affinity are applied immediately, and PyTorch and
+    TensorFlow are configured as soon as they are imported through
+    `import_torch` / `import_tensorflow`.
+    """
+    global _layout
+    with _layout_lock:
+        if _layout is not None and not force:
+            return _layout
+
+        layout = thread_layout(workers, worker_index, threads)
+        if affinity is not None:
+            layout['affinity'] = affinity
+
+        intra = str(layout['intra_op_threads'])
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = intra
+        os.environ['TF_NUM_INTRAOP_THREADS'] = intra
+        os.environ['TF_NUM_INTEROP_THREADS'] = str(layout['inter_op_threads'])
+
+        import cv2
+        cv2.setNumThreads(layout['opencv_threads'])
+
+        if layout['affinity'] and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, layout['cores'])
+            except OSError as e:
+                logger.warning(f"Could not set CPU affinity {layout['cores']}: {str(e)}")
+
+        _layout = layout
+        _configured_frameworks.clear()
+
+    # Frameworks imported before configuration still get the layout
+    if 'torch' in sys.modules:
+        import_torch()
+    if 'tensorflow' in sys.modules:
+        import_tensorflow()
+
+    logger.info(
+        f"Inference runtime: worker {layout['worker_index'] + 1}/{layout['workers']}, "
+        f"{layout['intra_op_threads']} intra-op threads, cores {layout['cores']}"
+    )
+    return layout
+
+
+def get_runtime_layout() -> Dict[str, Any]:
+    """The active layout, configuring defaults if nothing was set yet."""
+    return _layout if _layout is not None else configure_runtime()
+
+
+def import_torch():
+    """Import PyTorch with this process's thread layout applied."""
+    import torch
+    if 'torch' not in _configured_frameworks:
+        layout = get_runtime_layout()
+        torch.set_num_threads(layout['intra_op_threads'])
+        try:
+            torch.set_num_interop_threads(layout['inter_op_threads'])
+        except RuntimeError:
+            # Only allowed before the first parallel op runs
+            pass
+        _configured_frameworks.add('torch')
+    return torch
+
+
+def import_tensorflow():
+    """Import TensorFlow with this process's thread layout applied."""
+    import tensorflow as tf
+    if 'tensorflow' not in _configured_frameworks:
+        layout = get_runtime_layout()
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(layout['intra_op_threads'])
+            tf.config.threading.set_inter_op_parallelism_threads(layout['inter_op_threads'])
+        except RuntimeError:
+            # TensorFlow refuses once its runtime is initialized; env vars still apply
+            pass
+        _configured_frameworks.add('tensorflow')
+    return tf
+
+
+def ort_session_options(threads: Optional[int] = None):
+    """ONNX Runtime session options sized to this process's thread layout."""
+    import onnxruntime as ort
+
+    layout = get_runtime_layout()
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads or layout['intra_op_threads']
+    options.inter_op_num_threads = layout['inter_op_threads']
+    return options
+
+
+@lru_cache(maxsize=None)
+def get_torch_device():
+    """Resolve the torch device on first use.
+
+    PyTorch is imported here rather than at module import so that API
+    workers which never run inference do not pay its startup cost.
+    """
+    torch = import_torch()
+    return torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -63,3 +63,19 @@ class ModelMetadata(BaseModel):
     class Config:
         allow_population_by_field_name = True
         json_encoders = {ObjectId: str}
+
+class BenchmarkResult(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    model_id: str
+    name: str
+    version: str
+    framework: str
+    sweep: Dict[str, Any]
+    results: List[Dict[str, Any]]  # One entry per batch size/resolution/thread configuration
+    summary: Dict[str, float]  # Mirrored into ModelMetadata.performance_metrics
+    regression: Dict[str, Any]
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Config:
+        allow_population_by_field_name = True
+        json_encoders = {ObjectId: str}
@@ -1,24 +1,24 @@
 import numpy as np
 from typing import Dict, Any, List, Optional
 import cv2
-import torch
-import tensorflow as tf
-from sklearn.cluster import DBSCAN
-from scipy.spatial.distance import cdist
-import pandas as pd
 from datetime import datetime, timedelta
 import logging
 from ..core.config import settings
+from ..core.runtime import get_torch_device
+from .zone_index import zone_indexes
 
 logger = logging.getLogger(__name__)
 
 class AdvancedAnalytics:
     def __init__(self):
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.tracking_history = {}
         self.heat_maps = {}
         self.behavior_patterns = {}
         
+    @property
+    def device(self):
+        return get_torch_device()
+
     async def analyze_movement_patterns(
         self, detections: List[Dict[str, Any]], camera_id: int
     ) -> Dict[str, Any]:
@@ -50,6 +50,8 @@ class AdvancedAnalytics:
     ) -> Dict[str, Any]:
         """Detect anomalies in behavior patterns."""
         try:
+            import pandas as pd
+
             # Convert data to time series
             ts_data = pd.DataFrame(historical_data)
             
@@ -113,11 +115,10 @@ class AdvancedAnalytics:
         """Generate occupancy analytics for defined zones."""
         try:
             zone_occupancy = {}
-            for zone in zones:
-                # Count objects in each zone
-                objects_in_zone = self._count_objects_in_zone(
-                    detections, zone['coordinates']
-                )
+            # Count objects in every zone with one lookup against the zone mask
+            counts = self._count_objects_in_zones(detections, zones)
+            for zone, objects_in_zone in zip(zones, counts):
+                objects_in_zone = int(objects_in_zone)
                 
                 # Calculate occupancy percentage
                 occupancy = (objects_in_zone / zone['capacity']) * 100
@@ -180,6 +181,7 @@ class AdvancedAnalytics:
         flattened = np.array([traj.flatten() for traj in normalized_trajectories])
         
         # Perform DBSCAN clustering
+        from sklearn.cluster import DBSCAN
         clustering = DBSCAN(eps=50, min_samples=2).fit(flattened)
         
         clusters = []
@@ -260,6 +262,8 @@ class AdvancedAnalytics:
         self, current_data: Dict[str, Any], historical_data: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Detect temporal anomalies in behavior patterns."""
+        import pandas as pd
+
         anomalies = []
         
         # Group historical data by time of day
@@ -297,6 +301,8 @@ class AdvancedAnalytics:
         self, detections: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Analyze interactions between detected objects."""
+        from scipy.spatial.distance import cdist
+
         interactions = []
         
         # Group detections by timestamp
@@ -378,15 +384,17 @@ class AdvancedAnalytics:
         self, detections: List[Dict[str, Any]], zone_coords: List[List[int]]
     ) -> int:
         """Count objects within a defined zone."""
-        count = 0
-        zone_polygon = np.array(zone_coords)
-        
-        for detection in detections:
-            point = np.array([detection['x'], detection['y']])
-            if cv2.pointPolygonTest(zone_polygon, tuple(point), False) >= 0:
-                count += 1
-        
-        return count
+        return int(self._count_objects_in_zones(detections, [{'coordinates': zone_coords}])[0])
+
+    def _count_objects_in_zones(
+        self, detections: List[Dict[str, Any]], zones: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """Count objects within each zone using the rasterized zone index."""
+        if not zones:
+            return np.zeros(0, dtype=np.int64)
+        points = np.array([[d['x'], d['y']] for d in detections], dtype=np.float64).reshape(-1, 2)
+        index = zone_indexes.get([zone['coordinates'] for zone in zones])
+        return index.counts(points)
 
     @staticmethod
     def _get_occupancy_status(percentage: float) -> str:
@@ -0,0 +1,59 @@
+from typing import Dict, Any, Optional, Set
+import asyncio
+import logging
+from .frame_context import FrameContext
+
+logger = logging.getLogger(__name__)
+
+
+class FrameAnalysisPlan:
+    """Per-frame analysis plan shared by every processor subscribed to a camera.
+
+    Processors declare the analyses they need; the plan runs each model at
+    most once for the frame and hands the same result to every consumer.
+    `zone_id` is the occupancy zone the camera covers, if any, and is
+    reported with the people count.
+    """
+
+    # Analyses derived from the shared object detection pass
+    DERIVED_ANALYSES = ('people', 'traffic', 'safety', 'full')
+
+    def __init__(self, vision, ctx: FrameContext, zone_id: Optional[str] = None):
+        self.vision = vision
+        self.ctx = ctx
+        self.zone_id = zone_id
+        self.required: Set[str] = set()
+        self._results: Dict[str, asyncio.Future] = {}
+
+    def require(self, *analyses: str):
+        """Register analyses a processor needs for this frame."""
+        for analysis in analyses:
+            if analysis != 'detections' and analysis not in self.DERIVED_ANALYSES:
+                raise ValueError(f"Unknown analysis: {analysis}")
+            self.required.add(analysis)
+
+    async def execute(self):
+        """Run every required analysis concurrently, each exactly once."""
+        if self.required:
+            await asyncio.gather(*(self.get(analysis) for analysis in self.required))
+
+    async def get(self, analysis: str) -> Any:
+        """Return the shared result of an analysis, running it on first use."""
+        if analysis not in self._results:
+            self._results[analysis] = asyncio.ensure_future(self._run(analysis))
+        return await self._results[analysis]
+
+    async def _run(self, analysis: str) -> Any:
+        if analysis == 'detections':
+            return await self.vision.detect_objects(self.ctx)
+
+        detections = await self.get('detections')
+        if analysis == 'people':
+            return await self.vision.count_people(self.ctx, self.zone_id, detections=detections)
+        if analysis == 'traffic':
+            return await self.vision.analyze_traffic(self.ctx, detections=detections)
+        if analysis == 'safety':
+            return await self.vision.detect_safety_violations(self.ctx, detections=detections)
+        if analysis == 'full':
+            return await self.vision.process_frame(self.ctx, detections=detections)
+        raise ValueError(f"Unknown analysis: {analysis}")
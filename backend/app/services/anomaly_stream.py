@@ -0,0 +1,213 @@
+import math
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
+import numpy as np
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+
+# Per hour-of-week slot: Welford count/mean/M2 and exponentially weighted mean/variance
+STAT_FIELDS = ('count', 'mean', 'm2', 'ewma', 'ewvar')
+COUNT, MEAN, M2, EWMA, EWVAR = range(len(STAT_FIELDS))
+
+
+def hour_of_week(timestamp: float) -> int:
+    """Hour of the (UTC) week for an epoch timestamp, Monday 00:00 being 0."""
+    # The epoch fell on a Thursday, 72 hours into its week
+    return int((timestamp // 3600 + 72) % HOURS_PER_WEEK)
+
+
+class StreamingAnomalyDetector:
+    """Scores every analytics event against per-camera seasonal baselines.
+
+    Each camera keeps a (metric, hour-of-week) table of running statistics:
+    a Welford mean/variance over all history of that slot, and an EWMA
+    mean/variance that follows drift. An event is scored against its slot
+    before being folded in, in constant time, and is anomalous when it
+    deviates by at least `threshold` standard deviations from both
+    baselines. Anomalous values still move the EWMA but are kept out of
+    the Welford statistics, so one incident does not widen the baseline.
+    Alerts are limited to one per camera and metric per `cooldown`
+    seconds of event time.
+
+    A camera's table is one small float64 array (168 slots x 5 statistics
+    per metric), saved to MongoDB as raw bytes by `checkpoint` and read
+    back with `load`.
+    """
+
+    def __init__(self, collection=None,
+                 metrics: Sequence[str] = tuple(settings.ANOMALY_METRICS),
+                 threshold: float = settings.ANOMALY_Z_THRESHOLD,
+                 min_samples: int = settings.ANOMALY_MIN_SAMPLES,
+                 alpha: float = settings.ANOMALY_EWMA_ALPHA,
+                 min_std: float = settings.ANOMALY_MIN_STD,
+                 cooldown: float = settings.ANOMALY_ALERT_COOLDOWN):
+        self.collection = collection
+        self.metrics = tuple(metrics)
+        self.threshold = threshold
+        self.min_samples = max(2, min_samples)
+        self.alpha = alpha
+        self.min_std = min_std
+        self.cooldown = cooldown
+
+        self.baselines: Dict[str, np.ndarray] = {}
+        self.last_alert: Dict[tuple, float] = {}
+        self.dirty = set()
+        self.stats = {'events': 0, 'alerts': 0, 'suppressed': 0, 'checkpoints': 0, 'checkpoint_errors': 0}
+
+    def score(self, camera_id, timestamp: float, values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Score one event, fold it into the baselines and return any alerts."""
+        key = str(camera_id)
+        table = self.baselines.get(key)
+        if table is None:
+            table = self.baselines[key] = np.zeros((len(self.metrics), HOURS_PER_WEEK, len(STAT_FIELDS)))
+        self.dirty.add(key)
+        self.stats['events'] += 1
+
+        hour = hour_of_week(timestamp)
+        alerts = []
+        for index, metric in enumerate(self.metrics):
+            if values.get(metric) is None:
+                continue
+            value = float(values[metric])
+            slot = table[index, hour]
+            z_score = self._z_score(slot, value)
+            anomalous = z_score is not None and z_score >= self.threshold
+            if anomalous:
+                alert = self._alert(camera_id, metric, hour, timestamp, value, z_score, slot)
+                if alert:
+                    alerts.append(alert)
+            self._update(slot, value, anomalous)
+        return alerts
+
+    def baseline(self, camera_id, metric: str, timestamp: float) -> Dict[str, float]:
+        """Current expected value and deviation for a camera, metric and time."""
+        slot = self._slot(str(camera_id), metric, timestamp)
+        return {
+            'count': int(slot[COUNT]),
+            'mean': float(slot[MEAN]),
+            'std': self._welford_std(slot),
+            'ewma': float(slot[EWMA]),
+            'ewstd': math.sqrt(slot[EWVAR])
+        }
+
+    def export_state(self, camera_id) -> Dict[str, Any]:
+        return {
+            'metrics': list(self.metrics),
+            'stats': self.baselines[str(camera_id)].astype('<f8').tobytes()
+        }
+
+    def restore_state(self, camera_id, state: Dict[str, Any]):
+        """Load saved statistics; metrics no longer configured are dropped."""
+        saved = np.frombuffer(state['stats'], dtype='<f8').reshape(
+            len(state['metrics']), HOURS_PER_WEEK, len(STAT_FIELDS)
+        )
+        table = np.zeros((len(self.metrics), HOURS_PER_WEEK, len(STAT_FIELDS)))
+        for index, metric in enumerate(state['metrics']):
+            if metric in self.metrics:
+                table[self.metrics.index(metric)] = saved[index]
+        self.baselines[str(camera_id)] = table
+
+    def remove(self, camera_id) -> Optional[np.ndarray]:
+        key = str(camera_id)
+        self.dirty.discard(key)
+        for alert_key in [k for k in self.last_alert if k[0] == key]:
+            del self.last_alert[alert_key]
+        return self.baselines.pop(key, None)
+
+    async def checkpoint(self, partitions: Optional[Dict[str, int]] = None,
+                         camera_ids: Optional[Sequence[str]] = None):
+        """Save the baselines of changed (or the given) cameras to MongoDB.
+
+        `partitions` maps camera ids to their bus partition, recorded so the
+        consumer that is assigned a partition can `load` its cameras.
+        """
+        keys = [str(c) for c in camera_ids] if camera_ids is not None else list(self.dirty)
+        partitions = partitions or {}
+        for key in keys:
+            if key not in self.baselines:
+                continue
+            self.dirty.discard(key)
+            try:
+                await self.collection.replace_one(
+                    {'_id': key},
+                    {'_id': key, 'partition': partitions.get(key), **self.export_state(key),
+                     'updated_at': datetime.utcnow()},
+                    upsert=True
+                )
+                self.stats['checkpoints'] += 1
+            except Exception as e:
+                self.dirty.add(key)
+                self.stats['checkpoint_errors'] += 1
+                logger.error(f"Error saving anomaly baseline of camera {key}: {str(e)}")
+
+    async def load(self, partitions: Optional[Sequence[int]] = None) -> int:
+        """Restore saved baselines, only of cameras on `partitions` if given."""
+        query = {} if partitions is None else {'partition': {'$in': list(partitions)}}
+        restored = 0
+        async for doc in self.collection.find(query):
+            # Keep baselines that already saw newer events in this process
+            if doc['_id'] not in self.baselines:
+                self.restore_state(doc['_id'], doc)
+                restored += 1
+        return restored
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'cameras': len(self.baselines), 'dirty': len(self.dirty)}
+
+    def _slot(self, key: str, metric: str, timestamp: float) -> np.ndarray:
+        table = self.baselines.get(key)
+        if table is None:
+            return np.zeros(len(STAT_FIELDS))
+        return table[self.metrics.index(metric), hour_of_week(timestamp)]
+
+    def _welford_std(self, slot: np.ndarray) -> float:
+        return math.sqrt(slot[M2] / (slot[COUNT] - 1)) if slot[COUNT] > 1 else 0.0
+
+    def _z_score(self, slot: np.ndarray, value: float) -> Optional[float]:
+        """Deviation from the closer of the two baselines; None while warming up."""
+        if slot[COUNT] < self.min_samples:
+            return None
+        std = max(self._welford_std(slot), self.min_std)
+        ewstd = max(math.sqrt(slot[EWVAR]), self.min_std)
+        return min(abs(value - slot[MEAN]) / std, abs(value - slot[EWMA]) / ewstd)
+
+    def _alert(self, camera_id, metric: str, hour: int, timestamp: float, value: float,
+               z_score: float, slot: np.ndarray) -> Optional[Dict[str, Any]]:
+        alert_key = (str(camera_id), metric)
+        if timestamp - self.last_alert.get(alert_key, -math.inf) < self.cooldown:
+            self.stats['suppressed'] += 1
+            return None
+        self.last_alert[alert_key] = timestamp
+        self.stats['alerts'] += 1
+        std = max(self._welford_std(slot), self.min_std)
+        return {
+            'camera_id': camera_id,
+            'metric': metric,
+            'value': value,
+            'expected': float(slot[MEAN]),
+            'expected_range': [float(slot[MEAN] - 2 * std), float(slot[MEAN] + 2 * std)],
+            'z_score': float(z_score),
+            'direction': 'above' if value > slot[MEAN] else 'below',
+            'hour_of_week': hour,
+            'timestamp': timestamp
+        }
+
+    def _update(self, slot: np.ndarray, value: float, anomalous: bool):
+        if slot[COUNT] == 0:
+            slot[EWMA] = value
+        else:
+            # Incremental exponentially weighted variance (Finch, 2009)
+            diff = value - slot[EWMA]
+            increment = self.alpha * diff
+            slot[EWMA] += increment
+            slot[EWVAR] = (1 - self.alpha) * (slot[EWVAR] + diff * increment)
+        if anomalous:
+            return
+        slot[COUNT] += 1
+        delta = value - slot[MEAN]
+        slot[MEAN] += delta / slot[COUNT]
+        slot[M2] += delta * (value - slot[MEAN])
@@ -0,0 +1,180 @@
+import asyncio
+import queue
+import threading
+import time
+import logging
+import weakref
+from typing import Dict, Any, Optional
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# What a stage does with a new item when it is full (or, for 'sample', filling up)
+POLICIES = ('block', 'drop_oldest', 'sample')
+
+
+class _BoundedStage:
+    """Policy and depth gauge shared by the asyncio and thread stage queues.
+
+    - 'block': producers wait for room, pushing backpressure upstream.
+    - 'drop_oldest': the oldest queued item is discarded for the new one,
+      so consumers always see the freshest data.
+    - 'sample': once the queue is `sample_above` full only every
+      `sample_every`-th item is admitted; items arriving at a full queue
+      are dropped. Producers never wait.
+    """
+
+    def _init_stage(self, name: str, policy: str, sample_every: int, sample_above: float):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}, expected one of {POLICIES}")
+        if self.maxsize <= 0:
+            raise ValueError(f"Stage {name} must be bounded")
+        self.name = name
+        self.policy = policy
+        self.sample_every = max(1, sample_every)
+        self.sample_above = sample_above
+        self.peak = 0
+        self._offered = 0
+        self.metrics = {'accepted': 0, 'dropped': 0, 'sampled_out': 0, 'blocked': 0, 'blocked_seconds': 0.0}
+        stage_gauges.register(self)
+
+    def _sampled_out(self) -> bool:
+        """Whether the 'sample' policy skips this item at the current depth."""
+        if self.policy != 'sample' or self.qsize() < self.sample_above * self.maxsize:
+            return False
+        self._offered += 1
+        if self._offered % self.sample_every:
+            self.metrics['sampled_out'] += 1
+            return True
+        return False
+
+    def _accepted(self):
+        self.metrics['accepted'] += 1
+        self.peak = max(self.peak, self.qsize())
+
+    def _blocked(self, started: float):
+        self.metrics['blocked'] += 1
+        self.metrics['blocked_seconds'] += time.monotonic() - started
+
+    def get_stats(self) -> Dict[str, Any]:
+        depth = self.qsize()
+        return {
+            'policy': self.policy,
+            'depth': depth,
+            'capacity': self.maxsize,
+            'fill': depth / self.maxsize,
+            'peak': self.peak,
+            **self.metrics
+        }
+
+
+class StageQueue(_BoundedStage, asyncio.Queue):
+    """Bounded asyncio queue between two pipeline stages with an overflow policy.
+
+    `put` returns whether the item was queued. Evicted items are marked
+    done, so `join` still completes.
+    """
+
+    def __init__(self, name: str, maxsize: int, policy: str = 'block',
+                 sample_every: int = settings.BACKPRESSURE_SAMPLE_EVERY,
+                 sample_above: float = settings.BACKPRESSURE_SAMPLE_ABOVE):
+        asyncio.Queue.__init__(self, maxsize)
+        self._init_stage(name, policy, sample_every, sample_above)
+
+    async def put(self, item) -> bool:
+        if self.policy == 'block' and self.full():
+            started = time.monotonic()
+            # Waits for room, then queues the item through put_nowait
+            await asyncio.Queue.put(self, item)
+            self._blocked(started)
+            return True
+        return self.put_nowait(item)
+
+    def put_nowait(self, item) -> bool:
+        if self.policy == 'block':
+            asyncio.Queue.put_nowait(self, item)
+            self._accepted()
+            return True
+        if self._sampled_out():
+            return False
+        if self.full():
+            if self.policy == 'sample':
+                self.metrics['dropped'] += 1
+                return False
+            self.get_nowait()
+            self.task_done()
+            self.metrics['dropped'] += 1
+        asyncio.Queue.put_nowait(self, item)
+        self._accepted()
+        return True
+
+
+class ThreadStageQueue(_BoundedStage, queue.Queue):
+    """Thread-safe counterpart of `StageQueue` for capture and inference threads.
+
+    `put` returns whether the item was queued; with the 'block' policy it
+    gives up (returning False) after `timeout` seconds, so a producer can
+    still notice its stop event.
+    """
+
+    def __init__(self, name: str, maxsize: int, policy: str = 'block',
+                 sample_every: int = settings.BACKPRESSURE_SAMPLE_EVERY,
+                 sample_above: float = settings.BACKPRESSURE_SAMPLE_ABOVE):
+        queue.Queue.__init__(self, maxsize)
+        self._stage_lock = threading.Lock()
+        self._init_stage(name, policy, sample_every, sample_above)
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None) -> bool:
+        if self.policy == 'block':
+            started = time.monotonic()
+            waited = self.full()
+            try:
+                queue.Queue.put(self, item, block, timeout)
+            except queue.Full:
+                self.metrics['dropped'] += 1
+                return False
+            finally:
+                if waited:
+                    self._blocked(started)
+            self._accepted()
+            return True
+
+        with self._stage_lock:
+            if self._sampled_out():
+                return False
+            while True:
+                try:
+                    queue.Queue.put(self, item, block=False)
+                    break
+                except queue.Full:
+                    if self.policy == 'sample':
+                        self.metrics['dropped'] += 1
+                        return False
+                try:
+                    self.get_nowait()
+                    self.task_done()
+                    self.metrics['dropped'] += 1
+                except queue.Empty:
+                    pass
+            self._accepted()
+            return True
+
+    def put_nowait(self, item) -> bool:
+        return self.put(item, block=False)
+
+
+class StageGauges:
+    """Registry of live stage queues, for reporting depth and drops per stage."""
+
+    def __init__(self):
+        self.stages = weakref.WeakValueDictionary()
+
+    def register(self, stage: _BoundedStage):
+        # A restarted stage replaces the gauge of its predecessor
+        self.stages[stage.name] = stage
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stage.get_stats() for name, stage in sorted(self.stages.items())}
+
+
+stage_gauges = StageGauges()
@@ -5,15 +5,17 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from ..models.sql_models import Camera, Stream
 import asyncio
-import json
-from kafka import KafkaProducer
-from kafka.errors import KafkaError
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import threading
-from queue import Queue
+from queue import Empty
 import time
-import torch
+from ..core.config import settings
+from .load_governor import load_governor
+from .inference_cache import scene_cache
+from .backpressure import ThreadStageQueue
+from .message_bus import message_bus
+from .model_store import model_store
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +24,11 @@ class CameraService:
         self.active_streams = {}
         self.frame_processors = {}
         self.executor = ThreadPoolExecutor(max_workers=10)
-        self.kafka_producer = KafkaProducer(
-            bootstrap_servers=['localhost:9092'],
-            value_serializer=lambda x: json.dumps(x).encode('utf-8')
-        )
+        self.message_bus = message_bus
+        self._detectors = {}
+        # Publish fidelity changes made under load (one listener for every instance)
+        self.load_governor = load_governor
+        self.load_governor.add_listener(CameraService._publish_tier_change)
 
     async def create_camera(
         self, db: Session, camera_data: Dict[str, Any], user_id: int
@@ -116,8 +119,11 @@ class CameraService:
         if camera_id in self.active_streams:
             return
 
-        # Create frame queue and processing thread
-        frame_queue = Queue(maxsize=30)
+        # Create frame queue and processing thread; by default a slow
+        # analysis thread drops the oldest frames instead of growing memory
+        frame_queue = ThreadStageQueue(
+            f'capture:{camera_id}', settings.CAPTURE_QUEUE_SIZE, settings.CAPTURE_QUEUE_POLICY
+        )
         stop_event = threading.Event()
         
         # Start frame capture thread
@@ -138,6 +144,9 @@ class CameraService:
             camera.configuration
         )
         
+        self.load_governor.register_camera(camera_id, camera.configuration)
+        # Per-camera ROI, tolerance and max age of the scene result cache
+        scene_cache.configure_camera(camera_id, (camera.configuration or {}).get('sceneCache'))
         self.active_streams[camera_id] = {
             'queue': frame_queue,
             'stop_event': stop_event,
@@ -145,7 +154,7 @@ class CameraService:
         }
 
     def _capture_frames(
-        self, url: str, frame_queue: Queue, stop_event: threading.Event, config: Dict[str, Any]
+        self, url: str, frame_queue: ThreadStageQueue, stop_event: threading.Event, config: Dict[str, Any]
     ):
         """Capture frames from camera in a separate thread."""
         cap = cv2.VideoCapture(url)
@@ -163,34 +172,49 @@ class CameraService:
                 time.sleep(1)
                 continue
 
-            if not frame_queue.full():
-                frame_queue.put(frame)
-            else:
-                # Skip frame if queue is full
-                continue
+            # The queue's policy decides what happens when analysis falls behind
+            frame_queue.put((time.monotonic(), frame), timeout=0.5)
 
         cap.release()
 
     def _process_frames(
-        self, camera_id: int, frame_queue: Queue, stop_event: threading.Event, config: Dict[str, Any]
+        self, camera_id: int, frame_queue: ThreadStageQueue, stop_event: threading.Event, config: Dict[str, Any]
     ):
         """Process frames in a separate thread."""
         while not stop_event.is_set():
-            if frame_queue.empty():
-                time.sleep(0.01)
+            try:
+                captured_at, frame = frame_queue.get(timeout=0.1)
+            except Empty:
                 continue
 
-            frame = frame_queue.get()
+            self.load_governor.report_queue(f"capture:{camera_id}", frame_queue.qsize(), frame_queue.maxsize)
+            self.load_governor.evaluate()
+
+            # Shed load: skip stale frames and frames above the camera's current analysis rate
+            if time.monotonic() - captured_at > settings.MAX_FRAME_AGE:
+                continue
+            if not self.load_governor.should_process(camera_id):
+                continue
             
             try:
-                # Apply any preprocessing
+                started = time.perf_counter()
+                # Configured resolution, capped at the camera's current tier
+                capture_shape = frame.shape
+                size = tuple(map(int, config['resolution'].split('x'))) if config.get('resize') else None
+                frame = self.load_governor.apply_resolution(camera_id, frame, size)
                 processed_frame = self._preprocess_frame(frame, config)
                 
                 # Run object detection if configured
                 if config.get('enableObjectDetection'):
-                    detections = self._detect_objects(processed_frame, config)
-                    # Send detections to Kafka
-                    self._send_to_kafka('detections', {
+                    detections = self._detect_objects(
+                        processed_frame, config, self.load_governor.model_for(camera_id)
+                    )
+                    # Report boxes in capture pixels whatever the current tier
+                    detections = self.load_governor.to_capture_coordinates(
+                        detections, processed_frame.shape, capture_shape
+                    )
+                    # Publish detections
+                    self._publish('detections', {
                         'camera_id': camera_id,
                         'timestamp': time.time(),
                         'detections': detections
@@ -199,12 +223,14 @@ class CameraService:
                 # Run analytics if configured
                 if config.get('enableAnalytics'):
                     analytics = self._analyze_frame(processed_frame, config)
-                    # Send analytics to Kafka
-                    self._send_to_kafka('analytics', {
+                    # Publish analytics
+                    self._publish('analytics', {
                         'camera_id': camera_id,
                         'timestamp': time.time(),
                         'analytics': analytics
                     })
+
+                self.load_governor.report_latency('inference', (time.perf_counter() - started) * 1000)
                 
             except Exception as e:
                 logger.error(f"Error processing frame: {str(e)}")
@@ -212,11 +238,8 @@ class CameraService:
     def _preprocess_frame(self, frame: np.ndarray, config: Dict[str, Any]) -> np.ndarray:
         """Apply preprocessing to frame."""
         try:
-            # Resize if needed
-            if config.get('resize'):
-                width, height = map(int, config['resolution'].split('x'))
-                frame = cv2.resize(frame, (width, height))
-            
+            # The configured resize is applied with the tier cap in apply_resolution
+
             # Apply color space conversion
             if config.get('colorspace'):
                 if config['colorspace'] == 'grayscale':
@@ -293,19 +316,20 @@ class CameraService:
             logger.error(f"Error in frame analysis: {str(e)}")
             return analytics
 
-    def _detect_objects(self, frame: np.ndarray, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _detect_objects(self, frame: np.ndarray, config: Dict[str, Any],
+                        model_name: str = 'yolov5s') -> List[Dict[str, Any]]:
         """Detect objects in frame using configured model."""
         try:
-            if not hasattr(self, '_detector'):
-                # Initialize detector based on config
+            if model_name not in self._detectors:
+                # Initialize detector based on config; one instance per model tier
                 model_type = config.get('model_type', 'yolov5')
                 if model_type == 'yolov5':
-                    self._detector = torch.hub.load('ultralytics/yolov5', 'yolov5s')
+                    self._detectors[model_name] = model_store.load_yolov5(model_name)
                 else:
                     raise ValueError(f"Unsupported model type: {model_type}")
 
             # Run inference
-            results = self._detector(frame)
+            results = self._detectors[model_name](frame)
             
             # Parse results
             detections = []
@@ -323,19 +347,30 @@ class CameraService:
             logger.error(f"Error in object detection: {str(e)}")
             return []
 
-    def _send_to_kafka(self, topic: str, message: Dict[str, Any]):
-        """Send message to Kafka topic."""
+    @staticmethod
+    def _publish_tier_change(event: Dict[str, Any]):
         try:
-            future = self.kafka_producer.send(topic, message)
-            future.get(timeout=10)
-        except KafkaError as e:
-            logger.error(f"Error sending to Kafka: {str(e)}")
+            message_bus.publish('camera_tier_changes', event, key=event.get('camera_id'))
+        except Exception as e:
+            logger.error(f"Error publishing to camera_tier_changes: {str(e)}")
+
+    def _publish(self, topic: str, message: Dict[str, Any]):
+        """Publish a message on the bus, keyed by its camera id.
+
+        Keys keep each camera's messages ordered on one Kafka partition.
+        """
+        try:
+            self.message_bus.publish(topic, message, key=message.get('camera_id'))
+        except Exception as e:
+            logger.error(f"Error publishing to {topic}: {str(e)}")
 
     async def stop_stream(self, camera_id: int):
         """Stop camera stream processing."""
         if camera_id in self.active_streams:
             self.active_streams[camera_id]['stop_event'].set()
             del self.active_streams[camera_id]
+            self.load_governor.unregister_camera(camera_id)
+            scene_cache.invalidate(camera_id)
 
     async def restart_stream(self, camera_id: int):
         """Restart camera stream processing."""
@@ -355,10 +390,11 @@ class CameraService:
         return {
             'status': 'active',
             'frame_count': stream_info['queue'].qsize(),
-            'fps': stream_info['configuration']['frameRate']
+            'frame_queue': stream_info['queue'].get_stats(),
+            'fps': stream_info['configuration']['frameRate'],
+            'tier': self.load_governor.get_tier(camera_id)['name']
         }
 
     def __del__(self):
         """Cleanup resources."""
         self.executor.shutdown(wait=True)
-        self.kafka_producer.close()
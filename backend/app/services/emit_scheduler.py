@@ -0,0 +1,128 @@
+import asyncio
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple, Callable
+import numpy as np
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert numpy scalars/arrays (recursively) into JSON serializable types."""
+    if isinstance(value, dict):
+        return {k: to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class EmitScheduler:
+    """Coalesces and rate limits Socket.IO emits per room and event.
+
+    At most `max_rate` emits per second go out for each (room, event).
+    Updates arriving in between are coalesced into a single pending payload,
+    either latest-wins or through a per-event `merge(previous, new)`
+    function, and sent when the interval is up. Rooms without subscribers
+    are skipped entirely. Each emitted payload is converted once and sent
+    with a single room emit, which python-socketio encodes once for all
+    recipients.
+    """
+
+    def __init__(self, sio, max_rate: float = settings.SOCKET_EMIT_MAX_RATE,
+                 namespace: str = '/'):
+        self.sio = sio
+        self.namespace = namespace
+        self.default_rate = max_rate
+        self.policies: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[Tuple[str, str], Any] = {}
+        self.last_emit: Dict[Tuple[str, str], float] = {}
+        self.timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self.metrics = {'received': 0, 'emitted': 0, 'coalesced': 0, 'skipped_empty': 0, 'errors': 0}
+
+    def configure(self, event: str, max_rate: Optional[float] = None,
+                  merge: Optional[Callable[[Any, Any], Any]] = None):
+        """Set the rate (0 = unthrottled) and coalescing policy for one event."""
+        self.policies[event] = {
+            'max_rate': self.default_rate if max_rate is None else max_rate,
+            'merge': merge
+        }
+
+    async def emit(self, event: str, data: Any, room: str):
+        """Queue an update for a room; sends now if the room's interval is up."""
+        self.metrics['received'] += 1
+        if not self.has_subscribers(room):
+            self.metrics['skipped_empty'] += 1
+            return
+
+        key = (room, event)
+        policy = self._policy(event)
+        if key in self.pending:
+            merge = policy['merge']
+            self.pending[key] = merge(self.pending[key], data) if merge else data
+            self.metrics['coalesced'] += 1
+            return
+
+        interval = 1.0 / policy['max_rate'] if policy['max_rate'] > 0 else 0.0
+        wait = self.last_emit.get(key, -np.inf) + interval - time.monotonic()
+        if wait <= 0:
+            await self._send(key, data)
+            return
+
+        self.pending[key] = data
+        loop = asyncio.get_running_loop()
+        self.timers[key] = loop.call_later(wait, self._schedule_flush, key)
+
+    def has_subscribers(self, room: str) -> bool:
+        """Whether any client is in `room` (assumed true if it cannot be told)."""
+        try:
+            return bool(self.sio.manager.rooms.get(self.namespace, {}).get(room))
+        except Exception:
+            return True
+
+    async def stop(self, flush: bool = True):
+        """Cancel pending timers, sending what is still pending if `flush`."""
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        if flush:
+            for key in list(self.pending):
+                await self._flush(key)
+        self.pending.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.metrics, 'pending': len(self.pending)}
+
+    def _policy(self, event: str) -> Dict[str, Any]:
+        return self.policies.get(event, {'max_rate': self.default_rate, 'merge': None})
+
+    def _schedule_flush(self, key: Tuple[str, str]):
+        task = asyncio.get_running_loop().create_task(self._flush(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key: Tuple[str, str]):
+        self.timers.pop(key, None)
+        if key not in self.pending:
+            return
+        data = self.pending.pop(key)
+        # Clients may have left while the update was waiting
+        if not self.has_subscribers(key[0]):
+            self.metrics['skipped_empty'] += 1
+            return
+        await self._send(key, data)
+
+    async def _send(self, key: Tuple[str, str], data: Any):
+        room, event = key
+        self.last_emit[key] = time.monotonic()
+        try:
+            await self.sio.emit(event, to_jsonable(data), room=room, namespace=self.namespace)
+            self.metrics['emitted'] += 1
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.error(f"Error emitting {event} to {room}: {str(e)}")
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Union
+from functools import lru_cache
+import logging
+from .frame_context import FrameContext
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HAAR_CASCADE = 'haarcascade_frontalface_default.xml'
+
+
+@lru_cache(maxsize=None)
+def load_cascade(name: str = HAAR_CASCADE):
+    """Load a Haar cascade once per worker process."""
+    classifier = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+    if classifier.empty():
+        raise RuntimeError(f"Failed to load Haar cascade: {name}")
+    return classifier
+
+
+class FaceDetector:
+    """Face detection on a downscaled frame with boxes mapped back to full size.
+
+    The 'haar' backend uses a cascade loaded once per process; the 'dnn'
+    backend reuses the SSD face network already held by VisionService.
+    `min_size` is given in original frame pixels and prunes the smallest
+    scales of the Haar pyramid.
+    """
+
+    def __init__(self,
+                 backend: str = settings.FACE_DETECTOR_BACKEND,
+                 max_side: int = settings.FACE_DETECTION_MAX_SIDE,
+                 min_size: int = settings.FACE_MIN_SIZE,
+                 scale_factor: float = 1.1,
+                 min_neighbors: int = 4,
+                 confidence: float = settings.FACE_DNN_CONFIDENCE):
+        if backend not in ('haar', 'dnn'):
+            raise ValueError(f"Unknown face detector backend: {backend}")
+        self.backend = backend
+        self.max_side = max_side
+        self.min_size = min_size
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.confidence = confidence
+
+    def detect(self, frame: Union[FrameContext, np.ndarray]) -> List[Dict]:
+        """Return faces as {'x', 'y', 'w', 'h'} in original frame pixels."""
+        ctx = FrameContext.of(frame)
+        if self.backend == 'dnn':
+            return self._detect_dnn(ctx)
+        return self._detect_haar(ctx)
+
+    def _detect_haar(self, ctx: FrameContext) -> List[Dict]:
+        gray, scale = ctx.downscaled(self.max_side, source='gray')
+        min_side = max(1, int(round(self.min_size * scale)))
+        faces = load_cascade().detectMultiScale(
+            gray, self.scale_factor, self.min_neighbors,
+            minSize=(min_side, min_side)
+        )
+        if len(faces) == 0:
+            return []
+
+        boxes = np.round(np.asarray(faces, dtype=np.float32) / scale).astype(int)
+        return [
+            {'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h)}
+            for (x, y, w, h) in boxes
+        ]
+
+    def _detect_dnn(self, ctx: FrameContext) -> List[Dict]:
+        from .vision_service import vision_service
+
+        # The SSD network takes a fixed 300x300 input regardless of frame size
+        blob = cv2.dnn.blobFromImage(
+            ctx.resized((300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0)
+        )
+        net = vision_service.face_detector
+        net.setInput(blob)
+        detections = net.forward()[0, 0]
+
+        detections = detections[detections[:, 2] > self.confidence]
+        boxes = detections[:, 3:7] * np.array([ctx.width, ctx.height, ctx.width, ctx.height])
+        boxes = np.round(boxes).astype(int)
+
+        faces = []
+        for x1, y1, x2, y2 in boxes:
+            w, h = x2 - x1, y2 - y1
+            if min(w, h) < self.min_size:
+                continue
+            faces.append({'x': int(x1), 'y': int(y1), 'w': int(w), 'h': int(h)})
+        return faces
+
+
+face_detector = FaceDetector()
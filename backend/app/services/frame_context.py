@@ -0,0 +1,139 @@
+import cv2
+import numpy as np
+from typing import Dict, Any, Optional, Tuple, Union
+
+
+class FrameContext:
+    """Lazily computed, shared derived views of a single camera frame.
+
+    Every processor that handles the same frame receives the same context, so
+    colour conversions, blurs and resizes are computed once on first access
+    and reused by all later consumers.
+    """
+
+    def __init__(self, frame: np.ndarray, camera_id: Optional[str] = None):
+        self.frame = frame
+        self.camera_id = camera_id
+        self._views: Dict[Tuple, Any] = {}
+
+    @classmethod
+    def of(cls, frame: Union['FrameContext', np.ndarray],
+           camera_id: Optional[str] = None) -> 'FrameContext':
+        """Return `frame` if it already is a context, otherwise wrap it."""
+        if isinstance(frame, FrameContext):
+            return frame
+        return cls(frame, camera_id)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.frame.shape
+
+    @property
+    def height(self) -> int:
+        return self.frame.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.frame.shape[1]
+
+    def _cached(self, key: Tuple, compute):
+        if key not in self._views:
+            self._views[key] = compute()
+        return self._views[key]
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Single channel luminance view of the frame."""
+        def compute():
+            if self.frame.ndim == 2:
+                return self.frame
+            return cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+        return self._cached(('gray',), compute)
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB view of the frame (models trained on RGB input)."""
+        def compute():
+            if self.frame.ndim == 2 or self.frame.shape[2] != 3:
+                return self.frame
+            return cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB)
+        return self._cached(('rgb',), compute)
+
+    def blurred_gray(self, kernel: Tuple[int, int] = (21, 21)) -> np.ndarray:
+        """Gaussian blurred grayscale view, cached per kernel size."""
+        kernel = tuple(kernel)
+        return self._cached(
+            ('blurred_gray', kernel),
+            lambda: cv2.GaussianBlur(self.gray, kernel, 0)
+        )
+
+    def resized(self, size: Tuple[int, int], source: str = 'bgr') -> np.ndarray:
+        """Frame resized to `size` (width, height), ignoring aspect ratio."""
+        size = tuple(size)
+        base = self._source(source)
+        return self._cached(
+            ('resized', source, size),
+            lambda: cv2.resize(base, size)
+        )
+
+    def downscaled(self, max_side: int, source: str = 'bgr') -> Tuple[np.ndarray, float]:
+        """Frame shrunk so its longest side is at most `max_side`.
+
+        Returns the image and the scale factor applied, so callers can map
+        coordinates back with `coord / scale`.
+        """
+        def compute():
+            base = self._source(source)
+            scale = min(1.0, max_side / float(max(base.shape[:2])))
+            if scale >= 1.0:
+                return base, 1.0
+            size = (max(1, int(round(base.shape[1] * scale))),
+                    max(1, int(round(base.shape[0] * scale))))
+            return cv2.resize(base, size, interpolation=cv2.INTER_AREA), scale
+        return self._cached(('downscaled', source, max_side), compute)
+
+    def thumbnail(self, size: int = 16,
+                  roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """Tiny area-averaged luminance image of the frame or an ROI.
+
+        `roi` is (x1, y1, x2, y2) in frame pixels. Used as a cheap scene
+        signature for change detection.
+        """
+        def compute():
+            gray = self.gray
+            if roi is not None:
+                x1, y1, x2, y2 = roi
+                gray = gray[max(0, y1):y2, max(0, x1):x2]
+            return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+        return self._cached(('thumbnail', size, tuple(roi) if roi else None), compute)
+
+    def letterbox(self, size: int = 640, source: str = 'rgb',
+                  color: Tuple[int, int, int] = (114, 114, 114)) -> Dict[str, Any]:
+        """Aspect preserving resize padded to a square model input.
+
+        Returns the padded image together with the scale and padding offsets
+        needed to map detections back onto the original frame.
+        """
+        def compute():
+            base = self._source(source)
+            h, w = base.shape[:2]
+            scale = min(size / h, size / w)
+            new_w, new_h = int(round(w * scale)), int(round(h * scale))
+            resized = cv2.resize(base, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+            pad_x = (size - new_w) // 2
+            pad_y = (size - new_h) // 2
+            image = cv2.copyMakeBorder(
+                resized, pad_y, size - new_h - pad_y, pad_x, size - new_w - pad_x,
+                cv2.BORDER_CONSTANT, value=color
+            )
+            return {'image': image, 'scale': scale, 'pad': (pad_x, pad_y)}
+        return self._cached(('letterbox', source, size, tuple(color)), compute)
+
+    def _source(self, source: str) -> np.ndarray:
+        if source == 'bgr':
+            return self.frame
+        if source == 'rgb':
+            return self.rgb
+        if source == 'gray':
+            return self.gray
+        raise ValueError(f"Unknown frame source: {source}")
@@ -0,0 +1,142 @@
+import numpy as np
+from typing import Dict, Any, Optional, Tuple, Union, Callable, Awaitable
+import time
+import logging
+from .frame_context import FrameContext
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SceneResultCache:
+    """Per-camera inference result cache keyed by a cheap scene signature.
+
+    The signature is a tiny area-averaged luminance image of the (optionally
+    ROI-cropped) frame. While the mean absolute difference between the
+    current signature and the one the cached result was computed from stays
+    within the tolerance, and the result is younger than `max_age` seconds,
+    the cached result is reused instead of running the model again.
+    """
+
+    def __init__(self,
+                 tolerance: float = settings.SCENE_CACHE_TOLERANCE,
+                 max_age: float = settings.SCENE_CACHE_MAX_AGE,
+                 signature_size: int = settings.SCENE_CACHE_SIGNATURE_SIZE,
+                 enabled: bool = settings.SCENE_CACHE_ENABLED):
+        self.tolerance = tolerance
+        self.max_age = max_age
+        self.signature_size = signature_size
+        self.enabled = enabled
+        self.camera_configs: Dict[str, Dict[str, Any]] = {}
+        self.entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.metrics: Dict[str, Dict[str, int]] = {}
+
+    def configure_camera(self, camera_id: str, config: Optional[Dict[str, Any]] = None):
+        """Set ROI, tolerance, max age or enable flag for one camera.
+
+        Called when a stream starts, with `Camera.configuration['sceneCache']`.
+        """
+        config = config or {}
+        self.camera_configs[str(camera_id)] = {
+            'enabled': config.get('enabled', True),
+            'roi': tuple(config['roi']) if config.get('roi') else None,
+            'tolerance': config.get('tolerance', self.tolerance),
+            'max_age': config.get('max_age', self.max_age)
+        }
+        self.invalidate(camera_id)
+
+    def signature(self, frame: Union[FrameContext, np.ndarray],
+                  camera_id: Optional[str] = None) -> np.ndarray:
+        """Compute the scene signature of a frame for a camera."""
+        ctx = FrameContext.of(frame, camera_id)
+        roi = self._camera_config(camera_id or ctx.camera_id)['roi']
+        return ctx.thumbnail(self.signature_size, roi)
+
+    async def get_or_compute(self, camera_id: Optional[str], key: str,
+                             frame: Union[FrameContext, np.ndarray],
+                             compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached result for an unchanged scene or run `compute`."""
+        if camera_id is None or not self.enabled:
+            return await compute()
+
+        camera_id = str(camera_id)
+        config = self._camera_config(camera_id)
+        if not config['enabled']:
+            return await compute()
+
+        signature = self.signature(frame, camera_id)
+        cached = self.lookup(camera_id, key, signature)
+        if cached is not None:
+            return cached
+
+        result = await compute()
+        self.store(camera_id, key, signature, result)
+        return result
+
+    def lookup(self, camera_id: str, key: str, signature: np.ndarray) -> Optional[Any]:
+        """Return the cached result if the scene is unchanged and fresh."""
+        config = self._camera_config(camera_id)
+        metrics = self._metrics(camera_id)
+        entry = self.entries.get((camera_id, key))
+
+        if entry is None:
+            metrics['misses'] += 1
+            return None
+        if time.monotonic() - entry['computed_at'] > config['max_age']:
+            metrics['expired'] += 1
+            metrics['misses'] += 1
+            return None
+        if float(np.mean(np.abs(signature - entry['signature']))) > config['tolerance']:
+            metrics['scene_changes'] += 1
+            metrics['misses'] += 1
+            return None
+
+        metrics['hits'] += 1
+        return entry['result']
+
+    def store(self, camera_id: str, key: str, signature: np.ndarray, result: Any):
+        """Remember a result together with the signature it was computed on."""
+        self.entries[(camera_id, key)] = {
+            'signature': signature,
+            'result': result,
+            'computed_at': time.monotonic()
+        }
+
+    def invalidate(self, camera_id: Optional[str] = None):
+        """Drop cached results for one camera, or for all cameras."""
+        if camera_id is None:
+            self.entries.clear()
+            return
+        camera_id = str(camera_id)
+        for entry_key in [k for k in self.entries if k[0] == camera_id]:
+            del self.entries[entry_key]
+
+    def get_stats(self, camera_id: Optional[str] = None) -> Dict[str, Any]:
+        """Hit/miss counters and hit rate, per camera or in total."""
+        if camera_id is not None:
+            counters = dict(self._metrics(str(camera_id)))
+        else:
+            counters = {'hits': 0, 'misses': 0, 'expired': 0, 'scene_changes': 0}
+            for camera_metrics in self.metrics.values():
+                for name, value in camera_metrics.items():
+                    counters[name] += value
+
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = counters['hits'] / lookups if lookups else 0.0
+        return counters
+
+    def _camera_config(self, camera_id: Optional[str]) -> Dict[str, Any]:
+        return self.camera_configs.get(str(camera_id), {
+            'enabled': True,
+            'roi': None,
+            'tolerance': self.tolerance,
+            'max_age': self.max_age
+        })
+
+    def _metrics(self, camera_id: str) -> Dict[str, int]:
+        if camera_id not in self.metrics:
+            self.metrics[camera_id] = {'hits': 0, 'misses': 0, 'expired': 0, 'scene_changes': 0}
+        return self.metrics[camera_id]
+
+
+scene_cache = SceneResultCache()
@@ -0,0 +1,368 @@
+import numpy as np
+from typing import Dict, Any, List, Optional, Callable
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from multiprocessing import shared_memory
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between worker liveness checks by the collector thread
+WORKER_CHECK_INTERVAL = 0.2
+
+
+def yolo_detection_handler() -> Callable[[np.ndarray, Dict[str, Any]], Dict[str, Any]]:
+    """Default worker handler: one YOLO detector per worker process."""
+    from ..models.detection import YOLODetector
+
+    detector = YOLODetector(
+        model_path=settings.YOLO_MODEL_PATH,
+        classes=['person', 'car', 'truck', 'bicycle', 'motorcycle']
+    )
+
+    def handle(frame: np.ndarray, options: Dict[str, Any]) -> Dict[str, Any]:
+        return pack_detections(detector.detect(frame))
+
+    return handle
+
+
+def pack_detections(detections: List[Dict]) -> Dict[str, Any]:
+    """Detections as compact arrays so results stay cheap to send back."""
+    return {
+        'boxes': np.asarray([d['bbox'][:4] for d in detections], dtype=np.float32).reshape(-1, 4),
+        'scores': np.asarray([d.get('confidence', 0.0) for d in detections], dtype=np.float32),
+        'classes': [d['class'] for d in detections]
+    }
+
+
+def unpack_detections(packed: Dict[str, Any]) -> List[Dict]:
+    """Inverse of `pack_detections`."""
+    return [
+        {'bbox': [int(v) for v in box], 'confidence': float(score), 'class': cls}
+        for box, score, cls in zip(packed['boxes'], packed['scores'], packed['classes'])
+    ]
+
+
+def _resolve_handler(path: str) -> Callable:
+    module_name, _, attribute = path.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _worker_main(index: int, workers: int, shm_name: str, slot_bytes: int,
+                 handler_path: str, tasks, results) -> None:
+    """Inference worker loop; exits after finishing queued tasks on a None sentinel."""
+    from ..core.runtime import configure_runtime
+
+    configure_runtime(workers, index, force=True)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        handle = _resolve_handler(handler_path)()
+        results.put(('ready', index, None, None))
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, slot, shape, dtype, payload, options = task
+            frame = None
+            try:
+                if payload is None:
+                    frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes)
+                else:
+                    frame = payload
+                results.put(('result', index, request_id, (handle(frame, options), None)))
+            except Exception as e:
+                results.put(('result', index, request_id, (None, f"{type(e).__name__}: {str(e)}")))
+            finally:
+                # The view must be released before the segment can be closed
+                frame = None
+    finally:
+        shm.close()
+
+
+class _Worker:
+    """Parent-side state of one worker process and its frame slots."""
+
+    def __init__(self, index: int, slots: int, slot_bytes: int):
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.slot_bytes = slot_bytes
+        self.free_slots = deque(range(slots))
+        self.process = None
+        self.tasks = None
+        self.accepting = False
+        self.ready = False
+        self.in_flight: Dict[int, Dict[str, Any]] = {}
+        self.processed = 0
+        self.restarts = 0
+
+    def write_frame(self, slot: int, frame: np.ndarray):
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+        np.copyto(view, frame)
+        del view
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class InferenceWorkerPool:
+    """Process pool for GIL-bound inference, fed through shared memory.
+
+    Each worker process loads its own model copy (built by `handler`, a
+    "module:factory" path) and owns a shared memory segment split into
+    frame slots. Submitting a frame copies it into a free slot of the least
+    loaded worker and only the slot index travels over the task queue;
+    workers return compact result structs. Workers can be drained and
+    restarted one at a time. Crashed workers are restarted automatically,
+    and a worker that holds a frame longer than `request_timeout` seconds
+    is considered hung and recycled.
+    """
+
+    def __init__(self,
+                 handler: str = 'app.services.inference_workers:yolo_detection_handler',
+                 workers: Optional[int] = None,
+                 slots_per_worker: int = settings.INFERENCE_POOL_SLOTS,
+                 max_frame_bytes: int = settings.INFERENCE_MAX_FRAME_BYTES,
+                 start_method: str = settings.INFERENCE_POOL_START_METHOD,
+                 request_timeout: float = settings.INFERENCE_REQUEST_TIMEOUT):
+        self.handler = handler
+        self.num_workers = workers or settings.INFERENCE_WORKERS
+        self.slots_per_worker = slots_per_worker
+        self.max_frame_bytes = max_frame_bytes
+        self.request_timeout = request_timeout
+        self.mp = multiprocessing.get_context(start_method)
+
+        self.workers: List[_Worker] = []
+        self.results = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._collector: Optional[threading.Thread] = None
+        self._running = False
+        self._request_ids = itertools.count()
+        self._slot_waiters: deque = deque()
+
+    async def start(self):
+        """Start all workers and wait until each has loaded its model."""
+        if self._running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self.results = self.mp.Queue()
+        self.workers = [
+            _Worker(index, self.slots_per_worker, self.max_frame_bytes)
+            for index in range(self.num_workers)
+        ]
+        self._running = True
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+
+        try:
+            for worker in self.workers:
+                self._spawn(worker)
+            await asyncio.gather(*(self._wait_ready(worker) for worker in self.workers))
+        except Exception:
+            # Never leave half a pool or orphaned shared memory behind
+            self._running = False
+            for worker in self.workers:
+                if worker.process is not None and worker.process.is_alive():
+                    worker.process.terminate()
+                worker.close()
+            self.workers = []
+            raise
+        logger.info(f"Inference worker pool started with {self.num_workers} workers")
+
+    async def stop(self):
+        """Drain every worker, then release shared memory."""
+        if not self._running:
+            return
+        await asyncio.gather(*(self._drain(worker) for worker in self.workers))
+        self._running = False
+        if self._collector:
+            self._collector.join(timeout=2)
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+
+    async def submit(self, frame: np.ndarray, options: Optional[Dict[str, Any]] = None) -> Any:
+        """Run the handler on `frame` in the least loaded worker."""
+        if not self._running:
+            raise RuntimeError("Inference worker pool is not running")
+
+        worker = await self._acquire_worker()
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+
+        if frame.nbytes <= self.max_frame_bytes:
+            slot = worker.free_slots.popleft()
+            worker.write_frame(slot, frame)
+            payload = None
+        else:
+            # Oversized frames fall back to a pickled copy
+            slot, payload = None, frame
+
+        worker.in_flight[request_id] = {'future': future, 'slot': slot}
+        worker.tasks.put((request_id, slot, frame.shape, frame.dtype.str, payload, options or {}))
+        try:
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            # Only recycle the process that was given this frame, not its
+            # replacement; a draining worker is terminated by the drain itself
+            if request_id in worker.in_flight and worker.accepting:
+                logger.error(f"Inference worker {worker.index} hung, restarting")
+                self._recycle(worker, "Inference worker timed out")
+            raise TimeoutError(
+                f"Inference worker {worker.index} did not answer within {self.request_timeout}s"
+            )
+
+    async def restart_worker(self, index: int):
+        """Drain a worker (finishing its in-flight frames) and start a fresh one."""
+        worker = self.workers[index]
+        await self._drain(worker)
+        worker.restarts += 1
+        self._spawn(worker)
+        await self._wait_ready(worker)
+
+    async def restart_all(self):
+        """Rolling restart, one worker at a time so capacity never drops to zero."""
+        for index in range(len(self.workers)):
+            await self.restart_worker(index)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': [
+                {
+                    'index': worker.index,
+                    'alive': bool(worker.process and worker.process.is_alive()),
+                    'accepting': worker.accepting,
+                    'in_flight': len(worker.in_flight),
+                    'processed': worker.processed,
+                    'restarts': worker.restarts
+                }
+                for worker in self.workers
+            ],
+            'waiting': len(self._slot_waiters)
+        }
+
+    def _spawn(self, worker: _Worker):
+        worker.tasks = self.mp.Queue()
+        worker.ready = False
+        worker.free_slots = deque(range(self.slots_per_worker))
+        worker.process = self.mp.Process(
+            target=_worker_main,
+            args=(worker.index, self.num_workers, worker.shm.name, worker.slot_bytes,
+                  self.handler, worker.tasks, self.results),
+            daemon=True
+        )
+        worker.process.start()
+
+    async def _wait_ready(self, worker: _Worker):
+        while not worker.ready:
+            if not worker.process.is_alive():
+                raise RuntimeError(f"Inference worker {worker.index} exited during startup")
+            await asyncio.sleep(0.05)
+        worker.accepting = True
+        self._wake_waiter()
+
+    async def _drain(self, worker: _Worker):
+        worker.accepting = False
+        if worker.process and worker.process.is_alive():
+            worker.tasks.put(None)
+            deadline = time.monotonic() + settings.INFERENCE_DRAIN_TIMEOUT
+            while worker.in_flight and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            await self._loop.run_in_executor(None, worker.process.join, 5)
+            if worker.process.is_alive():
+                logger.warning(f"Inference worker {worker.index} did not exit, terminating")
+                worker.process.terminate()
+        self._fail_in_flight(worker, "Inference worker stopped")
+
+    async def _acquire_worker(self) -> _Worker:
+        while True:
+            candidates = [w for w in self.workers if w.accepting and w.free_slots]
+            if candidates:
+                return min(candidates, key=lambda w: len(w.in_flight))
+            waiter = self._loop.create_future()
+            self._slot_waiters.append(waiter)
+            await waiter
+
+    def _wake_waiter(self):
+        while self._slot_waiters:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _collect_results(self):
+        """Collector thread: hands results to the event loop, watches for crashes."""
+        next_check = time.monotonic()
+        while self._running:
+            # Checked on a timer, not only when idle: under load the results
+            # queue never runs empty
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+            try:
+                message = self.results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._on_message, message)
+
+    def _check_workers(self):
+        for worker in self.workers:
+            if (worker.accepting and worker.process is not None
+                    and not worker.process.is_alive()):
+                self._loop.call_soon_threadsafe(self._on_worker_crash, worker)
+
+    def _on_message(self, message):
+        kind, index, request_id, payload = message
+        worker = self.workers[index]
+        if kind == 'ready':
+            worker.ready = True
+            return
+
+        entry = worker.in_flight.pop(request_id, None)
+        if entry is None:
+            return
+        if entry['slot'] is not None:
+            worker.free_slots.append(entry['slot'])
+        worker.processed += 1
+        self._wake_waiter()
+
+        result, error = payload
+        if entry['future'].done():
+            return
+        if error:
+            entry['future'].set_exception(RuntimeError(error))
+        else:
+            entry['future'].set_result(result)
+
+    def _on_worker_crash(self, worker: _Worker):
+        if not worker.accepting or not self._running:
+            return
+        logger.error(f"Inference worker {worker.index} exited unexpectedly, restarting")
+        self._recycle(worker, "Inference worker crashed")
+
+    def _recycle(self, worker: _Worker, reason: str):
+        """Replace a crashed or hung worker, failing the frames it held."""
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.accepting = False
+        self._fail_in_flight(worker, reason)
+        worker.restarts += 1
+        self._spawn(worker)
+        asyncio.ensure_future(self._wait_ready(worker))
+
+    def _fail_in_flight(self, worker: _Worker, reason: str):
+        for entry in worker.in_flight.values():
+            if not entry['future'].done():
+                entry['future'].set_exception(RuntimeError(reason))
+        worker.in_flight.clear()
+        self._wake_waiter()
@@ -0,0 +1,263 @@
+import cv2
+import numpy as np
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from collections import deque
+from datetime import datetime
+import threading
+import time
+import logging
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fidelity tiers from full quality down; each step trades accuracy for load
+TIERS = [
+    {'name': 'full', 'fps_scale': 1.0, 'max_side': None, 'model': 'yolov5s'},
+    {'name': 'reduced', 'fps_scale': 0.5, 'max_side': 960, 'model': 'yolov5s'},
+    {'name': 'low', 'fps_scale': 0.25, 'max_side': 640, 'model': 'yolov5n'},
+    {'name': 'minimal', 'fps_scale': 0.1, 'max_side': 480, 'model': 'yolov5n'},
+]
+
+# Deepest tier a camera of each priority may be pushed to
+PRIORITY_MAX_TIER = {
+    'critical': 0,
+    'high': 1,
+    'normal': 2,
+    'low': len(TIERS) - 1,
+}
+PRIORITY_RANK = {'critical': 0, 'high': 1, 'normal': 2, 'low': 3}
+
+
+class LoadGovernor:
+    """Sheds analysis load per camera when the pipeline falls behind.
+
+    Stages report queue depth and per-frame latency. Pressure is the worst
+    of queue fill ratio and p95 latency over the budget. Above the high
+    watermark one camera is stepped down a fidelity tier (lowest priority,
+    least degraded first); below the low watermark cameras are restored
+    one step at a time, highest priority first. Camera priority comes from
+    `Camera.configuration['priority']`; 'critical' cameras never degrade.
+    """
+
+    def __init__(self,
+                 high_watermark: float = settings.LOAD_HIGH_WATERMARK,
+                 low_watermark: float = settings.LOAD_LOW_WATERMARK,
+                 latency_budget_ms: float = settings.LOAD_LATENCY_BUDGET_MS,
+                 interval: float = settings.LOAD_GOVERNOR_INTERVAL,
+                 restore_cooldown: float = settings.LOAD_RESTORE_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.latency_budget_ms = latency_budget_ms
+        self.interval = interval
+        self.restore_cooldown = restore_cooldown
+        self.clock = clock
+
+        self._lock = threading.RLock()
+        self.cameras: Dict[Any, Dict[str, Any]] = {}
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.events = deque(maxlen=500)
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._last_change = float('-inf')
+        self._last_evaluation = float('-inf')
+
+    def register_camera(self, camera_id, configuration: Optional[Dict[str, Any]] = None):
+        """Track a camera using the priority and frame rate from its configuration."""
+        configuration = configuration or {}
+        priority = configuration.get('priority', 'normal')
+        if priority not in PRIORITY_RANK:
+            logger.warning(f"Unknown priority {priority!r} for camera {camera_id}, using 'normal'")
+            priority = 'normal'
+        max_tier = min(
+            configuration.get('max_degradation', PRIORITY_MAX_TIER[priority]),
+            PRIORITY_MAX_TIER[priority]
+        )
+        with self._lock:
+            self.cameras[camera_id] = {
+                'priority': priority,
+                'max_tier': max_tier,
+                'base_fps': float(configuration.get('analysisFps', configuration.get('frameRate', 30))),
+                'tier': 0,
+                'last_processed': float('-inf')
+            }
+
+    def unregister_camera(self, camera_id):
+        with self._lock:
+            self.cameras.pop(camera_id, None)
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call `callback(event)` whenever a camera changes tier; added once."""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def report_queue(self, stage: str, depth: int, capacity: int):
+        with self._lock:
+            entry = self._stage(stage)
+            entry['fill'] = depth / capacity if capacity else 0.0
+            entry['updated'] = self.clock()
+
+    def report_latency(self, stage: str, latency_ms: float):
+        with self._lock:
+            entry = self._stage(stage)
+            entry['latencies'].append(latency_ms)
+            entry['updated'] = self.clock()
+
+    def pressure(self) -> float:
+        """Current load as a fraction of capacity (1.0 = saturated)."""
+        now = self.clock()
+        with self._lock:
+            values = [0.0]
+            for entry in self.stages.values():
+                # Stages that stopped reporting no longer count
+                if now - entry['updated'] > 5 * self.interval:
+                    continue
+                values.append(entry['fill'])
+                if entry['latencies']:
+                    p95 = float(np.percentile(entry['latencies'], 95))
+                    values.append(p95 / self.latency_budget_ms)
+            return max(values)
+
+    def evaluate(self) -> Optional[Dict[str, Any]]:
+        """Degrade or restore at most one camera; cheap to call every frame."""
+        now = self.clock()
+        with self._lock:
+            if now - self._last_evaluation < self.interval:
+                return None
+            self._last_evaluation = now
+
+            pressure = self.pressure()
+            if pressure >= self.high_watermark and now - self._last_change >= self.interval:
+                candidates = [
+                    (camera_id, state) for camera_id, state in self.cameras.items()
+                    if state['tier'] < state['max_tier']
+                ]
+                if not candidates:
+                    return None
+                camera_id, state = min(
+                    candidates,
+                    key=lambda c: (-PRIORITY_RANK[c[1]['priority']], c[1]['tier'])
+                )
+                return self._set_tier(camera_id, state, state['tier'] + 1, 'overload', pressure, now)
+
+            if pressure <= self.low_watermark and now - self._last_change >= self.restore_cooldown:
+                candidates = [
+                    (camera_id, state) for camera_id, state in self.cameras.items()
+                    if state['tier'] > 0
+                ]
+                if not candidates:
+                    return None
+                camera_id, state = min(
+                    candidates,
+                    key=lambda c: (PRIORITY_RANK[c[1]['priority']], -c[1]['tier'])
+                )
+                return self._set_tier(camera_id, state, state['tier'] - 1, 'recovered', pressure, now)
+        return None
+
+    def should_process(self, camera_id) -> bool:
+        """Whether this camera's next frame fits its current analysis FPS."""
+        now = self.clock()
+        with self._lock:
+            state = self.cameras.get(camera_id)
+            if state is None:
+                return True
+            scale = TIERS[state['tier']]['fps_scale']
+            if scale < 1.0:
+                fps = state['base_fps'] * scale
+                # Small slack so capture jitter does not halve the target rate
+                if fps > 0 and now - state['last_processed'] < 0.9 / fps:
+                    return False
+            state['last_processed'] = now
+            return True
+
+    def apply_resolution(self, camera_id, frame: np.ndarray,
+                         size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """Resize a frame for analysis at the camera's current tier.
+
+        The frame is resized to the configured `size` (width, height) if
+        given, then downscaled to the tier's longest side, so a configured
+        resolution never cancels the tier's downscale.
+        """
+        if size is not None and (frame.shape[1], frame.shape[0]) != tuple(size):
+            frame = cv2.resize(frame, tuple(size))
+        max_side = self.get_tier(camera_id)['max_side']
+        if max_side is None or max(frame.shape[:2]) <= max_side:
+            return frame
+        scale = max_side / float(max(frame.shape[:2]))
+        size = (int(frame.shape[1] * scale), int(frame.shape[0] * scale))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def to_capture_coordinates(detections: List[Dict[str, Any]], analysed_shape,
+                               capture_shape) -> List[Dict[str, Any]]:
+        """Map detection boxes from the analysed frame back to capture pixels."""
+        scale_y = capture_shape[0] / float(analysed_shape[0])
+        scale_x = capture_shape[1] / float(analysed_shape[1])
+        if scale_x == 1.0 and scale_y == 1.0:
+            return detections
+        scaled = []
+        for detection in detections:
+            x1, y1, x2, y2 = detection['bbox'][:4]
+            scaled.append({
+                **detection,
+                'bbox': [int(round(x1 * scale_x)), int(round(y1 * scale_y)),
+                         int(round(x2 * scale_x)), int(round(y2 * scale_y))]
+            })
+        return scaled
+
+    def model_for(self, camera_id, default: str = 'yolov5s') -> str:
+        return self.get_tier(camera_id).get('model') or default
+
+    def get_tier(self, camera_id) -> Dict[str, Any]:
+        with self._lock:
+            state = self.cameras.get(camera_id)
+            return TIERS[state['tier'] if state else 0]
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pressure': self.pressure(),
+                'cameras': {
+                    str(camera_id): {
+                        'priority': state['priority'],
+                        'tier': TIERS[state['tier']]['name'],
+                        'max_tier': TIERS[state['max_tier']]['name']
+                    }
+                    for camera_id, state in self.cameras.items()
+                },
+                'events': list(self.events)[-20:]
+            }
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        if stage not in self.stages:
+            self.stages[stage] = {'fill': 0.0, 'latencies': deque(maxlen=100), 'updated': self.clock()}
+        return self.stages[stage]
+
+    def _set_tier(self, camera_id, state: Dict[str, Any], tier: int, reason: str,
+                  pressure: float, now: float) -> Dict[str, Any]:
+        previous = state['tier']
+        state['tier'] = tier
+        self._last_change = now
+        event = {
+            'type': 'camera_tier_changed',
+            'camera_id': camera_id,
+            'priority': state['priority'],
+            'from_tier': TIERS[previous]['name'],
+            'to_tier': TIERS[tier]['name'],
+            'reason': reason,
+            'pressure': pressure,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        self.events.append(event)
+        logger.info(
+            f"Camera {camera_id} ({state['priority']}) {TIERS[previous]['name']} -> "
+            f"{TIERS[tier]['name']}: {reason}, pressure {pressure:.2f}"
+        )
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Error in load governor listener: {str(e)}")
+        return event
+
+
+load_governor = LoadGovernor()
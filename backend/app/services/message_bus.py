@@ -0,0 +1,169 @@
+import json
+import queue
+import threading
+import logging
+from collections import namedtuple
+from typing import Dict, Any, List, Optional, Sequence
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TopicPartition = namedtuple('TopicPartition', 'topic partition')
+BusRecord = namedtuple('BusRecord', 'topic partition offset key value')
+
+
+class KafkaBus:
+    """Message bus backed by Kafka; messages are JSON encoded and keyed."""
+
+    def __init__(self, bootstrap_servers: str = settings.KAFKA_BOOTSTRAP_SERVERS):
+        self.bootstrap_servers = bootstrap_servers.split(',')
+        self._producer = None
+        self._lock = threading.Lock()
+
+    @property
+    def producer(self):
+        with self._lock:
+            if self._producer is None:
+                from kafka import KafkaProducer
+                self._producer = KafkaProducer(
+                    bootstrap_servers=self.bootstrap_servers,
+                    key_serializer=lambda x: None if x is None else str(x).encode('utf-8'),
+                    value_serializer=lambda x: json.dumps(x).encode('utf-8')
+                )
+            return self._producer
+
+    def publish(self, topic: str, value: Dict[str, Any], key: Any = None):
+        """Send a message and wait for the broker to acknowledge it."""
+        self.producer.send(topic, value, key=key).get(timeout=10)
+
+    def subscribe(self, topics: Sequence[str], group_id: Optional[str] = None, listener=None):
+        """Consumer in `group_id`; `listener` gets partition revoke/assign callbacks."""
+        from kafka import KafkaConsumer, ConsumerRebalanceListener
+
+        class _Listener(ConsumerRebalanceListener):
+            def on_partitions_revoked(self, revoked):
+                listener.on_partitions_revoked(revoked)
+
+            def on_partitions_assigned(self, assigned):
+                listener.on_partitions_assigned(assigned)
+
+        consumer = KafkaConsumer(
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=group_id,
+            value_deserializer=lambda x: json.loads(x.decode('utf-8')),
+            auto_offset_reset='latest',
+            enable_auto_commit=True
+        )
+        consumer.subscribe(list(topics), listener=_Listener() if listener else None)
+        return consumer
+
+    def close(self):
+        with self._lock:
+            if self._producer is not None:
+                self._producer.close()
+                self._producer = None
+
+
+class InProcessConsumer:
+    """Consumer of an `InProcessBus`, with the `poll`/`assignment` API of KafkaConsumer."""
+
+    def __init__(self, bus: 'InProcessBus', topics: Sequence[str], listener=None):
+        self.bus = bus
+        self.topics = list(topics)
+        self.listener = listener
+        self.partitions = {TopicPartition(topic, 0) for topic in self.topics}
+        self._assigned = False
+
+    def poll(self, timeout_ms: int = 0, max_records: int = 500) -> Dict[TopicPartition, List[BusRecord]]:
+        if not self._assigned:
+            self._assigned = True
+            if self.listener:
+                self.listener.on_partitions_assigned(self.partitions)
+        return self.bus._take(self.topics, timeout_ms / 1000.0, max_records)
+
+    def assignment(self):
+        return set(self.partitions) if self._assigned else set()
+
+    def close(self):
+        self._assigned = False
+
+
+class InProcessBus:
+    """Broker-free message bus between components of one process.
+
+    Messages are passed as Python objects through one bounded queue per
+    topic, without serialization or a network hop. `publish` is thread
+    safe and blocks while a topic's queue is full, so a slow consumer
+    pushes back on producers. Each topic is a single partition with one
+    consumer, which keeps every camera's messages in order.
+    """
+
+    def __init__(self, maxsize: int = settings.MESSAGE_BUS_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.queues: Dict[str, queue.Queue] = {}
+        self.offsets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._available = threading.Condition()
+
+    def publish(self, topic: str, value: Any, key: Any = None):
+        with self._lock:
+            topic_queue = self._queue(topic)
+            offset = self.offsets[topic] = self.offsets.get(topic, -1) + 1
+        topic_queue.put(BusRecord(topic, 0, offset, key, value))
+        with self._available:
+            self._available.notify_all()
+
+    def subscribe(self, topics: Sequence[str], group_id: Optional[str] = None, listener=None):
+        with self._lock:
+            for topic in topics:
+                self._queue(topic)
+        return InProcessConsumer(self, topics, listener)
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {topic: {'depth': q.qsize(), 'published': self.offsets.get(topic, -1) + 1}
+                for topic, q in self.queues.items()}
+
+    def _queue(self, topic: str) -> queue.Queue:
+        if topic not in self.queues:
+            self.queues[topic] = queue.Queue(maxsize=self.maxsize)
+        return self.queues[topic]
+
+    def _drain(self, topics: Sequence[str], max_records: int) -> Dict[TopicPartition, List[BusRecord]]:
+        batches = {}
+        for topic in topics:
+            records = []
+            topic_queue = self.queues[topic]
+            while len(records) < max_records:
+                try:
+                    records.append(topic_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if records:
+                batches[TopicPartition(topic, 0)] = records
+        return batches
+
+    def _take(self, topics: Sequence[str], timeout: float,
+              max_records: int) -> Dict[TopicPartition, List[BusRecord]]:
+        batches = self._drain(topics, max_records)
+        if batches or timeout <= 0:
+            return batches
+        with self._available:
+            self._available.wait_for(
+                lambda: any(not self.queues[topic].empty() for topic in topics), timeout
+            )
+        return self._drain(topics, max_records)
+
+
+def create_message_bus(backend: str = settings.MESSAGE_BUS):
+    """Message bus for the configured backend ("kafka" or "inprocess")."""
+    if backend == 'kafka':
+        return KafkaBus()
+    if backend == 'inprocess':
+        return InProcessBus()
+    raise ValueError(f"Unknown message bus backend: {backend}")
+
+
+message_bus = create_message_bus()
@@ -0,0 +1,367 @@
+import numpy as np
+from typing import Dict, Any, List, Optional
+import asyncio
+import itertools
+import multiprocessing
+import logging
+import time
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from ..core.config import settings
+from ..core.runtime import available_cores
+
+logger = logging.getLogger(__name__)
+
+
+def _benchmark_config(model_path: str, batch_size: int, resolution: int,
+                      threads: int, runs: int, warmup: int) -> Dict[str, Any]:
+    """Benchmark one configuration; runs inside a fresh child process."""
+    import resource
+    import onnxruntime as ort
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+
+    start = time.perf_counter()
+    session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+    load_time_ms = (time.perf_counter() - start) * 1000
+
+    input_meta = session.get_inputs()[0]
+    channels = input_meta.shape[1] if isinstance(input_meta.shape[1], int) else 3
+    batch = np.random.default_rng(0).random(
+        (batch_size, channels, resolution, resolution), dtype=np.float32
+    )
+    feed = {input_meta.name: batch}
+
+    for _ in range(warmup):
+        session.run(None, feed)
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.run(None, feed)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    p50 = float(np.percentile(latencies, 50))
+    return {
+        'batch_size': batch_size,
+        'resolution': resolution,
+        'threads': threads,
+        'latency_ms': {
+            'p50': p50,
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99)),
+            'mean': float(np.mean(latencies))
+        },
+        'throughput_fps': batch_size * 1000.0 / p50 if p50 > 0 else 0.0,
+        'load_time_ms': load_time_ms,
+        'peak_rss_mb': peak_rss_kb / 1024.0,
+        'session_rss_mb': (peak_rss_kb - rss_before) / 1024.0
+    }
+
+
+def _benchmark_layout_worker(model_path: str, workers: int, worker_index: int, threads: int,
+                             affinity: bool, resolution: int, duration: float,
+                             barrier, results) -> None:
+    """One inference process of a thread layout; runs for `duration` seconds."""
+    from ..core.runtime import configure_runtime, ort_session_options
+    import onnxruntime as ort
+
+    try:
+        configure_runtime(workers, worker_index, threads, affinity=affinity, force=True)
+        session = ort.InferenceSession(model_path, ort_session_options(threads),
+                                       providers=['CPUExecutionProvider'])
+        input_meta = session.get_inputs()[0]
+        channels = input_meta.shape[1] if isinstance(input_meta.shape[1], int) else 3
+        feed = {input_meta.name: np.random.default_rng(worker_index).random(
+            (1, channels, resolution, resolution), dtype=np.float32
+        )}
+        for _ in range(3):
+            session.run(None, feed)
+    except Exception:
+        # Release the other workers before failing
+        barrier.abort()
+        raise
+
+    # All workers start timing together so their load overlaps
+    barrier.wait()
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        session.run(None, feed)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    results.put({
+        'worker_index': worker_index,
+        'frames': len(latencies),
+        'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies else 0.0
+    })
+
+
+class ModelBenchmark:
+    """Sweeps batch size, input resolution and thread count for a model on CPU.
+
+    Every configuration runs in its own spawned process so load time and
+    peak RSS are measured in isolation. Results are stored per model version
+    in MongoDB and summarized into ModelMetadata.performance_metrics.
+    """
+
+    DEFAULT_SWEEP = {
+        'batch_sizes': [1, 4],
+        'resolutions': [320, 640],
+        'threads': [1, 2, 4],
+        'runs': 50,
+        'warmup': 5
+    }
+
+    LAYOUT_DURATION_SECONDS = 10.0
+
+    def __init__(self):
+        self._mongo_client = None
+
+    @property
+    def db(self):
+        if self._mongo_client is None:
+            self._mongo_client = AsyncIOMotorClient(settings.MONGODB_URL)
+        return self._mongo_client['visioncave']
+
+    async def benchmark_model(self, model, sweep: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Benchmark a registered model and persist the results."""
+        sweep = {**self.DEFAULT_SWEEP, **(sweep or {})}
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, self.run_sweep, model.file_path, sweep)
+        summary = self.summarize(results)
+
+        document = {
+            'model_id': model.id,
+            'name': model.name,
+            'version': model.version,
+            'framework': model.framework,
+            'sweep': sweep,
+            'results': results,
+            'summary': summary,
+            'created_at': datetime.utcnow()
+        }
+        document['regression'] = await self._compare_with_previous(model.name, model.version, summary)
+
+        await self.db.model_benchmarks.insert_one(dict(document))
+        await self.db.model_metadata.update_one(
+            {'name': model.name, 'version': model.version},
+            {
+                '$set': {'performance_metrics': summary},
+                '$setOnInsert': {
+                    'type': model.type,
+                    'framework': model.framework,
+                    'parameters': model.configuration or {},
+                    'created_at': datetime.utcnow()
+                }
+            },
+            upsert=True
+        )
+
+        document.pop('_id', None)
+        return document
+
+    async def get_benchmarks(self, model_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the most recent benchmark runs for a model."""
+        cursor = (
+            self.db.model_benchmarks
+            .find({'model_id': model_id}, {'_id': 0})
+            .sort('created_at', -1)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    async def benchmark_thread_layouts(self, model, layouts: Optional[List[Dict[str, Any]]] = None,
+                                       duration: Optional[float] = None) -> Dict[str, Any]:
+        """Measure total throughput of concurrent workers per thread layout."""
+        layouts = layouts or self.default_layouts()
+        duration = duration or self.LAYOUT_DURATION_SECONDS
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            None, self.run_thread_layouts, model.file_path, layouts, duration
+        )
+
+        document = {
+            'model_id': model.id,
+            'name': model.name,
+            'version': model.version,
+            'cores': len(available_cores()),
+            'duration_seconds': duration,
+            'layouts': results,
+            'best': max(results, key=lambda r: r['throughput_fps']) if results else None,
+            'created_at': datetime.utcnow()
+        }
+        await self.db.thread_layout_benchmarks.insert_one(dict(document))
+        document.pop('_id', None)
+        return document
+
+    @staticmethod
+    def default_layouts() -> List[Dict[str, Any]]:
+        """Worker counts that split the cores evenly, plus an oversubscribed case."""
+        cores = len(available_cores())
+        layouts = []
+        workers = 1
+        while workers <= cores:
+            layouts.append({'workers': workers, 'threads': max(1, cores // workers), 'affinity': False})
+            if workers > 1:
+                layouts.append({'workers': workers, 'threads': max(1, cores // workers), 'affinity': True})
+            workers *= 2
+        if cores > 1:
+            # Every worker using every core: the default framework behaviour
+            layouts.append({'workers': 2, 'threads': cores, 'affinity': False})
+        return layouts
+
+    def run_thread_layouts(self, model_path: str, layouts: List[Dict[str, Any]],
+                           duration: float) -> List[Dict[str, Any]]:
+        """Run each layout with its workers in parallel spawned processes."""
+        _, resolutions = self._supported_shapes(model_path, {'batch_sizes': [1], 'resolutions': [640]})
+        ctx = multiprocessing.get_context('spawn')
+        results = []
+
+        for layout in layouts:
+            workers = layout['workers']
+            threads = layout.get('threads') or max(1, len(available_cores()) // workers)
+            affinity = layout.get('affinity', False)
+            barrier = ctx.Barrier(workers)
+            queue = ctx.Queue()
+            processes = [
+                ctx.Process(target=_benchmark_layout_worker, args=(
+                    model_path, workers, index, threads, affinity,
+                    resolutions[0], duration, barrier, queue
+                ))
+                for index in range(workers)
+            ]
+            for process in processes:
+                process.start()
+
+            reports = []
+            deadline = time.monotonic() + duration + 120
+            try:
+                while len(reports) < workers and time.monotonic() < deadline:
+                    try:
+                        reports.append(queue.get(timeout=1.0))
+                    except Exception:
+                        # A worker that died never reports; stop waiting for it
+                        if not any(process.is_alive() for process in processes) and queue.empty():
+                            break
+                if len(reports) < workers:
+                    logger.warning(
+                        f"Thread layout benchmark failed for workers={workers} "
+                        f"threads={threads}: {workers - len(reports)} worker(s) did not report"
+                    )
+            finally:
+                for process in processes:
+                    process.join(timeout=5)
+                    if process.is_alive():
+                        process.terminate()
+
+            if len(reports) != workers:
+                continue
+            frames = sum(r['frames'] for r in reports)
+            results.append({
+                'workers': workers,
+                'threads': threads,
+                'affinity': affinity,
+                'resolution': resolutions[0],
+                'throughput_fps': frames / duration,
+                'per_worker_fps': [r['frames'] / duration for r in sorted(reports, key=lambda r: r['worker_index'])],
+                'latency_p50_ms': float(np.median([r['latency_p50_ms'] for r in reports]))
+            })
+
+        return results
+
+    def run_sweep(self, model_path: str, sweep: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run every configuration of the sweep, one child process each."""
+        batch_sizes, resolutions = self._supported_shapes(model_path, sweep)
+        ctx = multiprocessing.get_context('spawn')
+        results = []
+
+        for batch_size, resolution, threads in itertools.product(
+            batch_sizes, resolutions, sweep['threads']
+        ):
+            pool = ctx.Pool(processes=1, maxtasksperchild=1)
+            try:
+                results.append(pool.apply(
+                    _benchmark_config,
+                    (model_path, batch_size, resolution, threads, sweep['runs'], sweep['warmup'])
+                ))
+            except Exception as e:
+                logger.warning(
+                    f"Benchmark failed for batch={batch_size} res={resolution} "
+                    f"threads={threads}: {str(e)}"
+                )
+            finally:
+                pool.close()
+                pool.join()
+
+        return results
+
+    @staticmethod
+    def summarize(results: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Flatten results into the metrics stored on ModelMetadata."""
+        if not results:
+            return {}
+
+        # Single frame latency at the largest resolution, best thread count
+        single = [r for r in results if r['batch_size'] == 1] or results
+        max_resolution = max(r['resolution'] for r in single)
+        best = min(
+            (r for r in single if r['resolution'] == max_resolution),
+            key=lambda r: r['latency_ms']['p50']
+        )
+
+        return {
+            'latency_p50_ms': best['latency_ms']['p50'],
+            'latency_p95_ms': best['latency_ms']['p95'],
+            'latency_p99_ms': best['latency_ms']['p99'],
+            'resolution': float(best['resolution']),
+            'threads': float(best['threads']),
+            'max_throughput_fps': max(r['throughput_fps'] for r in results),
+            'peak_rss_mb': max(r['peak_rss_mb'] for r in results),
+            'load_time_ms': float(np.median([r['load_time_ms'] for r in results]))
+        }
+
+    async def _compare_with_previous(self, name: str, version: str,
+                                     summary: Dict[str, float]) -> Dict[str, Any]:
+        """Compare against the latest benchmark of a different version."""
+        previous = await self.db.model_benchmarks.find_one(
+            {'name': name, 'version': {'$ne': version}},
+            sort=[('created_at', -1)]
+        )
+        if not previous or not previous.get('summary') or not summary:
+            return {'baseline_version': None, 'regressed': False}
+
+        baseline = previous['summary']
+        change = (
+            (summary['latency_p50_ms'] - baseline['latency_p50_ms'])
+            / baseline['latency_p50_ms']
+        ) if baseline.get('latency_p50_ms') else 0.0
+
+        return {
+            'baseline_version': previous['version'],
+            'latency_p50_change': change,
+            'regressed': change > settings.BENCHMARK_REGRESSION_TOLERANCE
+        }
+
+    @staticmethod
+    def _supported_shapes(model_path: str, sweep: Dict[str, Any]):
+        """Restrict the sweep to shapes a model with static dims accepts."""
+        import onnx
+
+        dims = onnx.load(model_path, load_external_data=False).graph.input[0].type.tensor_type.shape.dim
+        batch_dim = dims[0].dim_value if len(dims) == 4 else 0
+        height_dim = dims[2].dim_value if len(dims) == 4 else 0
+
+        batch_sizes = [batch_dim] if batch_dim else sweep['batch_sizes']
+        resolutions = [height_dim] if height_dim else sweep['resolutions']
+        return batch_sizes, resolutions
+
+
+model_benchmark = ModelBenchmark()
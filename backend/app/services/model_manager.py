@@ -1,10 +1,8 @@
-import torch
-import tensorflow as tf
-import onnx
 import numpy as np
 from typing import Dict, Any, List, Optional, BinaryIO
 import os
 import json
+import shutil
 import hashlib
 from datetime import datetime
 import logging
@@ -12,6 +10,8 @@ from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
 from ..models.sql_models import Model
 from ..core.config import settings
+from ..core.runtime import get_torch_device, import_torch, import_tensorflow
+from .model_optimizer import ModelOptimizer
 import asyncio
 import aiofiles
 import requests
@@ -23,11 +23,15 @@ class ModelManager:
     def __init__(self):
         self.model_cache = {}
         self.model_configs = {}
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.optimizer = ModelOptimizer()
         
         # Ensure model directory exists
         os.makedirs(settings.MODEL_DIR, exist_ok=True)
 
+    @property
+    def device(self):
+        return get_torch_device()
+
     async def upload_model(
         self,
         db: Session,
@@ -65,7 +69,7 @@ class ModelManager:
             db.refresh(model)
             
             # Validate and optimize model
-            await self._process_uploaded_model(model)
+            await self._process_uploaded_model(model, db)
             
             return model
         except Exception as e:
@@ -108,7 +112,7 @@ class ModelManager:
             db.refresh(model)
             
             # Validate and optimize model
-            await self._process_uploaded_model(model)
+            await self._process_uploaded_model(model, db)
             
             return model
         except Exception as e:
@@ -167,9 +171,10 @@ class ModelManager:
             if os.path.exists(model.file_path):
                 os.remove(model.file_path)
             
-            config_path = os.path.join(settings.MODEL_DIR, f"{model_id}_config.json")
-            if os.path.exists(config_path):
-                os.remove(config_path)
+            for suffix in ("_config.json", "_fp32.onnx"):
+                extra_path = os.path.join(settings.MODEL_DIR, f"{model_id}{suffix}")
+                if os.path.exists(extra_path):
+                    os.remove(extra_path)
             
             # Unload from memory
             await self.unload_model(model_id)
@@ -185,31 +190,52 @@ class ModelManager:
             return False
 
     async def optimize_model(
-        self, model_id: str, optimization_config: Dict[str, Any]
+        self,
+        model_id: str,
+        optimization_config: Dict[str, Any],
+        db: Optional[Session] = None
     ) -> bool:
-        """Optimize a model for inference."""
+        """Optimize a model for inference.
+
+        Builds fused and INT8 (dynamic and statically calibrated) variants,
+        benchmarks them on CPU against the FP32 model and keeps the fastest
+        variant that still agrees with FP32. The report is recorded in the
+        model's configuration.
+        """
         try:
             model_path = os.path.join(settings.MODEL_DIR, f"{model_id}.onnx")
-            optimized_path = os.path.join(settings.MODEL_DIR, f"{model_id}_optimized.onnx")
+            fp32_path = os.path.join(settings.MODEL_DIR, f"{model_id}_fp32.onnx")
             
-            # Load original model
-            model = onnx.load(model_path)
+            # Keep the original FP32 model as the baseline for re-optimization
+            if not os.path.exists(fp32_path):
+                shutil.copyfile(model_path, fp32_path)
+            shutil.copyfile(fp32_path, model_path)
             
-            # Apply optimizations
-            if optimization_config.get('quantization'):
-                model = self._quantize_model(model)
-            
-            if optimization_config.get('pruning'):
-                model = self._prune_model(model)
+            loop = asyncio.get_running_loop()
+            report = await loop.run_in_executor(
+                None, self.optimizer.optimize, model_path, optimization_config
+            )
+            logger.info(
+                f"Optimized model {model_id}: {report['variant']} "
+                f"p50={report['latency_ms']['p50']:.1f}ms agreement={report['agreement']:.3f}"
+            )
             
-            # Save optimized model
-            onnx.save(model, optimized_path)
+            # Drop any cached copy of the previous variant
+            await self.unload_model(model_id)
             
-            # Update model path
-            os.replace(optimized_path, model_path)
+            if db is not None:
+                model = db.query(Model).filter(Model.id == model_id).first()
+                if model:
+                    model.configuration = {
+                        **(model.configuration or {}),
+                        'optimization': report
+                    }
+                    db.commit()
             
             return True
         except Exception as e:
+            if db is not None:
+                db.rollback()
             logger.error(f"Error optimizing model {model_id}: {str(e)}")
             return False
 
@@ -263,7 +289,7 @@ class ModelManager:
             hash_input += hashlib.md5(file.read()).hexdigest()
         return hashlib.sha256(hash_input.encode()).hexdigest()[:16]
 
-    async def _process_uploaded_model(self, model: Model):
+    async def _process_uploaded_model(self, model: Model, db: Optional[Session] = None):
         """Process and validate uploaded model."""
         try:
             # Convert to ONNX if needed
@@ -275,9 +301,8 @@ class ModelManager:
             
             # Optimize model
             await self.optimize_model(model.id, {
-                'quantization': True,
-                'pruning': False
-            })
+                'quantization': True
+            }, db)
             
             # Update model status
             model.status = 'ready'
@@ -287,50 +312,26 @@ class ModelManager:
             model.error_message = str(e)
             raise
 
-    def _load_pytorch_model(self, path: str, config: Dict[str, Any]) -> torch.nn.Module:
+    def _load_pytorch_model(self, path: str, config: Dict[str, Any]) -> Any:
         """Load PyTorch model."""
+        torch = import_torch()
         model = torch.jit.load(path, map_location=self.device)
         model.eval()
         return model
 
-    def _load_tensorflow_model(self, path: str, config: Dict[str, Any]) -> tf.keras.Model:
+    def _load_tensorflow_model(self, path: str, config: Dict[str, Any]) -> Any:
         """Load TensorFlow model."""
+        tf = import_tensorflow()
         return tf.saved_model.load(path)
 
-    def _load_onnx_model(self, path: str, config: Dict[str, Any]) -> onnx.ModelProto:
+    def _load_onnx_model(self, path: str, config: Dict[str, Any]) -> Any:
         """Load ONNX model."""
+        import onnx
         return onnx.load(path)
 
-    def _quantize_model(self, model: onnx.ModelProto) -> onnx.ModelProto:
-        """Quantize model to reduce size and improve inference speed."""
-        from onnxruntime.quantization import quantize_dynamic
-        
-        # Create temporary files for quantization
-        temp_input = "temp_model_input.onnx"
-        temp_output = "temp_model_output.onnx"
-        
-        try:
-            onnx.save(model, temp_input)
-            quantize_dynamic(
-                temp_input,
-                temp_output,
-                weight_type=onnx.TensorProto.INT8
-            )
-            quantized_model = onnx.load(temp_output)
-            return quantized_model
-        finally:
-            # Cleanup temporary files
-            for temp_file in [temp_input, temp_output]:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-
-    def _prune_model(self, model: onnx.ModelProto) -> onnx.ModelProto:
-        """Prune model to remove unnecessary weights."""
-        # Implement model pruning logic here
-        return model
-
     def _validate_onnx_model(self, path: str):
         """Validate ONNX model structure."""
+        import onnx
         model = onnx.load(path)
         onnx.checker.check_model(model)
 
@@ -8,10 +8,6 @@ import logging
 import json
 import os
 from ..core.config import settings
-import pandas as pd
-from sklearn.metrics import confusion_matrix, classification_report
-import plotly.graph_objects as go
-import plotly.express as px
 
 logger = logging.getLogger(__name__)
 
@@ -164,6 +160,7 @@ class ModelMonitor:
         y_pred = [p.prediction for p in predictions]
         
         # Calculate metrics
+        from sklearn.metrics import confusion_matrix, classification_report
         conf_matrix = confusion_matrix(y_true, y_pred)
         class_report = classification_report(y_true, y_pred, output_dict=True)
         
@@ -214,6 +211,9 @@ class ModelMonitor:
             .all()
         )
         
+        import pandas as pd
+        import plotly.express as px
+
         # Convert to DataFrame
         df = pd.DataFrame([
             {
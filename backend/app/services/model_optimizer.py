@@ -0,0 +1,329 @@
+import numpy as np
+import cv2
+from typing import Dict, Any, List, Optional, Tuple
+import os
+import glob
+import random
+import shutil
+import tempfile
+import time
+import logging
+from datetime import datetime
+from .frame_context import FrameContext
+from ..core.config import settings
+from ..core.runtime import ort_session_options
+
+logger = logging.getLogger(__name__)
+
+
+class FrameCalibrationReader:
+    """Feeds preprocessed frames to ONNX Runtime static quantization."""
+
+    def __init__(self, input_name: str, batches: List[np.ndarray]):
+        self.input_name = input_name
+        self.batches = batches
+        self._iterator = iter(batches)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        batch = next(self._iterator, None)
+        return None if batch is None else {self.input_name: batch}
+
+    def rewind(self):
+        self._iterator = iter(self.batches)
+
+
+class ModelOptimizer:
+    """Builds optimized ONNX variants of a model and picks the best one.
+
+    Every variant (operator fusion, dynamic INT8, static INT8 calibrated on
+    stored frames) is measured for CPU latency/throughput and compared with
+    the FP32 model on frames held out of calibration. The fastest variant
+    whose detection agreement stays above the configured threshold wins,
+    falling back to FP32. Static INT8 is only built from stored frames,
+    never from the random input used when none exist.
+    """
+
+    def __init__(self, frames_dir: Optional[str] = None):
+        self.frames_dir = str(frames_dir or settings.CALIBRATION_FRAMES_DIR)
+
+    def optimize(self, model_path: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Optimize `model_path` in place and return the optimization report."""
+        min_agreement = config.get('min_agreement', settings.OPTIMIZATION_MIN_AGREEMENT)
+        runs = config.get('benchmark_runs', settings.OPTIMIZATION_BENCHMARK_RUNS)
+        validation_fraction = config.get('validation_fraction', settings.OPTIMIZATION_VALIDATION_FRACTION)
+
+        # Isolated working directory so concurrent jobs never share files
+        with tempfile.TemporaryDirectory(prefix='visioncave_optimize_') as work_dir:
+            fp32_path = os.path.join(work_dir, 'fp32.onnx')
+            shutil.copyfile(model_path, fp32_path)
+
+            session = self._create_session(fp32_path)
+            input_meta = session.get_inputs()[0]
+            samples, source = self._load_samples(
+                input_meta.shape,
+                config.get('calibration_samples', settings.CALIBRATION_SAMPLE_SIZE)
+            )
+            calibration, validation = self._split_samples(samples, validation_fraction)
+            reference = [session.run(None, {input_meta.name: sample}) for sample in validation]
+
+            variants = {'fp32': fp32_path}
+            if config.get('fusion', True):
+                variants['fused'] = self._fuse_operators(fp32_path, work_dir)
+            if config.get('quantization'):
+                variants['int8_dynamic'] = self._quantize_dynamic(fp32_path, work_dir)
+                if config.get('static_calibration', True) and source == 'frames':
+                    variants['int8_static'] = self._quantize_static(
+                        fp32_path, work_dir, input_meta.name, calibration,
+                        per_channel=config.get('per_channel', False)
+                    )
+                elif config.get('static_calibration', True):
+                    logger.warning("Skipping static INT8: no stored frames to calibrate on")
+
+            results = []
+            for name, path in variants.items():
+                if path is None:
+                    continue
+                try:
+                    results.append(self._evaluate_variant(
+                        name, path, input_meta.name, validation, reference, runs
+                    ))
+                except Exception as e:
+                    logger.warning(f"Skipping {name} variant: {str(e)}")
+
+            by_name = {r['variant']: r for r in results}
+            if 'fp32' not in by_name:
+                # Without a baseline nothing can be compared; the model is left as is
+                raise RuntimeError("FP32 model could not be benchmarked, keeping the original model")
+            eligible = [r for r in results if r['agreement'] >= min_agreement]
+            if eligible:
+                winner = min(eligible, key=lambda r: r['latency_ms']['p50'])
+            else:
+                logger.warning(f"No variant reached agreement {min_agreement}, keeping FP32")
+                winner = by_name['fp32']
+
+            if winner['variant'] != 'fp32':
+                shutil.copyfile(variants[winner['variant']], model_path)
+
+        return {
+            'variant': winner['variant'],
+            'latency_ms': winner['latency_ms'],
+            'throughput_fps': winner['throughput_fps'],
+            'agreement': winner['agreement'],
+            'min_agreement': min_agreement,
+            'calibration_source': source,
+            'calibration_samples': len(calibration),
+            'validation_samples': len(validation),
+            'variants': results,
+            'optimized_at': datetime.utcnow().isoformat()
+        }
+
+    def _create_session(self, path: str, optimized_path: Optional[str] = None,
+                        level: Optional[Any] = None):
+        """Create a CPU inference session."""
+        import onnxruntime as ort
+
+        options = ort_session_options()
+        if level is not None:
+            options.graph_optimization_level = level
+        if optimized_path:
+            options.optimized_model_filepath = optimized_path
+        return ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def _fuse_operators(self, fp32_path: str, work_dir: str) -> str:
+        """Apply ONNX Runtime graph fusions and save the fused graph."""
+        import onnxruntime as ort
+
+        fused_path = os.path.join(work_dir, 'fused.onnx')
+        self._create_session(
+            fp32_path, optimized_path=fused_path,
+            level=ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        )
+        return fused_path
+
+    def _quantize_dynamic(self, fp32_path: str, work_dir: str) -> Optional[str]:
+        """Quantize weights to INT8, activations stay in float."""
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        output_path = os.path.join(work_dir, 'int8_dynamic.onnx')
+        try:
+            quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+            return output_path
+        except Exception as e:
+            logger.warning(f"Dynamic quantization failed: {str(e)}")
+            return None
+
+    def _quantize_static(self, fp32_path: str, work_dir: str, input_name: str,
+                         samples: List[np.ndarray], per_channel: bool = False) -> Optional[str]:
+        """Quantize weights and activations to INT8 using calibration frames."""
+        from onnxruntime.quantization import (
+            quantize_static, QuantFormat, QuantType, CalibrationMethod
+        )
+
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        output_path = os.path.join(work_dir, 'int8_static.onnx')
+        try:
+            # Shape inference and graph cleanup give better quantization ranges
+            source_path = os.path.join(work_dir, 'int8_static_input.onnx')
+            try:
+                quant_pre_process(fp32_path, source_path)
+            except Exception as e:
+                logger.debug(f"Quantization pre-processing skipped: {str(e)}")
+                source_path = fp32_path
+
+            quantize_static(
+                source_path,
+                output_path,
+                FrameCalibrationReader(input_name, samples),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=per_channel,
+                calibrate_method=CalibrationMethod.MinMax
+            )
+            return output_path
+        except Exception as e:
+            logger.warning(f"Static quantization failed: {str(e)}")
+            return None
+
+    def _evaluate_variant(self, name: str, path: str, input_name: str,
+                          samples: List[np.ndarray], reference: List[List[np.ndarray]],
+                          runs: int) -> Dict[str, Any]:
+        """Measure CPU latency and agreement with the FP32 outputs."""
+        session = self._create_session(path)
+
+        # Warm up allocations and kernels before timing
+        session.run(None, {input_name: samples[0]})
+
+        latencies = []
+        for i in range(max(runs, 1)):
+            sample = samples[i % len(samples)]
+            start = time.perf_counter()
+            session.run(None, {input_name: sample})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        agreements = [
+            self._detection_agreement(expected, session.run(None, {input_name: sample}))
+            for sample, expected in zip(samples, reference)
+        ]
+
+        batch = samples[0].shape[0]
+        p50 = float(np.percentile(latencies, 50))
+        return {
+            'variant': name,
+            'size_bytes': os.path.getsize(path),
+            'latency_ms': {
+                'p50': p50,
+                'p95': float(np.percentile(latencies, 95)),
+                'mean': float(np.mean(latencies))
+            },
+            'throughput_fps': batch * 1000.0 / p50 if p50 > 0 else 0.0,
+            'agreement': float(np.mean(agreements))
+        }
+
+    def _load_samples(self, input_shape: List[Any], limit: int) -> Tuple[List[np.ndarray], str]:
+        """Load and preprocess a random sample of stored frames.
+
+        Returns the samples and their source, 'frames' or 'random' when no
+        stored frames exist.
+        """
+        height, width = self._input_size(input_shape)
+        paths = []
+        for pattern in ('*.jpg', '*.jpeg', '*.png'):
+            paths.extend(glob.glob(os.path.join(self.frames_dir, '**', pattern), recursive=True))
+
+        random.shuffle(paths)
+        samples = []
+        for path in paths[:limit]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                samples.append(self._preprocess(frame, height, width))
+
+        if samples:
+            return samples, 'frames'
+
+        # No stored frames yet: fall back to noise so fusion and dynamic INT8 still run
+        logger.warning(f"No calibration frames found in {self.frames_dir}, using random input")
+        rng = np.random.default_rng(0)
+        samples = [
+            self._preprocess(rng.integers(0, 255, (height, width, 3), dtype=np.uint8),
+                             height, width)
+            for _ in range(min(limit, 8))
+        ]
+        return samples, 'random'
+
+    @staticmethod
+    def _split_samples(samples: List[np.ndarray],
+                       validation_fraction: float) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Hold out part of the samples so agreement is not measured on the calibration set."""
+        if len(samples) < 2:
+            return samples, samples
+        held_out = min(len(samples) - 1, max(1, int(round(len(samples) * validation_fraction))))
+        return samples[held_out:], samples[:held_out]
+
+    @staticmethod
+    def _input_size(input_shape: List[Any]) -> Tuple[int, int]:
+        """Resolve (height, width) from an NCHW input, defaulting dynamic dims."""
+        dims = list(input_shape)[-2:]
+        height = dims[0] if isinstance(dims[0], int) and dims[0] > 0 else 640
+        width = dims[1] if isinstance(dims[1], int) and dims[1] > 0 else 640
+        return height, width
+
+    @staticmethod
+    def _preprocess(frame: np.ndarray, height: int, width: int) -> np.ndarray:
+        """Convert a BGR frame to a normalized NCHW float batch of one."""
+        ctx = FrameContext(frame)
+        if height == width:
+            image = ctx.letterbox(height)['image']
+        else:
+            image = ctx.resized((width, height), source='rgb')
+        return np.ascontiguousarray(
+            image.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        )
+
+    @staticmethod
+    def _detection_agreement(expected: List[np.ndarray], actual: List[np.ndarray],
+                             conf_threshold: float = 0.25, iou_threshold: float = 0.5) -> float:
+        """Score how closely a variant reproduces the FP32 detections.
+
+        YOLO style outputs (batch, candidates, 5 + classes) are decoded and
+        matched by class and IoU, giving an F1 score. Other outputs fall back
+        to cosine similarity.
+        """
+        ref, out = expected[0], actual[0]
+        if ref.ndim != 3 or ref.shape[-1] < 6:
+            a, b = ref.ravel().astype(np.float64), out.ravel().astype(np.float64)
+            denom = np.linalg.norm(a) * np.linalg.norm(b)
+            return float(np.dot(a, b) / denom) if denom > 0 else 1.0
+
+        def decode(pred: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            scores = pred[:, 4:5] * pred[:, 5:]
+            classes = scores.argmax(axis=1)
+            confidence = scores.max(axis=1)
+            keep = np.argsort(-confidence)[:300]
+            keep = keep[confidence[keep] >= conf_threshold]
+            xywh = pred[keep, :4]
+            boxes = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2,
+                                    xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+            return boxes, classes[keep]
+
+        ref_boxes, ref_classes = decode(ref[0])
+        out_boxes, out_classes = decode(out[0])
+        if len(ref_boxes) == 0 and len(out_boxes) == 0:
+            return 1.0
+        if len(ref_boxes) == 0 or len(out_boxes) == 0:
+            return 0.0
+
+        lt = np.maximum(ref_boxes[:, None, :2], out_boxes[None, :, :2])
+        rb = np.minimum(ref_boxes[:, None, 2:], out_boxes[None, :, 2:])
+        inter = np.clip(rb - lt, 0, None).prod(axis=2)
+        area_ref = (ref_boxes[:, 2:] - ref_boxes[:, :2]).prod(axis=1)
+        area_out = (out_boxes[:, 2:] - out_boxes[:, :2]).prod(axis=1)
+        iou = inter / (area_ref[:, None] + area_out[None, :] - inter + 1e-9)
+        iou[ref_classes[:, None] != out_classes[None, :]] = 0
+
+        recall = np.count_nonzero(iou.max(axis=1) >= iou_threshold) / len(ref_boxes)
+        precision = np.count_nonzero(iou.max(axis=0) >= iou_threshold) / len(out_boxes)
+        if precision + recall == 0:
+            return 0.0
+        return float(2 * precision * recall / (precision + recall))
@@ -1,68 +1,99 @@
-import torch
 import numpy as np
 from typing import Dict, Any, Optional
+import asyncio
 import logging
+import sys
+import time
+from datetime import datetime
 from .video_analytics_service import VideoAnalyticsService
+from .model_store import model_store
 from ..core.config import settings
+from ..core.runtime import get_torch_device
 
 logger = logging.getLogger(__name__)
 
 class ModelProcessorService:
+    # Config keys that require loading a different model; others apply in place
+    RELOAD_KEYS = ('model_size', 'weights', 'model_type')
+
     def __init__(self):
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.models = {}
+        self.configs = {}
+        self.swap_status = {}
         self.video_analytics = VideoAnalyticsService()
+        # Frames currently running on each model instance, for draining
+        self._in_flight: Dict[int, int] = {}
+        self._swap_locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def device(self):
+        return get_torch_device()
 
     async def initialize_model(self, model_type: str, config: Dict[str, Any]) -> None:
         """Initialize a specific model with configuration"""
         try:
-            if model_type == "yolov5":
-                model_size = config.get('model_size', 'yolov5s')
-                self.models[model_type] = torch.hub.load(
-                    'ultralytics/yolov5', 
-                    model_size, 
-                    pretrained=True
-                ).to(self.device)
-                
-            elif model_type == "poseDetection":
-                # Initialize pose detection model
-                if config.get('model_type') == 'movenet':
-                    # Initialize MoveNet
-                    pass
-                else:
-                    # Initialize BlazePose
-                    pass
-                    
-            elif model_type == "faceDetection":
-                # Initialize face detection/recognition model
-                pass
-                
-            elif model_type == "activityRecognition":
-                # Initialize activity recognition model
-                pass
-                
-            elif model_type == "attentionAnalysisModel":
-                # Initialize attention analysis model
-                pass
-                
-            elif model_type == "vehicleAnalysis":
-                # Initialize vehicle analysis model
-                pass
-                
-            elif model_type == "ppeDetection":
-                # Initialize PPE detection model
-                pass
-                
-            elif model_type == "anomalyDetection":
-                # Initialize anomaly detection model
-                pass
-                
+            loop = asyncio.get_running_loop()
+            model = await loop.run_in_executor(None, self._load_model, model_type, config)
+            self.models[model_type] = model
+            self.configs[model_type] = dict(config)
             logger.info(f"Successfully initialized {model_type} model")
             
         except Exception as e:
             logger.error(f"Error initializing {model_type} model: {str(e)}")
             raise
 
+    def _load_model(self, model_type: str, config: Dict[str, Any]) -> Any:
+        """Load a model instance; blocking, so callers run it in an executor"""
+        if model_type == "yolov5":
+            model_size = config.get('model_size', 'yolov5s')
+            return model_store.load_yolov5(model_size).to(self.device)
+            
+        elif model_type == "poseDetection":
+            # Initialize pose detection model
+            if config.get('model_type') == 'movenet':
+                # Initialize MoveNet
+                pass
+            else:
+                # Initialize BlazePose
+                pass
+                
+        elif model_type == "faceDetection":
+            # Initialize face detection/recognition model
+            pass
+            
+        elif model_type == "activityRecognition":
+            # Initialize activity recognition model
+            pass
+            
+        elif model_type == "attentionAnalysisModel":
+            # Initialize attention analysis model
+            pass
+            
+        elif model_type == "vehicleAnalysis":
+            # Initialize vehicle analysis model
+            pass
+            
+        elif model_type == "ppeDetection":
+            # Initialize PPE detection model
+            pass
+            
+        elif model_type == "anomalyDetection":
+            # Initialize anomaly detection model
+            pass
+        return None
+
+    def _smoke_test(self, model_type: str, model: Any) -> None:
+        """Run a blank frame through a freshly loaded model; raises if unusable.
+
+        Doubles as warm-up so the first real frame after a swap is not slow.
+        """
+        if model_type == "yolov5":
+            frame = np.zeros((640, 640, 3), dtype=np.uint8)
+            detections = model(frame).pandas().xyxy[0]
+            missing = {'confidence', 'name'} - set(detections.columns)
+            if missing:
+                raise RuntimeError(f"Model output is missing columns: {sorted(missing)}")
+
     async def process_frame(self, 
                           model_type: str, 
                           frame: np.ndarray, 
@@ -75,8 +106,15 @@ class ModelProcessorService:
                     await self.initialize_model(model_type, config or {})
                     model = self.models[model_type]
                 
+                config = {**self.configs.get(model_type, {}), **(config or {})}
                 confidence = config.get('confidence_threshold', 0.25)
-                results = model(frame)
+                # Hold this instance for the whole frame so a swap can drain it
+                self._in_flight[id(model)] = self._in_flight.get(id(model), 0) + 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    results = await loop.run_in_executor(None, model, frame)
+                finally:
+                    self._release(model)
                 detections = results.pandas().xyxy[0]
                 
                 # Filter by confidence
@@ -122,17 +160,79 @@ class ModelProcessorService:
             logger.error(f"Error processing frame with {model_type}: {str(e)}")
             raise
 
-    async def update_model_config(self, model_type: str, config: Dict[str, Any]) -> None:
-        """Update model configuration"""
+    async def update_model_config(self, model_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Update model configuration, hot-swapping the model if needed"""
         try:
-            if model_type in self.models:
-                # Reinitialize model with new config
-                await self.initialize_model(model_type, config)
-            else:
+            if model_type not in self.models:
                 logger.warning(f"Model {model_type} not initialized")
+                return {'status': 'not_initialized'}
+
+            current = self.configs.get(model_type, {})
+            if all(current.get(key) == config.get(key) for key in self.RELOAD_KEYS):
+                # Thresholds and other runtime settings apply without a reload
+                self.configs[model_type] = {**current, **config}
+                return {'status': 'updated'}
+
+            return await self.hot_swap(model_type, config)
                 
         except Exception as e:
             logger.error(f"Error updating {model_type} config: {str(e)}")
             raise
 
+    async def hot_swap(self, model_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Load, smoke test and atomically switch to a new model instance.
+
+        Frames keep running on the current model while the new one loads.
+        If loading or the smoke test fails the current model stays active.
+        The old instance is released once its in-flight frames finish.
+        """
+        lock = self._swap_locks.setdefault(model_type, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            try:
+                model = await loop.run_in_executor(None, self._load_model, model_type, config)
+                await loop.run_in_executor(None, self._smoke_test, model_type, model)
+            except Exception as e:
+                logger.error(f"Hot-swap of {model_type} failed, keeping current model: {str(e)}")
+                self.swap_status[model_type] = {
+                    'status': 'failed',
+                    'error': str(e),
+                    'timestamp': datetime.utcnow().isoformat()
+                }
+                return self.swap_status[model_type]
+
+            # Single reference assignment: frames already running keep the old instance
+            old_model = self.models.get(model_type)
+            self.models[model_type] = model
+            self.configs[model_type] = dict(config)
+            if old_model is not None:
+                asyncio.ensure_future(self._drain(model_type, old_model))
+
+            self.swap_status[model_type] = {
+                'status': 'swapped',
+                'load_seconds': time.perf_counter() - started,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            logger.info(f"Hot-swapped {model_type} model in {self.swap_status[model_type]['load_seconds']:.1f}s")
+            return self.swap_status[model_type]
+
+    async def _drain(self, model_type: str, model: Any, timeout: float = 60.0):
+        """Wait for frames still using a replaced model, then free it"""
+        deadline = time.monotonic() + timeout
+        while self._in_flight.get(id(model), 0) > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._in_flight.pop(id(model), 0) > 0:
+            logger.warning(f"Releasing old {model_type} model with frames still in flight")
+        del model
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _release(self, model: Any):
+        key = id(model)
+        self._in_flight[key] = self._in_flight.get(key, 1) - 1
+        if self._in_flight[key] <= 0:
+            del self._in_flight[key]
+
 model_processor = ModelProcessorService()
@@ -0,0 +1,293 @@
+import io
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import threading
+import subprocess
+import zipfile
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from ..core.config import settings
+from ..core.runtime import import_torch, ort_session_options
+
+logger = logging.getLogger(__name__)
+
+YOLOV5_REPO_URL = "https://github.com/ultralytics/yolov5/archive/refs/tags/{release}.zip"
+YOLOV5_WEIGHTS_URL = "https://github.com/ultralytics/yolov5/releases/download/{release}/{name}.pt"
+
+
+class ModelArtifactError(Exception):
+    """Raised when a model artifact is missing or fails its checksum."""
+
+
+class ModelArtifactStore:
+    """Local store of model weights, code snapshots and exports.
+
+    Artifacts are downloaded once (or imported from an archive on
+    air-gapped sites) into `MODEL_STORE_DIR`, with a sha256 for every file
+    in `manifest.json`. Loading always happens from local disk: YOLOv5 via
+    `torch.hub.load(..., source='local')` against a pinned repo snapshot,
+    so no call ever reaches GitHub at startup.
+    """
+
+    def __init__(self, root: Optional[Path] = None,
+                 allow_download: bool = settings.MODEL_STORE_ALLOW_DOWNLOAD):
+        self.root = Path(root or settings.MODEL_STORE_DIR)
+        self.allow_download = allow_download
+        self._lock = threading.RLock()
+        self._verified = set()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / 'manifest.json'
+
+    def manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {'artifacts': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def list_artifacts(self) -> Dict[str, Any]:
+        return self.manifest()['artifacts']
+
+    def has(self, name: str) -> bool:
+        return name in self.list_artifacts()
+
+    def path(self, name: str, filename: Optional[str] = None) -> Path:
+        """Verified local path of an artifact (or one of its files)."""
+        self.verify(name)
+        directory = self.root / name
+        return directory / filename if filename else directory
+
+    # Loading
+
+    def load_yolov5(self, name: str = 'yolov5s'):
+        """Load a YOLOv5 model from the local repo snapshot and weights."""
+        self.ensure_yolov5(name)
+        torch = import_torch()
+        repo_dir = self.path(self._yolov5_repo_name())
+        weights = self.path(name, f'{name}.pt')
+        return torch.hub.load(str(repo_dir), 'custom', path=str(weights), source='local')
+
+    def load_torchscript(self, name: str, map_location=None):
+        """Load the TorchScript export of an artifact."""
+        torch = import_torch()
+        return torch.jit.load(str(self.path(name, f'{name}.torchscript')), map_location=map_location)
+
+    def load_onnx(self, name: str):
+        """Create a CPU ONNX Runtime session for the ONNX export of an artifact."""
+        import onnxruntime as ort
+        return ort.InferenceSession(str(self.path(name, f'{name}.onnx')), ort_session_options(),
+                                    providers=['CPUExecutionProvider'])
+
+    def load_keypointrcnn(self, name: str = 'keypointrcnn_resnet50_fpn'):
+        """Torchvision Keypoint R-CNN with locally stored weights."""
+        if not self.has(name):
+            self._require_download(name)
+            self.fetch_keypointrcnn(name)
+        torch = import_torch()
+        from torchvision.models.detection import keypointrcnn_resnet50_fpn
+
+        model = keypointrcnn_resnet50_fpn(weights=None, weights_backbone=None)
+        model.load_state_dict(torch.load(str(self.path(name, f'{name}.pth')), map_location='cpu'))
+        return model
+
+    # Populating
+
+    def ensure_yolov5(self, name: str = 'yolov5s'):
+        """Make sure the repo snapshot and weights for `name` are in the store."""
+        with self._lock:
+            if not self.has(self._yolov5_repo_name()):
+                self._require_download(self._yolov5_repo_name())
+                self.fetch_yolov5_repo()
+            if not self.has(name):
+                self._require_download(name)
+                self.fetch_yolov5_weights(name)
+
+    def fetch_yolov5_repo(self, release: str = settings.YOLOV5_RELEASE):
+        """Download a pinned YOLOv5 code snapshot (the torch.hub entrypoint)."""
+        name = self._yolov5_repo_name(release)
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / 'yolov5.zip'
+            self._download(YOLOV5_REPO_URL.format(release=release), archive)
+            with zipfile.ZipFile(archive) as zf:
+                zf.extractall(tmp)
+            extracted = next(p for p in Path(tmp).iterdir() if p.is_dir())
+            self._install_directory(name, extracted, source=YOLOV5_REPO_URL.format(release=release))
+
+    def fetch_yolov5_weights(self, name: str, release: str = settings.YOLOV5_RELEASE,
+                             export: bool = True):
+        """Download YOLOv5 weights once and store TorchScript/ONNX exports with them."""
+        with tempfile.TemporaryDirectory() as tmp:
+            weights = Path(tmp) / f'{name}.pt'
+            self._download(YOLOV5_WEIGHTS_URL.format(release=release, name=name), weights)
+            self.import_file(name, weights, source=YOLOV5_WEIGHTS_URL.format(release=release, name=name),
+                             export=export)
+
+    def fetch_keypointrcnn(self, name: str = 'keypointrcnn_resnet50_fpn'):
+        """Download torchvision Keypoint R-CNN weights and store the state dict."""
+        torch = import_torch()
+        from torchvision.models.detection import keypointrcnn_resnet50_fpn
+
+        model = keypointrcnn_resnet50_fpn(weights='DEFAULT')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f'{name}.pth'
+            torch.save(model.state_dict(), str(path))
+            self._install_files(name, [path], source='torchvision')
+
+    def import_file(self, name: str, path: Path, source: Optional[str] = None, export: bool = False):
+        """Add a weights file (or ONNX/TorchScript model) from local disk."""
+        path = Path(path)
+        suffix = path.suffix if path.suffix in ('.pt', '.pth', '.onnx', '.torchscript') else '.pt'
+        with tempfile.TemporaryDirectory() as tmp:
+            staged = Path(tmp) / f'{name}{suffix}'
+            shutil.copyfile(path, staged)
+            files = [staged]
+            if export and suffix == '.pt':
+                files.extend(self._export_yolov5(staged))
+            self._install_files(name, files, source=source or str(path))
+
+    def export_archive(self, path: Path, names: Optional[List[str]] = None) -> Path:
+        """Pack artifacts and manifest into a tar.gz for air-gapped sites."""
+        manifest = self.manifest()
+        names = names or list(manifest['artifacts'])
+        subset = {'artifacts': {n: manifest['artifacts'][n] for n in names}}
+        path = Path(path)
+        with tarfile.open(path, 'w:gz') as tar:
+            for name in names:
+                self.verify(name)
+                tar.add(str(self.root / name), arcname=name)
+            data = json.dumps(subset, indent=2).encode()
+            info = tarfile.TarInfo('manifest.json')
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        return path
+
+    def import_archive(self, path: Path) -> List[str]:
+        """Install artifacts from an archive made by `export_archive`."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with tarfile.open(path, 'r:gz') as tar:
+                for member in tar.getmembers():
+                    target = (Path(tmp) / member.name).resolve()
+                    if not str(target).startswith(str(Path(tmp).resolve())):
+                        raise ModelArtifactError(f"Unsafe path in archive: {member.name}")
+                tar.extractall(tmp)
+            with open(Path(tmp) / 'manifest.json') as f:
+                incoming = json.load(f)['artifacts']
+
+            with self._lock:
+                for name, entry in incoming.items():
+                    self._check_files(Path(tmp) / name, entry['files'], name)
+                    destination = self.root / name
+                    if destination.exists():
+                        shutil.rmtree(destination)
+                    destination.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copytree(Path(tmp) / name, destination)
+                    self._update_manifest(name, entry)
+        logger.info(f"Imported model artifacts: {', '.join(incoming)}")
+        return list(incoming)
+
+    def verify(self, name: str):
+        """Check every file of an artifact against its recorded sha256 (once per process)."""
+        if name in self._verified:
+            return
+        entry = self.list_artifacts().get(name)
+        if entry is None:
+            raise ModelArtifactError(
+                f"Model artifact '{name}' is not in the local store at {self.root}; "
+                f"fetch it on a connected machine and import the archive"
+            )
+        self._check_files(self.root / name, entry['files'], name)
+        self._verified.add(name)
+
+    # Internals
+
+    def _require_download(self, name: str):
+        if not self.allow_download:
+            raise ModelArtifactError(
+                f"Model artifact '{name}' is missing and downloads are disabled "
+                f"(MODEL_STORE_ALLOW_DOWNLOAD=false); import it with import_archive"
+            )
+        logger.info(f"Model artifact '{name}' not found locally, fetching once")
+
+    @staticmethod
+    def _yolov5_repo_name(release: str = settings.YOLOV5_RELEASE) -> str:
+        return f"hub/yolov5-{release}"
+
+    @staticmethod
+    def _download(url: str, destination: Path):
+        torch = import_torch()
+        torch.hub.download_url_to_file(url, str(destination), progress=False)
+
+    def _export_yolov5(self, weights: Path) -> List[Path]:
+        """Export TorchScript and ONNX with the repo's own export script."""
+        repo_dir = self.path(self._yolov5_repo_name())
+        result = subprocess.run(
+            [sys.executable, str(repo_dir / 'export.py'), '--weights', str(weights),
+             '--include', 'torchscript', 'onnx', '--imgsz', '640'],
+            cwd=str(repo_dir), capture_output=True, text=True
+        )
+        exports = [weights.with_suffix(s) for s in ('.torchscript', '.onnx')]
+        if result.returncode != 0:
+            logger.warning(f"Export of {weights.name} failed: {result.stderr[-500:]}")
+        return [p for p in exports if p.exists()]
+
+    def _install_files(self, name: str, files: List[Path], source: str):
+        with tempfile.TemporaryDirectory() as tmp:
+            staging = Path(tmp) / 'artifact'
+            staging.mkdir()
+            for file in files:
+                shutil.copyfile(file, staging / file.name)
+            self._install_directory(name, staging, source)
+
+    def _install_directory(self, name: str, directory: Path, source: str):
+        files = {
+            str(p.relative_to(directory)): self._sha256(p)
+            for p in sorted(directory.rglob('*')) if p.is_file()
+        }
+        with self._lock:
+            destination = self.root / name
+            if destination.exists():
+                shutil.rmtree(destination)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copytree(directory, destination)
+            self._update_manifest(name, {
+                'files': files,
+                'source': source,
+                'created_at': datetime.utcnow().isoformat()
+            })
+            self._verified.add(name)
+
+    def _update_manifest(self, name: str, entry: Dict[str, Any]):
+        manifest = self.manifest()
+        manifest['artifacts'][name] = entry
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _check_files(self, directory: Path, files: Dict[str, str], name: str):
+        for relative, expected in files.items():
+            path = directory / relative
+            if not path.exists():
+                raise ModelArtifactError(f"Model artifact '{name}' is missing {relative}")
+            if self._sha256(path) != expected:
+                raise ModelArtifactError(f"Checksum mismatch for {relative} in model artifact '{name}'")
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+model_store = ModelArtifactStore()
@@ -0,0 +1,237 @@
+import cv2
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple, Union
+import itertools
+import threading
+import logging
+from .frame_context import FrameContext
+from ..core.config import settings
+from ..core.runtime import import_torch, ort_session_options
+from .model_store import model_store
+
+logger = logging.getLogger(__name__)
+
+
+class PoseEstimator:
+    """Top-down pose estimation on batched person crops.
+
+    Poses are only computed for persons that were detected, on fixed size
+    crops taken from the shared RGB view. Keypoints are cached per person
+    relative to their box and reused for `cache_frames` frames, following
+    the person's current box, separately for each camera; frames without
+    a camera id are not cached. Two backends are supported: torchvision's
+    Keypoint R-CNN run at crop resolution, or a lighter ONNX heatmap model.
+    """
+
+    NUM_KEYPOINTS = 17
+
+    def __init__(self,
+                 backend: str = settings.POSE_BACKEND,
+                 model_path: Optional[str] = None,
+                 crop_size: Tuple[int, int] = (settings.POSE_CROP_WIDTH, settings.POSE_CROP_HEIGHT),
+                 max_batch: int = settings.POSE_MAX_BATCH,
+                 cache_frames: int = settings.POSE_CACHE_FRAMES,
+                 min_confidence: float = settings.POSE_MIN_CONFIDENCE,
+                 padding: float = 0.1):
+        if backend not in ('keypointrcnn', 'onnx'):
+            raise ValueError(f"Unknown pose backend: {backend}")
+        self.backend = backend
+        self.model_path = str(model_path or settings.POSE_MODEL_PATH)
+        self.crop_size = tuple(crop_size)
+        self.max_batch = max_batch
+        self.cache_frames = cache_frames
+        self.min_confidence = min_confidence
+        self.padding = padding
+
+        self._model_lock = threading.Lock()
+        self._model = None
+        self._anonymous_ids = itertools.count()
+        self.frame_index: Dict[str, int] = {}
+        self.pose_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    @property
+    def model(self):
+        """Pose model, loaded on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        if self.backend == 'onnx':
+            import onnxruntime as ort
+            return ort.InferenceSession(self.model_path, ort_session_options(),
+                                        providers=['CPUExecutionProvider'])
+
+        model = model_store.load_keypointrcnn()
+        # Crops are already person sized, so skip the default upscale to 800px
+        model.transform.min_size = (self.crop_size[1],)
+        model.transform.max_size = max(self.crop_size)
+        model.eval()
+        return model
+
+    def estimate(self, frame: Union[FrameContext, np.ndarray], persons: List[Dict],
+                 camera_id: Optional[str] = None) -> List[Dict]:
+        """Return one pose per person, reusing cached poses where still fresh."""
+        ctx = FrameContext.of(frame, camera_id)
+        camera_id = camera_id or ctx.camera_id
+        if camera_id is None:
+            # Frames of unknown cameras share no persons, so nothing is cached
+            index, cache = 0, {}
+        else:
+            camera_key = str(camera_id)
+            index = self.frame_index.get(camera_key, -1) + 1
+            self.frame_index[camera_key] = index
+            cache = self.pose_cache.setdefault(camera_key, {})
+
+        if not persons:
+            cache.clear()
+            return []
+
+        keys = self._person_keys(persons, cache)
+        stale = [
+            i for i, key in enumerate(keys)
+            if key not in cache or index - cache[key]['frame_index'] >= self.cache_frames
+        ]
+
+        if stale:
+            boxes = [self._crop_box(persons[i]['bbox'], ctx.width, ctx.height) for i in stale]
+            for start in range(0, len(stale), self.max_batch):
+                chunk = slice(start, start + self.max_batch)
+                results = self._infer(ctx, boxes[chunk])
+                for i, box, result in zip(stale[chunk], boxes[chunk], results):
+                    cache[keys[i]] = {
+                        'frame_index': index,
+                        'relative': self._to_relative(result['keypoints']),
+                        'confidence': result['confidence']
+                    }
+
+        poses = []
+        for person, key in zip(persons, keys):
+            entry = cache[key]
+            entry['last_seen'] = index
+            entry['person_bbox'] = person['bbox']
+            box = self._crop_box(person['bbox'], ctx.width, ctx.height)
+            if entry['confidence'] < self.min_confidence:
+                continue
+            poses.append({
+                'person_id': key,
+                'bbox': person['bbox'],
+                'keypoints': self._to_frame(entry['relative'], box),
+                'confidence': entry['confidence']
+            })
+
+        # Forget persons that left the scene
+        for key in [k for k, v in cache.items() if index - v.get('last_seen', index) > self.cache_frames]:
+            del cache[key]
+
+        return poses
+
+    def _infer(self, ctx: FrameContext, boxes: List[Tuple[int, int, int, int]]) -> List[Dict]:
+        """Run the pose model on one batch of crops; keypoints in crop pixels."""
+        rgb = ctx.rgb
+        width, height = self.crop_size
+        crops = np.stack([
+            cv2.resize(rgb[y1:y2, x1:x2], (width, height), interpolation=cv2.INTER_LINEAR)
+            for x1, y1, x2, y2 in boxes
+        ])
+
+        if self.backend == 'onnx':
+            return self._infer_onnx(crops)
+        return self._infer_keypointrcnn(crops)
+
+    def _infer_keypointrcnn(self, crops: np.ndarray) -> List[Dict]:
+        torch = import_torch()
+
+        batch = torch.from_numpy(crops).permute(0, 3, 1, 2).float().div_(255.0)
+        with torch.no_grad():
+            predictions = self.model(list(batch))
+
+        results = []
+        for prediction in predictions:
+            if len(prediction['scores']) == 0:
+                results.append({
+                    'keypoints': np.zeros((self.NUM_KEYPOINTS, 3), dtype=np.float32),
+                    'confidence': 0.0
+                })
+                continue
+            # One person per crop: keep the most confident instance
+            best = int(prediction['scores'].argmax())
+            results.append({
+                'keypoints': prediction['keypoints'][best].numpy(),
+                'confidence': float(prediction['scores'][best])
+            })
+        return results
+
+    def _infer_onnx(self, crops: np.ndarray) -> List[Dict]:
+        session = self.model
+        batch = np.ascontiguousarray(crops.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        heatmaps = session.run(None, {session.get_inputs()[0].name: batch})[0]
+
+        # Heatmaps (N, K, h, w): peak location per keypoint scaled to crop size
+        n, k, h, w = heatmaps.shape
+        flat = heatmaps.reshape(n, k, -1)
+        peaks = flat.argmax(axis=2)
+        scores = flat.max(axis=2)
+        width, height = self.crop_size
+        xs = (peaks % w + 0.5) * width / w
+        ys = (peaks // w + 0.5) * height / h
+        keypoints = np.stack([xs, ys, scores], axis=2).astype(np.float32)
+
+        return [
+            {'keypoints': keypoints[i], 'confidence': float(scores[i].mean())}
+            for i in range(n)
+        ]
+
+    def _to_relative(self, keypoints: np.ndarray) -> np.ndarray:
+        """Crop pixel keypoints to coordinates relative to the crop box (0..1)."""
+        relative = np.array(keypoints, dtype=np.float32, copy=True)
+        relative[:, 0] /= self.crop_size[0]
+        relative[:, 1] /= self.crop_size[1]
+        return relative
+
+    @staticmethod
+    def _to_frame(relative: np.ndarray, box: Tuple[int, int, int, int]) -> np.ndarray:
+        """Relative keypoints mapped onto a box in frame pixels."""
+        x1, y1, x2, y2 = box
+        keypoints = relative.copy()
+        keypoints[:, 0] = x1 + relative[:, 0] * (x2 - x1)
+        keypoints[:, 1] = y1 + relative[:, 1] * (y2 - y1)
+        return keypoints
+
+    def _crop_box(self, bbox, width: int, height: int) -> Tuple[int, int, int, int]:
+        """Person box expanded by the padding and clipped to the frame."""
+        x1, y1, x2, y2 = [float(v) for v in bbox[:4]]
+        pad_x = (x2 - x1) * self.padding
+        pad_y = (y2 - y1) * self.padding
+        x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+        x2, y2 = min(width, int(x2 + pad_x)), min(height, int(y2 + pad_y))
+        return x1, y1, max(x2, x1 + 1), max(y2, y1 + 1)
+
+    def _person_keys(self, persons: List[Dict], cache: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Tracker ids where available, otherwise match cached boxes by IoU."""
+        keys = []
+        for person in persons:
+            if person.get('id') is not None:
+                keys.append(str(person['id']))
+                continue
+            best_key, best_iou = None, 0.5
+            for key, entry in cache.items():
+                if key in keys or 'person_bbox' not in entry:
+                    continue
+                iou = self._iou(person['bbox'], entry['person_bbox'])
+                if iou > best_iou:
+                    best_key, best_iou = key, iou
+            keys.append(best_key or f"person_{next(self._anonymous_ids)}")
+        return keys
+
+    @staticmethod
+    def _iou(box1, box2) -> float:
+        x1, y1 = max(box1[0], box2[0]), max(box1[1], box2[1])
+        x2, y2 = min(box1[2], box2[2]), min(box1[3], box2[3])
+        inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+        area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
+        area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+        union = area1 + area2 - inter
+        return inter / union if union > 0 else 0.0
@@ -1,207 +1,424 @@
-from kafka import KafkaConsumer
-from kafka.errors import KafkaError
-import json
 import logging
+import multiprocessing
+import signal
 import threading
-from typing import Dict, Any, List, Optional
-import numpy as np
+import time
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 from datetime import datetime
 import asyncio
 import socketio
 from motor.motor_asyncio import AsyncIOMotorClient
 from ..core.config import settings
+from ..core.runtime import configure_runtime
+from .write_batcher import MongoWriteBatcher
+from .window_aggregation import WindowAggregator
+from .rollups import RollupStore
+from .emit_scheduler import EmitScheduler
+from .message_bus import message_bus
+from .socketio_server import sio
+from .backpressure import StageQueue
+from .anomaly_stream import StreamingAnomalyDetector
 
 logger = logging.getLogger(__name__)
 
+TOPICS = ('detections', 'analytics')
+
+
+class PartitionHandover:
+    """Moves per-camera state with Kafka partition assignment.
+
+    Called on the consumer thread during `poll`; both callbacks block until
+    the event loop has finished the handover, so a camera's window state is
+    saved before another consumer in the group can be assigned its
+    partition.
+    """
+
+    def __init__(self, processor: 'RealtimeProcessor'):
+        self.processor = processor
+
+    def on_partitions_revoked(self, revoked):
+        if revoked:
+            self.processor._run_on_loop(self.processor._release_partitions(revoked))
+
+    def on_partitions_assigned(self, assigned):
+        if assigned:
+            self.processor._run_on_loop(self.processor._claim_partitions(assigned))
+
+
 class RealtimeProcessor:
+    """Message bus to Socket.IO/MongoDB pipeline running on the asyncio event loop.
+
+    The blocking bus consumer (Kafka, or the in-process bus on single-node
+    sites, see `MESSAGE_BUS`) stays on its own thread but only polls and
+    hands each message to the loop with `run_coroutine_threadsafe`, waiting
+    until the bounded ingest queue accepts it. Everything else (windowing,
+    aggregation, Socket.IO emits and MongoDB writes) runs as tasks on the
+    loop: a dispatcher updates the windows and fans work out to separate
+    emit and persist queues, each drained by its own worker tasks. Persist
+    workers hand documents to a per-collection write-behind batcher.
+
+    Every stage is bounded (see `StageQueue`) with its own overflow policy:
+    ingest and persist block by default, so a slow MongoDB pauses the bus
+    consumer instead of growing memory, while emits drop the oldest update
+    when Socket.IO falls behind.
+
+    Producers key messages by camera id and consumers join one consumer
+    group, so each camera is handled by exactly one process, in order.
+    When partitions move, the previous owner drains its queues and saves
+    the window state of the affected cameras to MongoDB; the new owner
+    restores it before consuming (see `PartitionHandover`). Several
+    processes can be run with `RealtimeConsumerPool`.
+
+    Every analytics event is also scored by a `StreamingAnomalyDetector`
+    against the camera's hour-of-week baselines; alerts are emitted and
+    stored as the event is handled, and baselines are checkpointed to
+    MongoDB periodically and when a camera is handed over.
+    """
+
     def __init__(self):
-        # Initialize Kafka consumer
-        self.consumer = KafkaConsumer(
-            'detections',
-            'analytics',
-            bootstrap_servers=['localhost:9092'],
-            value_deserializer=lambda x: json.loads(x.decode('utf-8')),
-            auto_offset_reset='latest',
-            enable_auto_commit=True
-        )
-        
+        self.consumer = None
+
         # Initialize MongoDB client
         self.mongo_client = AsyncIOMotorClient(settings.MONGODB_URL)
         self.db = self.mongo_client['visioncave']
+        self.batchers = {
+            name: MongoWriteBatcher(self.db[name], name)
+            for name in ('detections', 'analytics', 'aggregated_analytics', 'anomaly_alerts')
+        }
+        self.rollups = RollupStore(self.db)
+        self.anomalies = StreamingAnomalyDetector(self.db['anomaly_baselines'])
+        self._last_checkpoint = time.monotonic()
         
-        # Initialize Socket.IO server
-        self.sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+        # Emit through the API's Socket.IO server, or publish to the shared
+        # message queue it listens on when consumers run in other processes
+        if settings.SOCKETIO_MESSAGE_QUEUE:
+            self.sio = socketio.AsyncRedisManager(settings.SOCKETIO_MESSAGE_QUEUE, write_only=True)
+        else:
+            self.sio = sio
+
+        # Per-room coalescing and rate limiting; every closed window is still delivered
+        self.emitter = EmitScheduler(self.sio)
+        self.emitter.configure('aggregated_update', max_rate=0)
+        self.emitter.configure('anomaly_alert', max_rate=0)
         
-        # Initialize processing threads
-        self.processing_threads = {}
+        # Pipeline state, created on the running loop by start()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queues: Dict[str, StageQueue] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.consumer_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
+        self.running = False
+        self.metrics = {'received': 0, 'emitted': 0, 'stored': 0, 'failed': 0}
         
-        # Initialize data buffers
-        self.detection_buffer = {}
-        self.analytics_buffer = {}
-        
-        # Start processing
-        self.start_processing()
-
-    def start_processing(self):
-        """Start the real-time data processing threads."""
-        # Start Kafka consumer thread
-        self.processing_threads['kafka'] = threading.Thread(
-            target=self._process_kafka_messages
-        )
-        self.processing_threads['kafka'].start()
-        
-        # Start analytics aggregation thread
-        self.processing_threads['analytics'] = threading.Thread(
-            target=self._aggregate_analytics
+        # Partition of each camera per topic, for handing state over on rebalance
+        self.camera_partitions: Dict[Tuple[str, str], int] = {}
+        self.window_state = self.db['realtime_window_state']
+
+        # Event-time windows over analytics; each closed window is emitted and stored once
+        self.windows = WindowAggregator(
+            size=settings.REALTIME_WINDOW_SIZE,
+            slide=settings.REALTIME_WINDOW_SLIDE or None,
+            allowed_lateness=settings.REALTIME_WINDOW_LATENESS,
+            idle_timeout=settings.REALTIME_WINDOW_IDLE_TIMEOUT,
+            fields={
+                'total_objects': ('object_count', 'sum'),
+                'max_objects': ('object_count', 'max'),
+                'average_speed': ('average_speed', 'mean'),
+                'direction_histogram': ('direction_histogram', 'histogram'),
+            }
         )
-        self.processing_threads['analytics'].start()
 
-    async def stop_processing(self):
-        """Stop all processing threads."""
+    async def start(self):
+        """Start the consumer thread and the pipeline tasks on the running loop."""
+        if self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.stop_event.clear()
+        try:
+            await self.rollups.ensure_indexes()
+        except Exception as e:
+            logger.error(f"Error creating rollup and TTL indexes: {str(e)}")
+
+        size = settings.REALTIME_QUEUE_SIZE
+        self.queues = {
+            'ingest': StageQueue('realtime:ingest', size, settings.REALTIME_INGEST_POLICY),
+            'emit': StageQueue('realtime:emit', size, settings.REALTIME_EMIT_POLICY),
+            'persist': StageQueue('realtime:persist', size, settings.REALTIME_PERSIST_POLICY)
+        }
+        self.tasks = [asyncio.create_task(self._dispatch(), name='realtime-dispatch')]
+        self.tasks += [
+            asyncio.create_task(self._run_stage('emit'), name=f'realtime-emit-{i}')
+            for i in range(settings.REALTIME_EMIT_WORKERS)
+        ]
+        self.tasks += [
+            asyncio.create_task(self._run_stage('persist'), name=f'realtime-persist-{i}')
+            for i in range(settings.REALTIME_PERSIST_WORKERS)
+        ]
+        self.tasks.append(asyncio.create_task(self._aggregate_analytics(), name='realtime-aggregate'))
+        for batcher in self.batchers.values():
+            batcher.start()
+
+        # Connecting to the brokers blocks, so do it off the loop
+        self.consumer = await asyncio.to_thread(self._create_consumer)
+        self.consumer_thread = threading.Thread(
+            target=self._process_kafka_messages, name='realtime-kafka', daemon=True
+        )
+        self.consumer_thread.start()
+        self.running = True
+        logger.info("Realtime processor started")
+
+    async def stop(self, timeout: float = settings.REALTIME_SHUTDOWN_TIMEOUT):
+        """Stop consuming, drain queued work within `timeout`, then cancel the tasks."""
+        if not self.running:
+            return
+        self.running = False
         self.stop_event.set()
-        for thread in self.processing_threads.values():
-            thread.join()
-        await self.cleanup()
+        if self.consumer_thread is not None:
+            await asyncio.to_thread(self.consumer_thread.join)
 
-    def _process_kafka_messages(self):
-        """Process incoming Kafka messages."""
+        # Let queued messages reach Socket.IO and MongoDB before cancelling
         try:
-            for message in self.consumer:
-                if self.stop_event.is_set():
-                    break
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            pending = {name: q.qsize() for name, q in self.queues.items()}
+            logger.warning(f"Realtime processor stopped with undelivered items: {pending}")
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await self.emitter.stop()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        await self.cleanup()
+        logger.info("Realtime processor stopped")
 
-                topic = message.topic
-                data = message.value
+    async def _drain(self):
+        for name in ('ingest', 'emit', 'persist'):
+            await self.queues[name].join()
 
-                if topic == 'detections':
-                    self._handle_detection(data)
-                elif topic == 'analytics':
-                    self._handle_analytics(data)
+    def _create_consumer(self):
+        return message_bus.subscribe(TOPICS, settings.KAFKA_CONSUMER_GROUP, PartitionHandover(self))
+
+    def _run_on_loop(self, coroutine):
+        """Run a coroutine on the processor's loop from the consumer thread and wait."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
 
-        except KafkaError as e:
-            logger.error(f"Kafka error: {str(e)}")
+    def _process_kafka_messages(self):
+        """Poll the bus and hand messages to the event loop (consumer thread)."""
+        try:
+            while not self.stop_event.is_set():
+                batches = self.consumer.poll(timeout_ms=500)
+                for records in batches.values():
+                    for message in records:
+                        # With the 'block' policy this waits while the ingest queue is full
+                        self._run_on_loop(self.queues['ingest'].put(
+                            (message.topic, message.partition, message.value)
+                        ))
+
+        except Exception as e:
+            logger.error(f"Error in message bus consumer thread: {str(e)}")
         finally:
+            # Hand our cameras' state over before leaving the group
+            try:
+                self._run_on_loop(self._release_partitions(self.consumer.assignment()))
+            except Exception as e:
+                logger.error(f"Error saving window state on shutdown: {str(e)}")
             self.consumer.close()
 
-    def _handle_detection(self, detection_data: Dict[str, Any]):
+    async def _release_partitions(self, partitions):
+        """Finish queued messages, then save and drop state of cameras on `partitions`."""
+        revoked = {(tp.topic, tp.partition) for tp in partitions}
+        await self.queues['ingest'].join()
+
+        released = [key for key, partition in self.camera_partitions.items()
+                    if (key[0], partition) in revoked]
+        for topic, camera_id in released:
+            partition = self.camera_partitions.pop((topic, camera_id))
+            if topic == 'detections':
+                # Detections keep no per-camera state
+                continue
+            await self.anomalies.checkpoint({camera_id: partition}, [camera_id])
+            self.anomalies.remove(camera_id)
+            state = {
+                'windows': self._encode_window_state(self.windows.remove(camera_id)),
+                'rollups': self._encode_window_state(self.rollups.windows.remove(camera_id))
+            }
+            await self.window_state.replace_one(
+                {'_id': camera_id},
+                {'_id': camera_id, 'partition': partition, 'state': state,
+                 'updated_at': datetime.utcnow()},
+                upsert=True
+            )
+        if released:
+            logger.info(f"Released {len(released)} camera streams on {len(revoked)} partitions")
+
+    async def _claim_partitions(self, partitions):
+        """Restore saved window state and baselines of cameras on newly assigned partitions."""
+        assigned = [tp.partition for tp in partitions if tp.topic == 'analytics']
+        if not assigned:
+            return
+        baselines = await self.anomalies.load(assigned)
+        if baselines:
+            logger.info(f"Restored anomaly baselines of {baselines} cameras")
+        restored = 0
+        async for doc in self.window_state.find({'partition': {'$in': assigned}}):
+            camera_id = doc['_id']
+            self.windows.restore(camera_id, self._decode_window_state(doc['state']['windows']))
+            self.rollups.windows.restore(camera_id, self._decode_window_state(doc['state']['rollups']))
+            self.camera_partitions[('analytics', camera_id)] = doc['partition']
+            restored += 1
+        await self.window_state.delete_many({'partition': {'$in': assigned}})
+        if restored:
+            logger.info(f"Restored window state of {restored} cameras")
+
+    @staticmethod
+    def _encode_window_state(state: Dict[str, Any]) -> Dict[str, Any]:
+        # Pane starts are floats, which cannot be document keys
+        return {**state, 'panes': [[start, pane] for start, pane in state['panes'].items()]}
+
+    @staticmethod
+    def _decode_window_state(state: Dict[str, Any]) -> Dict[str, Any]:
+        return {**state, 'panes': {start: pane for start, pane in state['panes']}}
+
+    async def _dispatch(self):
+        """Buffer incoming messages and fan them out to the emit and persist stages."""
+        queue = self.queues['ingest']
+        while True:
+            topic, partition, data = await queue.get()
+            try:
+                self.metrics['received'] += 1
+                if 'camera_id' in data:
+                    self.camera_partitions[(topic, str(data['camera_id']))] = partition
+                if topic == 'detections':
+                    await self._handle_detection(data)
+                elif topic == 'analytics':
+                    await self._handle_analytics(data)
+            finally:
+                queue.task_done()
+
+    async def _run_stage(self, stage: str):
+        """Worker task running queued coroutine calls for one stage."""
+        queue = self.queues[stage]
+        while True:
+            handler, args = await queue.get()
+            try:
+                await handler(*args)
+                self.metrics['emitted' if stage == 'emit' else 'stored'] += 1
+            except Exception as e:
+                self.metrics['failed'] += 1
+                logger.error(f"Error in realtime {stage} stage: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def _submit(self, stage: str, handler: Callable[..., Awaitable[Any]], *args):
+        await self.queues[stage].put((handler, args))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pipeline counters and per-stage queue gauges."""
+        return {
+            'running': self.running,
+            **self.metrics,
+            'queues': {name: q.get_stats() for name, q in self.queues.items()},
+            'writes': {name: b.get_stats() for name, b in self.batchers.items()},
+            'windows': self.windows.get_stats(),
+            'rollups': self.rollups.get_stats(),
+            'emits': self.emitter.get_stats(),
+            'anomalies': self.anomalies.get_stats()
+        }
+
+    async def _handle_detection(self, detection_data: Dict[str, Any]):
         """Handle object detection data."""
         try:
             camera_id = detection_data['camera_id']
-            timestamp = detection_data['timestamp']
-            detections = detection_data['detections']
-
-            # Buffer the detection data
-            if camera_id not in self.detection_buffer:
-                self.detection_buffer[camera_id] = []
-            self.detection_buffer[camera_id].append({
-                'timestamp': timestamp,
-                'detections': detections
-            })
-
-            # Keep only last 100 detections
-            if len(self.detection_buffer[camera_id]) > 100:
-                self.detection_buffer[camera_id].pop(0)
 
             # Emit real-time update via Socket.IO
-            asyncio.create_task(self._emit_detection_update(camera_id, detection_data))
+            await self._submit('emit', self._emit_detection_update, camera_id, detection_data)
 
             # Store detection in MongoDB
-            asyncio.create_task(self._store_detection(detection_data))
+            await self._submit('persist', self._store_detection, detection_data)
 
         except Exception as e:
             logger.error(f"Error handling detection: {str(e)}")
 
-    def _handle_analytics(self, analytics_data: Dict[str, Any]):
+    async def _handle_analytics(self, analytics_data: Dict[str, Any]):
         """Handle analytics data."""
         try:
             camera_id = analytics_data['camera_id']
             timestamp = analytics_data['timestamp']
             analytics = analytics_data['analytics']
 
-            # Buffer the analytics data
-            if camera_id not in self.analytics_buffer:
-                self.analytics_buffer[camera_id] = []
-            self.analytics_buffer[camera_id].append({
-                'timestamp': timestamp,
-                'analytics': analytics
-            })
+            # Emit real-time update via Socket.IO
+            await self._submit('emit', self._emit_analytics_update, camera_id, analytics_data)
 
-            # Keep only last 1000 analytics points
-            if len(self.analytics_buffer[camera_id]) > 1000:
-                self.analytics_buffer[camera_id].pop(0)
+            # Score against the camera's baselines; alerts go out with this event
+            for alert in self.anomalies.score(camera_id, self._epoch(timestamp), analytics):
+                await self._submit('emit', self._emit_anomaly_alert, camera_id, alert)
+                await self._submit('persist', self._store_anomaly_alert, alert)
 
-            # Emit real-time update via Socket.IO
-            asyncio.create_task(self._emit_analytics_update(camera_id, analytics_data))
+            # Fold into the camera's windows; emit any windows this event closed
+            closed = self.windows.add(camera_id, self._epoch(timestamp), analytics)
+            await self._publish_windows(closed)
+            await self._submit_rollups(self.rollups.add(camera_id, self._epoch(timestamp), analytics))
 
             # Store analytics in MongoDB
-            asyncio.create_task(self._store_analytics(analytics_data))
+            await self._submit('persist', self._store_analytics, analytics_data)
 
         except Exception as e:
             logger.error(f"Error handling analytics: {str(e)}")
 
-    def _aggregate_analytics(self):
-        """Aggregate analytics data periodically."""
-        while not self.stop_event.is_set():
+    async def _aggregate_analytics(self):
+        """Close due windows of cameras that stopped sending analytics."""
+        while True:
+            await asyncio.sleep(settings.REALTIME_AGGREGATION_INTERVAL)
             try:
-                for camera_id, buffer in self.analytics_buffer.items():
-                    if not buffer:
-                        continue
-
-                    # Calculate aggregated metrics
-                    aggregated = self._calculate_aggregated_metrics(buffer)
-                    
-                    # Emit aggregated update
-                    asyncio.create_task(
-                        self._emit_aggregated_update(camera_id, aggregated)
-                    )
-
-                    # Store aggregated data
-                    asyncio.create_task(
-                        self._store_aggregated_analytics(camera_id, aggregated)
-                    )
-
+                await self._publish_windows(self.windows.advance_all())
+                await self._submit_rollups(self.rollups.advance())
+                if time.monotonic() - self._last_checkpoint >= settings.ANOMALY_CHECKPOINT_INTERVAL:
+                    self._last_checkpoint = time.monotonic()
+                    await self._submit('persist', self.anomalies.checkpoint, self._analytics_partitions())
             except Exception as e:
                 logger.error(f"Error in analytics aggregation: {str(e)}")
 
-            # Wait for next aggregation cycle
-            threading.Event().wait(60)  # Aggregate every minute
-
-    def _calculate_aggregated_metrics(
-        self, buffer: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Calculate aggregated metrics from analytics buffer."""
-        try:
-            timestamps = [entry['timestamp'] for entry in buffer]
-            analytics = [entry['analytics'] for entry in buffer]
-
-            # Calculate various metrics
-            metrics = {
-                'start_time': min(timestamps),
-                'end_time': max(timestamps),
-                'total_objects': sum(a.get('object_count', 0) for a in analytics),
-                'average_speed': np.mean([a.get('average_speed', 0) for a in analytics]),
-                'direction_histogram': self._merge_histograms(
-                    [a.get('direction_histogram', {}) for a in analytics]
-                ),
+    def _analytics_partitions(self) -> Dict[str, int]:
+        return {camera_id: partition for (topic, camera_id), partition in self.camera_partitions.items()
+                if topic == 'analytics'}
+
+    async def _submit_rollups(self, minutes: List[Dict[str, Any]]):
+        """Queue closed minutes for the minute/hour/day rollup upserts."""
+        if minutes:
+            await self._submit('persist', self.rollups.write_minutes, minutes)
+
+    async def _publish_windows(self, windows: List[Dict[str, Any]]):
+        """Emit and store each closed window."""
+        for window in windows:
+            camera_id = window['key']
+            aggregated = {
+                'start_time': window['window_start'],
+                'end_time': window['window_end'],
+                'samples': window['count'],
+                'total_objects': window['total_objects'],
+                'max_objects': window['max_objects'],
+                'average_speed': window['average_speed'],
+                'direction_histogram': window['direction_histogram'],
             }
 
-            return metrics
-        except Exception as e:
-            logger.error(f"Error calculating metrics: {str(e)}")
-            return {}
+            # Emit aggregated update
+            await self._submit('emit', self._emit_aggregated_update, camera_id, aggregated)
 
-    def _merge_histograms(self, histograms: List[Dict[str, float]]) -> Dict[str, float]:
-        """Merge multiple direction histograms."""
-        merged = {}
-        for hist in histograms:
-            for direction, value in hist.items():
-                merged[direction] = merged.get(direction, 0) + value
-        return merged
+            # Store aggregated data
+            await self._submit('persist', self._store_aggregated_analytics, camera_id, aggregated)
+
+    @staticmethod
+    def _epoch(timestamp: Any) -> float:
+        """Seconds since the epoch from a numeric or ISO formatted timestamp."""
+        if isinstance(timestamp, str):
+            return datetime.fromisoformat(timestamp).timestamp()
+        return float(timestamp)
 
     async def _emit_detection_update(self, camera_id: int, data: Dict[str, Any]):
         """Emit detection update via Socket.IO."""
-        await self.sio.emit(
+        await self.emitter.emit(
             'detection_update',
             {'camera_id': camera_id, 'data': data},
             room=f'camera_{camera_id}'
@@ -209,7 +426,7 @@ class RealtimeProcessor:
 
     async def _emit_analytics_update(self, camera_id: int, data: Dict[str, Any]):
         """Emit analytics update via Socket.IO."""
-        await self.sio.emit(
+        await self.emitter.emit(
             'analytics_update',
             {'camera_id': camera_id, 'data': data},
             room=f'camera_{camera_id}'
@@ -217,22 +434,30 @@ class RealtimeProcessor:
 
     async def _emit_aggregated_update(self, camera_id: int, data: Dict[str, Any]):
         """Emit aggregated analytics update via Socket.IO."""
-        await self.sio.emit(
+        await self.emitter.emit(
             'aggregated_update',
             {'camera_id': camera_id, 'data': data},
             room=f'camera_{camera_id}'
         )
 
+    async def _emit_anomaly_alert(self, camera_id: int, alert: Dict[str, Any]):
+        """Emit anomaly alert via Socket.IO."""
+        await self.emitter.emit(
+            'anomaly_alert',
+            {'camera_id': camera_id, 'alert': alert},
+            room=f'camera_{camera_id}'
+        )
+
     async def _store_detection(self, detection_data: Dict[str, Any]):
         """Store detection data in MongoDB."""
-        await self.db.detections.insert_one({
+        await self.batchers['detections'].add({
             **detection_data,
             'created_at': datetime.utcnow()
         })
 
     async def _store_analytics(self, analytics_data: Dict[str, Any]):
         """Store analytics data in MongoDB."""
-        await self.db.analytics.insert_one({
+        await self.batchers['analytics'].add({
             **analytics_data,
             'created_at': datetime.utcnow()
         })
@@ -241,16 +466,23 @@ class RealtimeProcessor:
         self, camera_id: int, aggregated_data: Dict[str, Any]
     ):
         """Store aggregated analytics in MongoDB."""
-        await self.db.aggregated_analytics.insert_one({
+        await self.batchers['aggregated_analytics'].add({
             'camera_id': camera_id,
             'data': aggregated_data,
             'created_at': datetime.utcnow()
         })
 
+    async def _store_anomaly_alert(self, alert: Dict[str, Any]):
+        """Store anomaly alert in MongoDB."""
+        await self.batchers['anomaly_alerts'].add({
+            **alert,
+            'created_at': datetime.utcnow()
+        })
+
     async def cleanup(self):
         """Cleanup resources."""
-        self.consumer.close()
-        await self.mongo_client.close()
+        # The consumer thread closes the bus consumer; Motor's close is synchronous
+        self.mongo_client.close()
 
     @staticmethod
     def get_instance():
@@ -258,3 +490,71 @@ class RealtimeProcessor:
         if not hasattr(RealtimeProcessor, '_instance'):
             RealtimeProcessor._instance = RealtimeProcessor()
         return RealtimeProcessor._instance
+
+
+async def _serve_until_signalled():
+    """Run one processor until SIGTERM/SIGINT, then hand its partitions back."""
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    processor = RealtimeProcessor()
+    await processor.start()
+    await stopping.wait()
+    await processor.stop()
+
+
+def _consumer_main(index: int, processes: int):
+    """Entry point of one consumer process."""
+    configure_runtime(workers=processes, worker_index=index)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve_until_signalled())
+
+
+class RealtimeConsumerPool:
+    """Runs `processes` RealtimeProcessor instances in one Kafka consumer group.
+
+    Kafka spreads the camera-keyed partitions over the processes and moves
+    them (with their window state) when a process starts or stops, so
+    realtime processing scales past one core. Emits from the processes reach
+    clients through `SOCKETIO_MESSAGE_QUEUE`, which the API's Socket.IO
+    server (see `socketio_server`) listens on.
+    """
+
+    def __init__(self, processes: int = settings.REALTIME_CONSUMER_PROCESSES,
+                 start_method: str = settings.INFERENCE_POOL_START_METHOD):
+        self.processes = processes
+        self.mp = multiprocessing.get_context(start_method)
+        self.workers: List[multiprocessing.Process] = []
+
+    def start(self):
+        if settings.MESSAGE_BUS != 'kafka':
+            raise ValueError("Consumer processes need MESSAGE_BUS=kafka; the in-process bus is single process")
+        if not settings.SOCKETIO_MESSAGE_QUEUE:
+            raise ValueError("Consumer processes need SOCKETIO_MESSAGE_QUEUE to reach Socket.IO clients")
+        for index in range(self.processes):
+            process = self.mp.Process(
+                target=_consumer_main, args=(index, self.processes),
+                name=f'realtime-consumer-{index}', daemon=True
+            )
+            process.start()
+            self.workers.append(process)
+        logger.info(f"Started {self.processes} realtime consumer processes")
+
+    def stop(self, timeout: float = settings.REALTIME_SHUTDOWN_TIMEOUT):
+        """Ask every process to hand over its partitions and exit."""
+        for process in self.workers:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.workers:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in time, killing it")
+                process.kill()
+                process.join()
+        self.workers = []
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        return [{'name': p.name, 'pid': p.pid, 'alive': p.is_alive()} for p in self.workers]
@@ -1,15 +1,22 @@
 from fastapi import WebSocket
-from typing import Dict, Set, Any
+from typing import Dict, Set, Any, Union, Optional
 import asyncio
 import json
+import logging
 from datetime import datetime
 import cv2
 import numpy as np
 from .vision_service import vision_service
+from .frame_context import FrameContext
+from .analysis_plan import FrameAnalysisPlan
+from .websocket_service import ClientOutbox
+
+logger = logging.getLogger(__name__)
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        self.outboxes: Dict[WebSocket, ClientOutbox] = {}
         self.data_processors = {
             'occupancy': OccupancyProcessor(),
             'traffic': TrafficProcessor(),
@@ -23,19 +30,24 @@ class ConnectionManager:
         if client_id not in self.active_connections:
             self.active_connections[client_id] = set()
         self.active_connections[client_id].add(websocket)
+        self.outboxes[websocket] = ClientOutbox(websocket, f"websocket:{client_id}:{id(websocket):x}")
 
     async def disconnect(self, websocket: WebSocket, client_id: str):
         self.active_connections[client_id].remove(websocket)
         if not self.active_connections[client_id]:
             del self.active_connections[client_id]
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox:
+            outbox.close()
 
     async def send_personal_message(self, message: Dict, websocket: WebSocket):
-        await websocket.send_json(message)
+        # Queued per client; a slow client drops its oldest messages
+        if websocket in self.outboxes:
+            await self.outboxes[websocket].send(message)
 
     async def broadcast(self, client_id: str, message: Dict):
-        if client_id in self.active_connections:
-            for connection in self.active_connections[client_id]:
-                await connection.send_json(message)
+        for connection in list(self.active_connections.get(client_id, ())):
+            await self.send_personal_message(message, connection)
 
     async def process_message(self, message: Dict, client_id: str):
         msg_type = message.get('type')
@@ -49,12 +61,36 @@ class ConnectionManager:
 
     async def update_camera_frame(self, camera_id: str, frame: np.ndarray):
         self.camera_frames[camera_id] = frame
-        # Process frame with all relevant processors
-        for processor in self.data_processors.values():
-            if hasattr(processor, 'process_frame'):
-                await processor.process_frame(camera_id, frame)
+        # Share derived views (gray, RGB, resizes) across all processors
+        ctx = FrameContext(frame, camera_id)
+
+        # Collect what every subscribed processor needs so each model runs once
+        subscribed = [
+            processor for processor in self.data_processors.values()
+            if hasattr(processor, 'process_frame') and processor.subscribes(camera_id)
+        ]
+        if not subscribed:
+            return
+
+        occupancy = self.data_processors['occupancy']
+        zone_id = occupancy.get_zone_for_camera(camera_id)
+        plan = FrameAnalysisPlan(vision_service, ctx, str(zone_id) if zone_id else None)
+        for processor in subscribed:
+            plan.require(*processor.requires)
+        await plan.execute()
+
+        # Hand the shared results to all processors concurrently
+        results = await asyncio.gather(
+            *(processor.process_frame(camera_id, ctx, plan) for processor in subscribed),
+            return_exceptions=True
+        )
+        for processor, result in zip(subscribed, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error in {type(processor).__name__} for camera {camera_id}: {str(result)}")
 
 class OccupancyProcessor:
+    requires = ('people',)
+
     def __init__(self):
         self.zones = {
             1: {'id': 1, 'name': 'Main Hall', 'capacity': 100, 'current': 0},
@@ -63,13 +99,18 @@ class OccupancyProcessor:
         }
         self.last_processed = {}
 
-    async def process_frame(self, camera_id: str, frame: np.ndarray):
+    def subscribes(self, camera_id: str) -> bool:
+        return self.get_zone_for_camera(camera_id) is not None
+
+    async def process_frame(self, camera_id: str, frame: Union[FrameContext, np.ndarray],
+                            plan: Optional[FrameAnalysisPlan] = None):
         zone_id = self.get_zone_for_camera(camera_id)
         if not zone_id:
             return
 
-        # Process frame with vision service
-        result = await vision_service.count_people(frame, str(zone_id))
+        # Use the shared people count for this frame
+        plan = plan or FrameAnalysisPlan(vision_service, FrameContext.of(frame, camera_id), str(zone_id))
+        result = await plan.get('people')
         if result:
             self.zones[zone_id]['current'] = result['count']
             self.last_processed[zone_id] = result['timestamp']
@@ -96,6 +137,8 @@ class OccupancyProcessor:
         }
 
 class TrafficProcessor:
+    requires = ('traffic',)
+
     def __init__(self):
         self.current_flow = 0
         self.avg_speed = 0
@@ -103,9 +146,14 @@ class TrafficProcessor:
         self.hourly_data = []
         self.last_update = None
 
-    async def process_frame(self, camera_id: str, frame: np.ndarray):
-        # Process frame with vision service
-        result = await vision_service.analyze_traffic(frame)
+    def subscribes(self, camera_id: str) -> bool:
+        return True
+
+    async def process_frame(self, camera_id: str, frame: Union[FrameContext, np.ndarray],
+                            plan: Optional[FrameAnalysisPlan] = None):
+        # Use the shared traffic analysis for this frame
+        plan = plan or FrameAnalysisPlan(vision_service, FrameContext.of(frame, camera_id))
+        result = await plan.get('traffic')
         if result:
             self.current_flow = result['currentFlow']
             self.avg_speed = result['avgSpeed']
@@ -143,6 +191,8 @@ class TrafficProcessor:
         }
 
 class SafetyProcessor:
+    requires = ('safety',)
+
     def __init__(self):
         self.violations = 0
         self.warnings = 0
@@ -150,9 +200,14 @@ class SafetyProcessor:
         self.recent_events = []
         self.last_update = None
 
-    async def process_frame(self, camera_id: str, frame: np.ndarray):
-        # Process frame with vision service
-        result = await vision_service.detect_safety_violations(frame)
+    def subscribes(self, camera_id: str) -> bool:
+        return True
+
+    async def process_frame(self, camera_id: str, frame: Union[FrameContext, np.ndarray],
+                            plan: Optional[FrameAnalysisPlan] = None):
+        # Use the shared safety analysis for this frame
+        plan = plan or FrameAnalysisPlan(vision_service, FrameContext.of(frame, camera_id))
+        result = await plan.get('safety')
         if result:
             violations = result['violations']
             self.violations = len(violations)
@@ -189,6 +244,8 @@ class SafetyProcessor:
         }
 
 class AnalyticsProcessor:
+    requires = ('full',)
+
     def __init__(self):
         self.detection_rate = 0
         self.accuracy = 0
@@ -196,9 +253,14 @@ class AnalyticsProcessor:
         self.objects_detected = 0
         self.last_update = None
 
-    async def process_frame(self, camera_id: str, frame: np.ndarray):
-        # Process frame with vision service
-        result = await vision_service.process_frame(frame)
+    def subscribes(self, camera_id: str) -> bool:
+        return True
+
+    async def process_frame(self, camera_id: str, frame: Union[FrameContext, np.ndarray],
+                            plan: Optional[FrameAnalysisPlan] = None):
+        # Use the shared full analysis for this frame
+        plan = plan or FrameAnalysisPlan(vision_service, FrameContext.of(frame, camera_id))
+        result = await plan.get('full')
         if result:
             self.processing_time = result['processing_time']
             self.objects_detected = len(result['detections'])
@@ -0,0 +1,111 @@
+import numpy as np
+from typing import Dict, Any, List, Optional, Sequence, Union
+
+# Fixed direction bins for analytics histograms; unknown labels go to 'other'
+DIRECTION_BINS = ('north', 'northeast', 'east', 'southeast',
+                  'south', 'southwest', 'west', 'northwest', 'other')
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of numeric rows in a preallocated numpy array.
+
+    Each row holds one value per named field (the first field is normally
+    the timestamp). Appending overwrites the oldest row once full, so both
+    append cost and memory are constant. Queries return chronologically
+    ordered arrays and are vectorized over the whole buffer. A raw payload
+    per row can optionally be kept alongside, in a slot list of the same
+    capacity.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int, keep_payload: bool = False,
+                 dtype=np.float64):
+        self.fields = tuple(fields)
+        self.index = {name: i for i, name in enumerate(self.fields)}
+        self.capacity = capacity
+        self.data = np.zeros((capacity, len(self.fields)), dtype=dtype)
+        self.payloads: Optional[List[Any]] = [None] * capacity if keep_payload else None
+        self.head = 0  # Next slot to write
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def append(self, row: Union[Sequence[float], np.ndarray], payload: Any = None):
+        """Write one row, overwriting the oldest when full."""
+        self.data[self.head] = row
+        if self.payloads is not None:
+            self.payloads[self.head] = payload
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def append_record(self, record: Dict[str, float], payload: Any = None):
+        """Write one row from a field -> value mapping; missing fields are 0."""
+        self.append([record.get(name, 0.0) for name in self.fields], payload)
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        if self.payloads is not None:
+            self.payloads = [None] * self.capacity
+
+    def _order(self) -> np.ndarray:
+        """Slot indexes from oldest to newest."""
+        start = (self.head - self.size) % self.capacity
+        return (start + np.arange(self.size)) % self.capacity
+
+    def rows(self) -> np.ndarray:
+        """All rows, oldest first."""
+        if self.size < self.capacity:
+            return self.data[:self.size]
+        return np.concatenate([self.data[self.head:], self.data[:self.head]])
+
+    def column(self, name: str) -> np.ndarray:
+        """One field for all rows, oldest first."""
+        return self.rows()[:, self.index[name]]
+
+    def latest(self, n: int) -> np.ndarray:
+        """The newest `n` rows, oldest first."""
+        return self.rows()[-n:] if n > 0 else self.data[:0]
+
+    def _window_mask(self, start: Optional[float], end: Optional[float], field: str) -> np.ndarray:
+        values = self.column(field)
+        mask = np.ones(len(values), dtype=bool)
+        if start is not None:
+            mask &= values >= start
+        if end is not None:
+            mask &= values < end
+        return mask
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None,
+               field: str = 'timestamp') -> np.ndarray:
+        """Rows with `start <= field < end`, oldest first."""
+        return self.rows()[self._window_mask(start, end, field)]
+
+    def window_payloads(self, start: Optional[float] = None, end: Optional[float] = None,
+                        field: str = 'timestamp') -> List[Any]:
+        """Raw payloads of the rows in a window (requires `keep_payload`)."""
+        if self.payloads is None:
+            return []
+        mask = self._window_mask(start, end, field)
+        return [self.payloads[i] for i in self._order()[mask]]
+
+    def summary(self, start: Optional[float] = None, end: Optional[float] = None,
+                field: str = 'timestamp') -> Dict[str, Any]:
+        """Count and per-field sum/mean/min/max over a window."""
+        rows = self.window(start, end, field)
+        if len(rows) == 0:
+            return {'count': 0}
+        sums, means = rows.sum(axis=0), rows.mean(axis=0)
+        mins, maxs = rows.min(axis=0), rows.max(axis=0)
+        return {
+            'count': len(rows),
+            **{
+                name: {'sum': float(sums[i]), 'mean': float(means[i]),
+                       'min': float(mins[i]), 'max': float(maxs[i])}
+                for i, name in enumerate(self.fields)
+            }
+        }
@@ -0,0 +1,186 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, UpdateOne
+from ..core.config import settings
+from .window_aggregation import WindowAggregator
+from .ring_buffer import DIRECTION_BINS
+
+logger = logging.getLogger(__name__)
+
+# Bucket length in seconds per granularity, finest first
+GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Raw collections expired by their `created_at` field
+RAW_COLLECTIONS = ('detections', 'analytics', 'aggregated_analytics')
+
+
+class RollupStore:
+    """Minute/hour/day rollups of camera analytics in MongoDB.
+
+    Analytics events are folded into per-camera one minute tumbling windows
+    in memory. Each closed minute is added to the matching minute, hour and
+    day bucket documents (one per camera, metric and bucket) with `$inc`,
+    `$min` and `$max` upserts, written as one unordered bulk per
+    granularity. Minute and hour buckets and the raw collections expire
+    through TTL indexes. `query` reads the finest granularity that is still
+    retained and fits in `max_points` buckets, so a 30 day chart reads
+    hourly buckets (~720 documents) instead of raw events.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.collections = {name: db[f'rollup_{name}'] for name in GRANULARITIES}
+        self.retention = {
+            'minute': settings.ROLLUP_MINUTE_RETENTION_DAYS * 86400,
+            'hour': settings.ROLLUP_HOUR_RETENTION_DAYS * 86400,
+            'day': None
+        }
+        self.windows = WindowAggregator(
+            size=GRANULARITIES['minute'],
+            allowed_lateness=settings.REALTIME_WINDOW_LATENESS,
+            idle_timeout=settings.REALTIME_WINDOW_IDLE_TIMEOUT,
+            fields={
+                'object_count_n': ('object_count', 'count'),
+                'object_count_sum': ('object_count', 'sum'),
+                'object_count_min': ('object_count', 'min'),
+                'object_count_max': ('object_count', 'max'),
+                'average_speed_n': ('average_speed', 'count'),
+                'average_speed_sum': ('average_speed', 'sum'),
+                'average_speed_min': ('average_speed', 'min'),
+                'average_speed_max': ('average_speed', 'max'),
+                'direction_histogram': ('direction_histogram', 'histogram'),
+            }
+        )
+        self.metrics = {'minutes_written': 0, 'upserts': 0, 'write_errors': 0}
+
+    async def ensure_indexes(self):
+        """Create bucket lookup indexes and the TTL indexes for expiry."""
+        for name, collection in self.collections.items():
+            await collection.create_index(
+                [('camera_id', ASCENDING), ('metric', ASCENDING), ('bucket', ASCENDING)],
+                unique=True
+            )
+            if self.retention[name]:
+                await collection.create_index('bucket', expireAfterSeconds=self.retention[name])
+
+        raw_ttl = settings.RAW_ANALYTICS_RETENTION_DAYS * 86400
+        for name in RAW_COLLECTIONS:
+            await self.db[name].create_index('created_at', expireAfterSeconds=raw_ttl)
+
+    def add(self, camera_id: str, timestamp: float,
+            analytics: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fold one analytics event in and return the minutes it closes."""
+        return self.windows.add(camera_id, timestamp, analytics)
+
+    def advance(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Close the minutes of cameras idle since processing time `now`.
+
+        Open minutes are not flushed on shutdown or handover; the realtime
+        processor saves them with the camera's window state (`windows.remove`)
+        and the next owner resumes them (`windows.restore`).
+        """
+        return self.windows.advance_all(now)
+
+    async def write_minutes(self, minutes: List[Dict[str, Any]]):
+        """Add closed minute windows to their minute, hour and day buckets."""
+        operations = {name: [] for name in GRANULARITIES}
+        for minute in minutes:
+            for metric, update in self._metric_updates(minute).items():
+                for name, seconds in GRANULARITIES.items():
+                    bucket = minute['window_start'] // seconds * seconds
+                    operations[name].append(UpdateOne(
+                        {
+                            'camera_id': minute['key'],
+                            'metric': metric,
+                            'bucket': datetime.fromtimestamp(bucket, timezone.utc)
+                        },
+                        update,
+                        upsert=True
+                    ))
+
+        for name, ops in operations.items():
+            if not ops:
+                continue
+            try:
+                await self.collections[name].bulk_write(ops, ordered=False)
+                self.metrics['upserts'] += len(ops)
+            except Exception as e:
+                self.metrics['write_errors'] += 1
+                logger.error(f"Error writing {len(ops)} {name} rollups: {str(e)}")
+        self.metrics['minutes_written'] += len(minutes)
+
+    async def query(self, camera_id: str, metric: str, start: datetime, end: datetime,
+                    max_points: int = settings.ROLLUP_MAX_POINTS,
+                    granularity: Optional[str] = None) -> Dict[str, Any]:
+        """Bucketed series for a camera metric between `start` and `end`."""
+        start, end = self._utc(start), self._utc(end)
+        granularity = granularity or self.choose_granularity(start, end, max_points)
+        cursor = self.collections[granularity].find(
+            {'camera_id': str(camera_id), 'metric': metric, 'bucket': {'$gte': start, '$lt': end}},
+            {'_id': 0, 'camera_id': 0, 'metric': 0}
+        ).sort('bucket', ASCENDING)
+
+        points = []
+        async for doc in cursor:
+            if doc.get('count'):
+                doc['mean'] = doc.get('sum', 0.0) / doc['count']
+            points.append(doc)
+        return {'granularity': granularity, 'points': points}
+
+    def choose_granularity(self, start: datetime, end: datetime,
+                           max_points: int = settings.ROLLUP_MAX_POINTS,
+                           now: Optional[datetime] = None) -> str:
+        """Finest granularity still retained at `start` with at most `max_points` buckets."""
+        now = now or datetime.now(timezone.utc)
+        start, end = self._utc(start), self._utc(end)
+        span = (end - start).total_seconds()
+        age = (now - start).total_seconds()
+        for name, seconds in GRANULARITIES.items():
+            retained = self.retention[name] is None or age <= self.retention[name]
+            if retained and span / seconds <= max_points:
+                return name
+        return 'day'
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.metrics, 'windows': self.windows.get_stats()}
+
+    @staticmethod
+    def _utc(value: datetime) -> datetime:
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+    @staticmethod
+    def _metric_updates(minute: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Upsert operators per metric for one closed minute."""
+        updates = {}
+        for metric in ('object_count', 'average_speed'):
+            if not minute[f'{metric}_n']:
+                continue
+            updates[metric] = {
+                '$inc': {'count': minute[f'{metric}_n'], 'sum': minute[f'{metric}_sum']},
+                '$min': {'min': minute[f'{metric}_min']},
+                '$max': {'max': minute[f'{metric}_max']}
+            }
+        if minute['direction_histogram']:
+            bins = {}
+            for name, value in minute['direction_histogram'].items():
+                key = f"bins.{name if name in DIRECTION_BINS else 'other'}"
+                bins[key] = bins.get(key, 0.0) + value
+            updates['direction_histogram'] = {'$inc': {'count': minute['count'], **bins}}
+        return updates
+
+
+_query_store: Optional[RollupStore] = None
+
+
+def get_query_store() -> RollupStore:
+    """RollupStore on the API process's own MongoDB client, for `query` only.
+
+    Reading trends must not build a RealtimeProcessor (and its consumers,
+    windows and emitter) in the API process.
+    """
+    global _query_store
+    if _query_store is None:
+        _query_store = RollupStore(AsyncIOMotorClient(settings.MONGODB_URL)['visioncave'])
+    return _query_store
@@ -0,0 +1,35 @@
+import logging
+from typing import Any, Dict
+import socketio
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def create_socketio_server() -> socketio.AsyncServer:
+    """Socket.IO server that browser clients connect to.
+
+    With `SOCKETIO_MESSAGE_QUEUE` set the server listens on that Redis
+    queue, so emits published by realtime consumer processes (through a
+    write-only `AsyncRedisManager`) reach the clients connected here.
+    """
+    client_manager = None
+    if settings.SOCKETIO_MESSAGE_QUEUE:
+        client_manager = socketio.AsyncRedisManager(settings.SOCKETIO_MESSAGE_QUEUE)
+    server = socketio.AsyncServer(
+        async_mode='asgi', cors_allowed_origins='*', client_manager=client_manager
+    )
+
+    @server.event
+    async def subscribe(sid: str, data: Dict[str, Any]):
+        """Join the room of a camera to receive its realtime updates."""
+        await server.enter_room(sid, f"camera_{data['camera_id']}")
+
+    @server.event
+    async def unsubscribe(sid: str, data: Dict[str, Any]):
+        await server.leave_room(sid, f"camera_{data['camera_id']}")
+
+    return server
+
+
+sio = create_socketio_server()
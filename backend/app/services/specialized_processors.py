@@ -1,24 +1,40 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union, Optional, Tuple, Set
 import numpy as np
 import cv2
 from datetime import datetime
 import asyncio
+import threading
+from ..core.config import settings
 from .vision_service import vision_service
+from .frame_context import FrameContext
+from .analysis_plan import FrameAnalysisPlan
+from .face_detection import FaceDetector, face_detector
+from .pose_estimation import PoseEstimator
+from .zone_index import zone_indexes
 
 class ClassroomActivityProcessor:
-    def __init__(self):
+    requires = ('people',)
+
+    def __init__(self, detector: Optional[FaceDetector] = None):
+        self.face_detector = detector or face_detector
         self.classrooms = {}
         self.attention_history = {}
         self.activity_levels = {}
         self.last_processed = {}
 
-    async def process_frame(self, camera_id: str, frame: np.ndarray):
+    def subscribes(self, camera_id: str) -> bool:
+        return self.get_classroom_id(camera_id) is not None
+
+    async def process_frame(self, camera_id: str, frame: Union[FrameContext, np.ndarray],
+                            plan: Optional[FrameAnalysisPlan] = None):
         classroom_id = self.get_classroom_id(camera_id)
         if not classroom_id:
             return
+        frame = FrameContext.of(frame, camera_id)
 
-        # Process frame with vision service
-        people_result = await vision_service.count_people(frame, str(classroom_id))
+        # Use the shared people count for this frame
+        plan = plan or FrameAnalysisPlan(vision_service, frame)
+        people_result = await plan.get('people')
         if not people_result:
             return
 
@@ -53,13 +69,9 @@ class ClassroomActivityProcessor:
             if datetime.fromisoformat(entry['timestamp']).timestamp() > one_hour_ago
         ]
 
-    async def detect_faces(self, frame: np.ndarray) -> List[Dict]:
-        # Use vision service to detect faces
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        return [{'x': x, 'y': y, 'w': w, 'h': h} for (x, y, w, h) in faces]
+    async def detect_faces(self, frame: Union[FrameContext, np.ndarray]) -> List[Dict]:
+        # Shared detector: cascade loaded once, detection on a downscaled frame
+        return self.face_detector.detect(frame)
 
     async def calculate_attention_score(self, face_detections: List[Dict]) -> float:
         if not face_detections:
@@ -76,13 +88,13 @@ class ClassroomActivityProcessor:
 
         return sum(attention_scores) / len(attention_scores) * 100
 
-    async def calculate_activity_level(self, frame: np.ndarray) -> float:
+    async def calculate_activity_level(self, frame: Union[FrameContext, np.ndarray]) -> float:
         # Calculate activity level using frame differencing
+        current_frame = FrameContext.of(frame).gray
         if not hasattr(self, 'previous_frame'):
-            self.previous_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            self.previous_frame = current_frame
             return 0.0
 
-        current_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         frame_diff = cv2.absdiff(current_frame, self.previous_frame)
         self.previous_frame = current_frame
 
@@ -125,19 +137,27 @@ class ClassroomActivityProcessor:
         return stats
 
 class EquipmentMonitorProcessor:
+    requires = ('full',)
+
     def __init__(self):
         self.equipment_status = {}
         self.alerts = []
         self.maintenance_schedule = {}
         self.last_processed = {}
 
-    async def process_frame(self, camera_id: str, frame: np.ndarray):
+    def subscribes(self, camera_id: str) -> bool:
+        return self.get_equipment_id(camera_id) is not None
+
+    async def process_frame(self, camera_id: str, frame: Union[FrameContext, np.ndarray],
+                            plan: Optional[FrameAnalysisPlan] = None):
         equipment_id = self.get_equipment_id(camera_id)
         if not equipment_id:
             return
+        frame = FrameContext.of(frame, camera_id)
 
-        # Process frame with vision service for equipment detection
-        result = await vision_service.process_frame(frame)
+        # Use the shared full analysis for equipment detection
+        plan = plan or FrameAnalysisPlan(vision_service, frame)
+        result = await plan.get('full')
         if not result:
             return
 
@@ -158,13 +178,13 @@ class EquipmentMonitorProcessor:
                 if len(self.alerts) > 50:
                     self.alerts.pop()
 
-    async def analyze_equipment_status(self, frame: np.ndarray, equipment_id: str) -> Dict[str, Any]:
+    async def analyze_equipment_status(self, frame: Union[FrameContext, np.ndarray],
+                                       equipment_id: str) -> Dict[str, Any]:
         # Implement equipment-specific analysis
         # This is a placeholder - real implementation would use more sophisticated analysis
         
         # Simulate equipment analysis using image processing
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+        blur = FrameContext.of(frame).blurred_gray((5, 5))
         
         # Detect edges - could indicate equipment state
         edges = cv2.Canny(blur, 50, 150)
@@ -229,36 +249,52 @@ class EquipmentMonitorProcessor:
 
 class SafetyMonitorProcessor:
     def __init__(self):
-        # Initialize YOLOv5 model for PPE detection
-        self.ppe_detector = YOLODetector(
-            model_path=settings.PPE_MODEL_PATH,
-            classes=['helmet', 'vest', 'goggles', 'gloves', 'boots']
-        )
-        # Initialize pose estimation model for behavior analysis
-        self.pose_model = torch.hub.load('pytorch/vision:v0.10.0', 
-                                       'keypointrcnn_resnet50_fpn', 
-                                       pretrained=True)
-        self.pose_model.eval()
+        # PPE and pose models are loaded on first use
+        self._model_lock = threading.Lock()
+        self._ppe_detector = None
+        self.pose_estimator = PoseEstimator()
         
         self.restricted_zones = []  # Will be configured via API
         self.required_ppe = {}  # Zone-specific PPE requirements
-        
+        self.detect_on_crops = settings.PPE_DETECT_ON_CROPS
+        
+    @property
+    def ppe_detector(self):
+        """YOLOv5 model for PPE detection"""
+        if self._ppe_detector is None:
+            with self._model_lock:
+                if self._ppe_detector is None:
+                    from ..models.detection import YOLODetector
+                    self._ppe_detector = YOLODetector(
+                        model_path=settings.PPE_MODEL_PATH,
+                        classes=['helmet', 'vest', 'goggles', 'gloves', 'boots']
+                    )
+        return self._ppe_detector
+
     def configure_zones(self, zones: List[Dict]):
         """Configure restricted zones and their PPE requirements"""
         self.restricted_zones = zones
         for zone in zones:
-            self.required_ppe[zone['id']] = zone.get('required_ppe', [])
+            # Ordered and de-duplicated so reports list missing items consistently
+            self.required_ppe[zone['id']] = tuple(dict.fromkeys(zone.get('required_ppe', [])))
             
-    def detect_ppe_violations(self, frame: np.ndarray, persons: List[Dict]) -> List[Dict]:
+    def detect_ppe_violations(self, frame: Union[FrameContext, np.ndarray],
+                              persons: List[Dict]) -> List[Dict]:
         """Detect PPE violations for each detected person"""
         violations = []
-        ppe_detections = self.ppe_detector.detect(frame)
+        if not persons:
+            return violations
+
+        frame = FrameContext.of(frame).frame
+        person_boxes = [person['bbox'] for person in persons]
+        if self.detect_on_crops:
+            ppe_detections = self._detect_ppe_on_crops(frame, person_boxes)
+        else:
+            ppe_detections = self.ppe_detector.detect(frame)
+        zones = self._get_person_zones(person_boxes)
+        person_ppe_sets = self._associate_ppe(person_boxes, ppe_detections)
         
-        for person in persons:
-            person_box = person['bbox']
-            person_ppe = self._get_person_ppe(person_box, ppe_detections)
-            zone = self._get_person_zone(person_box)
-            
+        for person, zone, person_ppe in zip(persons, zones, person_ppe_sets):
             if zone:
                 missing_ppe = self._check_required_ppe(zone, person_ppe)
                 if missing_ppe:
@@ -272,16 +308,21 @@ class SafetyMonitorProcessor:
         
         return violations
         
-    def detect_unsafe_behavior(self, frame: np.ndarray) -> List[Dict]:
-        """Detect unsafe behaviors using pose estimation"""
+    def detect_unsafe_behavior(self, frame: Union[FrameContext, np.ndarray], persons: List[Dict],
+                               camera_id: Optional[str] = None) -> List[Dict]:
+        """Detect unsafe behaviors using pose estimation on detected persons"""
         violations = []
-        poses = self._detect_poses(frame)
+        # No persons, no pose pass
+        if not persons:
+            return violations
+        poses = self.pose_estimator.estimate(frame, persons, camera_id)
         
         for pose in poses:
             unsafe_actions = self._analyze_pose_safety(pose)
             if unsafe_actions:
                 violations.append({
                     'type': 'unsafe_behavior',
+                    'person_id': pose['person_id'],
                     'actions': unsafe_actions,
                     'confidence': pose['confidence'],
                     'timestamp': datetime.now().isoformat()
@@ -290,49 +331,109 @@ class SafetyMonitorProcessor:
         return violations
         
     def _get_person_ppe(self, person_box: Tuple[int, int, int, int], 
-                        ppe_detections: List[Dict]) -> List[str]:
+                        ppe_detections: List[Dict]) -> Set[str]:
         """Match detected PPE items to a person"""
-        person_ppe = []
-        px1, py1, px2, py2 = person_box
-        
-        for ppe in ppe_detections:
-            dx1, dy1, dx2, dy2 = ppe['bbox']
-            # Check if PPE detection overlaps with person
-            if self._boxes_overlap((px1, py1, px2, py2), (dx1, dy1, dx2, dy2)):
-                person_ppe.append(ppe['class'])
-                
+        return self._associate_ppe([person_box], ppe_detections)[0]
+
+    @staticmethod
+    def _associate_ppe(person_boxes: List[Tuple[int, int, int, int]], ppe_detections: List[Dict],
+                       min_containment: float = settings.PPE_MIN_CONTAINMENT) -> List[Set[str]]:
+        """Assign every PPE detection to at most one person.
+
+        Scores are the fraction of the PPE box inside each person box (IoU
+        breaks ties between overlapping people); each item goes to its best
+        scoring person, so one helmet is never credited twice.
+        """
+        person_ppe = [set() for _ in person_boxes]
+        if not person_boxes or not ppe_detections:
+            return person_ppe
+
+        persons = np.asarray(person_boxes, dtype=np.float64)[:, :4]
+        items = np.asarray([ppe['bbox'] for ppe in ppe_detections], dtype=np.float64)[:, :4]
+
+        lt = np.maximum(persons[:, None, :2], items[None, :, :2])
+        rb = np.minimum(persons[:, None, 2:], items[None, :, 2:])
+        inter = np.clip(rb - lt, 0, None).prod(axis=2)
+        person_area = (persons[:, 2:] - persons[:, :2]).prod(axis=1)
+        item_area = np.maximum((items[:, 2:] - items[:, :2]).prod(axis=1), 1e-9)
+
+        containment = inter / item_area[None, :]
+        iou = inter / (person_area[:, None] + item_area[None, :] - inter + 1e-9)
+        score = np.where(containment >= min_containment, containment + 1e-3 * iou, -1.0)
+
+        owners = score.argmax(axis=0)
+        assigned = score[owners, np.arange(len(ppe_detections))] >= 0
+        for item, owner in zip(np.flatnonzero(assigned), owners[assigned]):
+            person_ppe[owner].add(ppe_detections[item]['class'])
         return person_ppe
+
+    def _detect_ppe_on_crops(self, frame: np.ndarray,
+                             person_boxes: List[Tuple[int, int, int, int]],
+                             tile: int = settings.PPE_CROP_TILE) -> List[Dict]:
+        """Run the PPE detector once on a mosaic of person crops.
+
+        Each crop is scaled into its own square cell; detections are mapped
+        back to frame coordinates.
+        """
+        height, width = frame.shape[:2]
+        columns = int(np.ceil(np.sqrt(len(person_boxes))))
+        rows = int(np.ceil(len(person_boxes) / columns))
+        mosaic = np.zeros((rows * tile, columns * tile) + frame.shape[2:], dtype=frame.dtype)
+
+        cells = []
+        for i, box in enumerate(person_boxes):
+            x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+            x2, y2 = min(width, int(box[2])), min(height, int(box[3]))
+            if x2 <= x1 or y2 <= y1:
+                continue
+            scale = tile / float(max(x2 - x1, y2 - y1))
+            crop = cv2.resize(frame[y1:y2, x1:x2],
+                              (max(1, int((x2 - x1) * scale)), max(1, int((y2 - y1) * scale))))
+            ox, oy = (i % columns) * tile, (i // columns) * tile
+            mosaic[oy:oy + crop.shape[0], ox:ox + crop.shape[1]] = crop
+            cells.append((ox, oy, crop.shape[1], crop.shape[0], x1, y1, scale))
+
+        detections = []
+        for ppe in self.ppe_detector.detect(mosaic):
+            bx1, by1, bx2, by2 = ppe['bbox'][:4]
+            cx, cy = (bx1 + bx2) / 2, (by1 + by2) / 2
+            for ox, oy, cw, ch, x1, y1, scale in cells:
+                if ox <= cx < ox + cw and oy <= cy < oy + ch:
+                    detections.append({
+                        **ppe,
+                        'bbox': (
+                            int(x1 + (bx1 - ox) / scale), int(y1 + (by1 - oy) / scale),
+                            int(x1 + (bx2 - ox) / scale), int(y1 + (by2 - oy) / scale)
+                        )
+                    })
+                    break
+        return detections
         
     def _get_person_zone(self, person_box: Tuple[int, int, int, int]) -> Optional[Dict]:
         """Determine which zone a person is in"""
-        person_center = ((person_box[0] + person_box[2]) // 2,
-                        (person_box[1] + person_box[3]) // 2)
-                        
-        for zone in self.restricted_zones:
-            if self._point_in_polygon(person_center, zone['polygon']):
-                return zone
-        return None
+        return self._get_person_zones([person_box])[0]
+
+    def _get_person_zones(self, person_boxes: List[Tuple[int, int, int, int]]) -> List[Optional[Dict]]:
+        """Determine the first zone containing each person's box center"""
+        if not person_boxes or not self.restricted_zones:
+            return [None] * len(person_boxes)
+
+        boxes = np.asarray(person_boxes, dtype=np.float64)[:, :4]
+        centers = (boxes[:, :2] + boxes[:, 2:]) // 2
+        # Rasterized once per zone layout, rebuilt when configure_zones changes it
+        index = zone_indexes.get([zone['polygon'] for zone in self.restricted_zones], key=id(self))
+        return [
+            self.restricted_zones[i] if i >= 0 else None
+            for i in index.first_zone(centers)
+        ]
         
-    def _check_required_ppe(self, zone: Dict, person_ppe: List[str]) -> List[str]:
+    def _check_required_ppe(self, zone: Dict, person_ppe: Set[str]) -> List[str]:
         """Check if person has all required PPE for a zone"""
-        required = self.required_ppe.get(zone['id'], [])
+        required = self.required_ppe.get(zone['id'], ())
+        if not person_ppe:
+            return list(required)
         return [ppe for ppe in required if ppe not in person_ppe]
         
-    def _detect_poses(self, frame: np.ndarray) -> List[Dict]:
-        """Detect human poses in the frame"""
-        with torch.no_grad():
-            prediction = self.pose_model([torch.from_numpy(frame).permute(2, 0, 1)])
-            
-        poses = []
-        for score, keypoints in zip(prediction[0]['scores'], prediction[0]['keypoints']):
-            if score > 0.7:  # Confidence threshold
-                poses.append({
-                    'keypoints': keypoints.numpy(),
-                    'confidence': score.item()
-                })
-                
-        return poses
-        
     def _analyze_pose_safety(self, pose: Dict) -> List[str]:
         """Analyze pose for unsafe behaviors"""
         unsafe_actions = []
@@ -381,37 +482,6 @@ class SafetyMonitorProcessor:
         knee_angle = self._calculate_angle(hip, knee, ankle)
         return knee_angle < 45  # Unsafe if knees too straight while lifting
         
-    @staticmethod
-    def _boxes_overlap(box1: Tuple[int, int, int, int], 
-                      box2: Tuple[int, int, int, int]) -> bool:
-        """Check if two bounding boxes overlap"""
-        x1_1, y1_1, x2_1, y2_1 = box1
-        x1_2, y1_2, x2_2, y2_2 = box2
-        
-        return not (x2_1 < x1_2 or x2_2 < x1_1 or
-                   y2_1 < y1_2 or y2_2 < y1_1)
-                   
-    @staticmethod
-    def _point_in_polygon(point: Tuple[int, int], polygon: List[Tuple[int, int]]) -> bool:
-        """Check if a point is inside a polygon"""
-        x, y = point
-        n = len(polygon)
-        inside = False
-        
-        p1x, p1y = polygon[0]
-        for i in range(n + 1):
-            p2x, p2y = polygon[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
-            p1x, p1y = p2x, p2y
-            
-        return inside
-        
     @staticmethod
     def _calculate_angle(p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> float:
         """Calculate angle between three points"""
@@ -1,18 +1,19 @@
-import cv2
 import numpy as np
-import torch
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union, Optional
 import asyncio
 import logging
 from datetime import datetime
 from .websocket_service import manager
+from .frame_context import FrameContext
+from .inference_cache import scene_cache
+from .model_store import model_store
+from ..core.runtime import get_torch_device
 
 logger = logging.getLogger(__name__)
 
 class VideoAnalyticsService:
     def __init__(self):
         self.models = {}
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.processing_modules = {
             'residential': self.process_residential,
             'school': self.process_school,
@@ -22,30 +23,47 @@ class VideoAnalyticsService:
             'yolov5': self.process_yolov5
         }
 
+    @property
+    def device(self):
+        return get_torch_device()
+
     async def initialize_models(self):
         """Initialize all necessary ML models"""
         try:
             # Initialize different YOLOv5 model sizes
             model_sizes = ['yolov5s']  # Start with small model, add others as needed
             for size in model_sizes:
-                self.models[size] = torch.hub.load('ultralytics/yolov5', size, pretrained=True)
+                self.models[size] = model_store.load_yolov5(size)
                 self.models[size].to(self.device)
             logger.info("Models initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing models: {str(e)}")
             raise
 
-    async def process_frame(self, frame: np.ndarray, module_type: str) -> Dict:
+    async def process_frame(self, frame: np.ndarray, module_type: str,
+                            camera_id: Optional[str] = None) -> Dict:
         """Process a single frame based on module type"""
         if module_type not in self.processing_modules:
             raise ValueError(f"Unknown module type: {module_type}")
         
-        return await self.processing_modules[module_type](frame)
+        # Frames tagged with a camera can reuse results while the scene is static
+        return await self.processing_modules[module_type](FrameContext.of(frame, camera_id))
+
+    async def _detect(self, frame: Union[FrameContext, np.ndarray],
+                      model_size: str = 'yolov5s', rgb: bool = False):
+        """Run a YOLOv5 model, reusing detections for an unchanged scene"""
+        ctx = FrameContext.of(frame)
+        model = self.models[model_size]
 
-    async def process_residential(self, frame: np.ndarray) -> Dict:
+        async def infer():
+            return model(ctx.rgb if rgb else ctx.frame).pandas().xyxy[0]
+
+        key = f"{model_size}:{'rgb' if rgb else 'bgr'}"
+        return await scene_cache.get_or_compute(ctx.camera_id, key, ctx, infer)
+
+    async def process_residential(self, frame: Union[FrameContext, np.ndarray]) -> Dict:
         """Process frame for residential module"""
-        results = self.models['yolov5s'](frame)
-        detections = results.pandas().xyxy[0]
+        detections = await self._detect(frame)
         
         # Count people
         people_count = len(detections[detections['name'] == 'person'])
@@ -80,10 +98,9 @@ class VideoAnalyticsService:
             'packages': package_detections
         }
 
-    async def process_school(self, frame: np.ndarray) -> Dict:
+    async def process_school(self, frame: Union[FrameContext, np.ndarray]) -> Dict:
         """Process frame for school module"""
-        results = self.models['yolov5s'](frame)
-        detections = results.pandas().xyxy[0]
+        detections = await self._detect(frame)
         
         # Count students
         student_count = len(detections[detections['name'] == 'person'])
@@ -96,10 +113,9 @@ class VideoAnalyticsService:
             'attention_score': attention_score
         }
 
-    async def process_hospital(self, frame: np.ndarray) -> Dict:
+    async def process_hospital(self, frame: Union[FrameContext, np.ndarray]) -> Dict:
         """Process frame for hospital module"""
-        results = self.models['yolov5s'](frame)
-        detections = results.pandas().xyxy[0]
+        detections = await self._detect(frame)
         
         # Detect people and their poses
         people = detections[detections['name'] == 'person']
@@ -112,10 +128,9 @@ class VideoAnalyticsService:
             'fall_detected': fall_detected
         }
 
-    async def process_mine(self, frame: np.ndarray) -> Dict:
+    async def process_mine(self, frame: Union[FrameContext, np.ndarray]) -> Dict:
         """Process frame for mine site module"""
-        results = self.models['yolov5s'](frame)
-        detections = results.pandas().xyxy[0]
+        detections = await self._detect(frame)
         
         # Detect vehicles and equipment
         vehicles = detections[detections['name'].isin(['truck', 'car'])]
@@ -124,10 +139,9 @@ class VideoAnalyticsService:
             'vehicle_count': len(vehicles)
         }
 
-    async def process_traffic(self, frame: np.ndarray) -> Dict:
+    async def process_traffic(self, frame: Union[FrameContext, np.ndarray]) -> Dict:
         """Process frame for traffic module"""
-        results = self.models['yolov5s'](frame)
-        detections = results.pandas().xyxy[0]
+        detections = await self._detect(frame)
         
         # Count vehicles
         vehicles = detections[detections['name'].isin(['car', 'truck', 'bus', 'motorcycle'])]
@@ -137,7 +151,7 @@ class VideoAnalyticsService:
             'traffic_density': len(vehicles) / 100  # Normalized density
         }
 
-    async def process_yolov5(self, frame: np.ndarray, config: dict = None) -> Dict:
+    async def process_yolov5(self, frame: Union[FrameContext, np.ndarray], config: dict = None) -> Dict:
         """Process frame using YOLOv5 model with custom configuration"""
         if config is None:
             config = {}
@@ -149,21 +163,13 @@ class VideoAnalyticsService:
         
         # Initialize model if not already loaded
         if model_size not in self.models:
-            self.models[model_size] = torch.hub.load('ultralytics/yolov5', model_size, pretrained=True)
+            self.models[model_size] = model_store.load_yolov5(model_size)
             self.models[model_size].to(self.device)
         
-        # Convert frame to RGB (YOLOv5 expects RGB)
-        if len(frame.shape) == 3 and frame.shape[2] == 3:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        else:
-            frame_rgb = frame
-            
-        # Run inference
-        model = self.models[model_size]
-        results = model(frame_rgb)
+        # Run inference on RGB input (YOLOv5 expects RGB), reusing a shared conversion
+        detections = await self._detect(frame, model_size, rgb=True)
         
         # Filter detections based on confidence and classes
-        detections = results.pandas().xyxy[0]
         detections = detections[detections['confidence'] >= conf_threshold]
         
         if classes:
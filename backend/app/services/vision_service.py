@@ -1,34 +1,30 @@
 import cv2
 import numpy as np
-import torch
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 from datetime import datetime, timedelta
 import asyncio
+import threading
 from collections import deque
-import tensorflow as tf
-from ..models.detection import YOLODetector
-from ..config import settings
+from ..core.config import settings
+from ..core.runtime import import_tensorflow
+from .frame_context import FrameContext
+from .inference_cache import scene_cache
+from .inference_workers import InferenceWorkerPool, unpack_detections
 
 class VisionService:
     def __init__(self):
-        # Initialize core models
-        self.yolo_detector = YOLODetector(
-            model_path=settings.YOLO_MODEL_PATH,
-            classes=['person', 'car', 'truck', 'bicycle', 'motorcycle']
-        )
-        
-        # Initialize specialized models
-        self.face_detector = cv2.dnn.readNetFromCaffe(
-            settings.FACE_PROTO_PATH,
-            settings.FACE_MODEL_PATH
-        )
-        
-        # Load emotion recognition model
-        self.emotion_model = tf.keras.models.load_model(settings.EMOTION_MODEL_PATH)
+        # Models are loaded on first use so importing the service stays cheap
+        self._model_lock = threading.Lock()
+        self._yolo_detector = None
+        self._face_detector = None
+        self._emotion_model = None
+        # Optional detector processes; detection runs in-process when unset
+        self.worker_pool: Optional[InferenceWorkerPool] = None
         
         # Initialize tracking
-        self.object_tracker = cv2.TrackerCSRT_create()
         self.tracked_objects = {}
+        # Vehicle centroids of each camera's previous frame, for traffic speed
+        self._prev_vehicle_centers: Dict[Optional[str], np.ndarray] = {}
         
         # Initialize analytics storage
         self.analytics_buffer = {
@@ -43,19 +39,58 @@ class VisionService:
         self.processing_times = deque(maxlen=100)
         self.detection_counts = deque(maxlen=100)
         
-    async def process_frame(self, frame: np.ndarray) -> Dict:
+    @property
+    def yolo_detector(self):
+        """Core object detector, loaded on first use"""
+        if self._yolo_detector is None:
+            with self._model_lock:
+                if self._yolo_detector is None:
+                    from ..models.detection import YOLODetector
+                    self._yolo_detector = YOLODetector(
+                        model_path=settings.YOLO_MODEL_PATH,
+                        classes=['person', 'car', 'truck', 'bicycle', 'motorcycle']
+                    )
+        return self._yolo_detector
+
+    @property
+    def face_detector(self):
+        """OpenCV DNN face detector, loaded on first use"""
+        if self._face_detector is None:
+            with self._model_lock:
+                if self._face_detector is None:
+                    self._face_detector = cv2.dnn.readNetFromCaffe(
+                        str(settings.FACE_PROTO_PATH),
+                        str(settings.FACE_MODEL_PATH)
+                    )
+        return self._face_detector
+
+    @property
+    def emotion_model(self):
+        """Emotion recognition model; TensorFlow is only imported here"""
+        if self._emotion_model is None:
+            with self._model_lock:
+                if self._emotion_model is None:
+                    tf = import_tensorflow()
+                    self._emotion_model = tf.keras.models.load_model(str(settings.EMOTION_MODEL_PATH))
+        return self._emotion_model
+
+    async def process_frame(self, frame: Union[FrameContext, np.ndarray],
+                            detections: Optional[List[Dict]] = None) -> Dict:
         """Process a single frame with all available analytics"""
         start_time = datetime.now()
+        ctx = FrameContext.of(frame)
+        frame = ctx.frame
         
-        # Basic object detection
-        detections = await self._detect_objects(frame)
+        # Basic object detection (skipped when a shared pass already ran it)
+        if detections is None:
+            detections = await self.detect_objects(ctx)
         
         # Face and emotion analysis
-        faces = await self._detect_faces(frame)
-        emotions = await self._analyze_emotions(frame, faces)
+        faces = await self._detect_faces(ctx)
+        emotions = await self._analyze_emotions(ctx, faces)
         
         # Motion and activity analysis
-        motion = await self._analyze_motion(frame)
+        motion = await self._analyze_motion(ctx)
         
         # Track objects across frames
         tracked = await self._track_objects(frame, detections)
@@ -82,16 +117,105 @@ class VisionService:
             'analytics': self._get_analytics_summary()
         }
         
+    async def detect_objects(self, frame: Union[FrameContext, np.ndarray]) -> List[Dict]:
+        """Run the object detector once for a frame"""
+        ctx = FrameContext.of(frame)
+        # Reuse the previous detections while the camera's scene is unchanged
+        return await scene_cache.get_or_compute(
+            ctx.camera_id, 'detections', ctx,
+            lambda: self._detect_objects(ctx.frame)
+        )
+
+    async def count_people(self, frame: Union[FrameContext, np.ndarray],
+                           zone_id: Optional[str] = None,
+                           detections: Optional[List[Dict]] = None) -> Dict:
+        """Count people in a frame, reusing shared detections when given"""
+        if detections is None:
+            detections = await self.detect_objects(frame)
+        people = [d for d in detections if d['class'] == 'person']
+        return {
+            'zone_id': zone_id,
+            'count': len(people),
+            'detections': people,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    async def analyze_traffic(self, frame: Union[FrameContext, np.ndarray],
+                              detections: Optional[List[Dict]] = None) -> Dict:
+        """Derive traffic flow metrics from vehicle detections"""
+        if detections is None:
+            detections = await self.detect_objects(frame)
+        vehicles = [d for d in detections
+                    if d['class'] in ('car', 'truck', 'bicycle', 'motorcycle')]
+
+        # Approximate speed as mean centroid displacement since the camera's last frame
+        ctx = FrameContext.of(frame)
+        centers = np.array([[(d['bbox'][0] + d['bbox'][2]) / 2,
+                             (d['bbox'][1] + d['bbox'][3]) / 2] for d in vehicles])
+        avg_speed = 0.0
+        prev_centers = self._prev_vehicle_centers.get(ctx.camera_id)
+        if len(centers) and prev_centers is not None and len(prev_centers):
+            distances = np.linalg.norm(centers[:, None, :] - prev_centers[None, :, :], axis=2)
+            avg_speed = float(distances.min(axis=1).mean())
+        self._prev_vehicle_centers[ctx.camera_id] = centers
+
+        return {
+            'currentFlow': len(vehicles),
+            'avgSpeed': avg_speed,
+            'congestionLevel': min(len(vehicles), 100),  # Percent of a 100 vehicle capacity
+            'timestamp': datetime.now().isoformat()
+        }
+
+    async def detect_safety_violations(self, frame: Union[FrameContext, np.ndarray],
+                                       detections: Optional[List[Dict]] = None) -> Dict:
+        """Detect proximity violations between people in a frame"""
+        if detections is None:
+            detections = await self.detect_objects(frame)
+        people = [d for d in detections if d['class'] == 'person']
+
+        violations = []
+        for i, person1 in enumerate(people):
+            for person2 in people[i + 1:]:
+                distance = self._calculate_distance(person1['bbox'], person2['bbox'])
+                if distance < settings.MIN_SAFE_DISTANCE:
+                    violations.append({
+                        'type': 'proximity',
+                        'description': f"People within {distance:.0f}px of each other",
+                        'distance': float(distance)
+                    })
+
+        return {
+            'violations': violations,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    async def start_worker_pool(self, workers: Optional[int] = None):
+        """Move object detection into a pool of inference processes"""
+        if self.worker_pool is None:
+            pool = InferenceWorkerPool(workers=workers)
+            await pool.start()
+            self.worker_pool = pool
+
+    async def stop_worker_pool(self):
+        if self.worker_pool is not None:
+            pool, self.worker_pool = self.worker_pool, None
+            await pool.stop()
+
     async def _detect_objects(self, frame: np.ndarray) -> List[Dict]:
         """Detect objects in frame using YOLO"""
-        detections = self.yolo_detector.detect(frame)
+        if self.worker_pool is not None:
+            detections = unpack_detections(await self.worker_pool.submit(frame))
+        else:
+            detections = self.yolo_detector.detect(frame)
         self.detection_counts.append(len(detections))
         return detections
         
-    async def _detect_faces(self, frame: np.ndarray) -> List[Dict]:
+    async def _detect_faces(self, frame: Union[FrameContext, np.ndarray]) -> List[Dict]:
         """Detect faces in frame"""
+        ctx = FrameContext.of(frame)
+        frame = ctx.frame
         blob = cv2.dnn.blobFromImage(
-            cv2.resize(frame, (300, 300)), 1.0,
+            ctx.resized((300, 300)), 1.0,
             (300, 300), (104.0, 177.0, 123.0)
         )
         self.face_detector.setInput(blob)
@@ -110,18 +234,20 @@ class VisionService:
         
         return faces
         
-    async def _analyze_emotions(self, frame: np.ndarray, faces: List[Dict]) -> List[Dict]:
+    async def _analyze_emotions(self, frame: Union[FrameContext, np.ndarray],
+                                faces: List[Dict]) -> List[Dict]:
         """Analyze emotions in detected faces"""
+        # Crop from the shared grayscale view instead of converting every face
+        gray = FrameContext.of(frame).gray
         emotions = []
         for face in faces:
             x1, y1, x2, y2 = face['bbox']
-            face_img = frame[y1:y2, x1:x2]
+            face_img = gray[y1:y2, x1:x2]
             if face_img.size == 0:
                 continue
                 
             # Preprocess for emotion detection
             face_img = cv2.resize(face_img, (48, 48))
-            face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
             face_img = np.expand_dims(face_img, axis=0)
             face_img = np.expand_dims(face_img, axis=-1)
             
@@ -138,11 +264,10 @@ class VisionService:
             
         return emotions
         
-    async def _analyze_motion(self, frame: np.ndarray) -> Dict:
+    async def _analyze_motion(self, frame: Union[FrameContext, np.ndarray]) -> Dict:
         """Analyze motion and activity levels"""
-        # Convert frame to grayscale for motion detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        # Blurred grayscale view is shared with other consumers of this frame
+        gray = FrameContext.of(frame).blurred_gray((21, 21))
         
         # Compare with previous frame if available
         if not hasattr(self, 'prev_frame'):
@@ -317,3 +442,5 @@ class VisionService:
             if VisionService._calculate_distance(bbox, tracked['bbox']) < 50:
                 return True
         return False
+
+vision_service = VisionService()
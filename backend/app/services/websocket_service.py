@@ -1,40 +1,76 @@
 from fastapi import WebSocket, WebSocketDisconnect
 from typing import Dict, List
+import asyncio
 import json
 import logging
+from ..core.config import settings
+from .backpressure import StageQueue
 
 logger = logging.getLogger(__name__)
 
+class ClientOutbox:
+    """Bounded send queue of one WebSocket client, drained by its own task.
+
+    Broadcasts only enqueue, so a slow client never holds up the producer
+    or other clients. With the default 'drop_oldest' policy a client that
+    falls behind skips straight to the newest messages.
+    """
+
+    def __init__(self, websocket: WebSocket, name: str,
+                 maxsize: int = settings.WEBSOCKET_SEND_QUEUE_SIZE,
+                 policy: str = settings.WEBSOCKET_SEND_POLICY):
+        self.websocket = websocket
+        self.queue = StageQueue(name, maxsize, policy)
+        self.task = asyncio.create_task(self._run(), name=name)
+
+    async def send(self, message: dict) -> bool:
+        return await self.queue.put(message)
+
+    def close(self):
+        self.task.cancel()
+
+    async def _run(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.websocket.send_json(message)
+            except WebSocketDisconnect:
+                return
+            except Exception as e:
+                logger.error(f"Error sending websocket message: {str(e)}")
+            finally:
+                self.queue.task_done()
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.outboxes: Dict[WebSocket, ClientOutbox] = {}
 
     async def connect(self, websocket: WebSocket, module: str):
         await websocket.accept()
         if module not in self.active_connections:
             self.active_connections[module] = []
         self.active_connections[module].append(websocket)
+        self.outboxes[websocket] = ClientOutbox(websocket, f"websocket:{module}:{id(websocket):x}")
         logger.info(f"Client connected to module: {module}")
 
     def disconnect(self, websocket: WebSocket, module: str):
         if module in self.active_connections:
             self.active_connections[module].remove(websocket)
             logger.info(f"Client disconnected from module: {module}")
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox:
+            outbox.close()
 
     async def broadcast_to_module(self, message: dict, module: str):
-        if module in self.active_connections:
-            for connection in self.active_connections[module]:
-                try:
-                    await connection.send_json(message)
-                except WebSocketDisconnect:
-                    await self.disconnect(connection, module)
-                except Exception as e:
-                    logger.error(f"Error broadcasting message: {str(e)}")
+        for connection in list(self.active_connections.get(module, [])):
+            await self.send_personal_message(message, connection)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Error sending personal message: {str(e)}")
+        outbox = self.outboxes.get(websocket)
+        if outbox is None:
+            logger.error("Error sending personal message: client is not connected")
+            return
+        await outbox.send(message)
 
 manager = ConnectionManager()
@@ -0,0 +1,309 @@
+import math
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Combiner:
+    """Incremental aggregate: create an accumulator, add values, merge partials."""
+
+    def create(self) -> Any:
+        raise NotImplementedError
+
+    def add(self, acc: Any, value: Any) -> Any:
+        raise NotImplementedError
+
+    def merge(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError
+
+    def result(self, acc: Any) -> Any:
+        return acc
+
+    def restore(self, acc: Any) -> Any:
+        """Accumulator from its saved form (e.g. after a BSON round trip)."""
+        return acc
+
+
+class SumCombiner(Combiner):
+    def create(self):
+        return 0.0
+
+    def add(self, acc, value):
+        return acc + float(value)
+
+    def merge(self, a, b):
+        return a + b
+
+
+class CountCombiner(Combiner):
+    def create(self):
+        return 0
+
+    def add(self, acc, value):
+        return acc + 1
+
+    def merge(self, a, b):
+        return a + b
+
+
+class MeanCombiner(Combiner):
+    def create(self):
+        return (0.0, 0)
+
+    def add(self, acc, value):
+        return (acc[0] + float(value), acc[1] + 1)
+
+    def merge(self, a, b):
+        return (a[0] + b[0], a[1] + b[1])
+
+    def result(self, acc):
+        return acc[0] / acc[1] if acc[1] else None
+
+    def restore(self, acc):
+        # Stored documents turn the (sum, count) tuple into a list
+        return tuple(acc)
+
+
+class MinCombiner(Combiner):
+    def create(self):
+        return None
+
+    def add(self, acc, value):
+        return float(value) if acc is None else min(acc, float(value))
+
+    def merge(self, a, b):
+        if a is None or b is None:
+            return b if a is None else a
+        return min(a, b)
+
+
+class MaxCombiner(MinCombiner):
+    def add(self, acc, value):
+        return float(value) if acc is None else max(acc, float(value))
+
+    def merge(self, a, b):
+        if a is None or b is None:
+            return b if a is None else a
+        return max(a, b)
+
+
+class HistogramCombiner(Combiner):
+    """Sums `{bin: value}` mappings bin by bin."""
+
+    def create(self):
+        return {}
+
+    def add(self, acc, value):
+        for name, count in value.items():
+            acc[name] = acc.get(name, 0.0) + float(count)
+        return acc
+
+    def merge(self, a, b):
+        merged = dict(a)
+        return self.add(merged, b)
+
+
+COMBINERS: Dict[str, Combiner] = {
+    'sum': SumCombiner(),
+    'count': CountCombiner(),
+    'mean': MeanCombiner(),
+    'min': MinCombiner(),
+    'max': MaxCombiner(),
+    'histogram': HistogramCombiner(),
+}
+
+
+class WindowAggregator:
+    """Event-time tumbling or sliding window aggregation per key.
+
+    Windows are `[k * slide, k * slide + size)`; without `slide` they
+    tumble. Each event is folded into a single pane of `gcd(size, slide)`
+    seconds, so the cost per event is one combiner update per output field
+    regardless of how many windows overlap it. Panes are merged only when
+    a window closes.
+
+    A key's windows close once its watermark (latest event time minus
+    `allowed_lateness`) passes their end. Watermarks only follow event
+    time, so a key whose events arrive late (consumer lag, backpressure)
+    loses nothing. Keys that received no events for `idle_timeout` seconds
+    of processing time (`clock`) are advanced by `advance_all` as if their
+    event time had kept pace with the clock since their last event. Each
+    window closes exactly once and only windows that received events are
+    reported. Events older than the oldest open window are dropped as late.
+
+    `fields` maps output names to `(input_name, combiner_name)`.
+    """
+
+    def __init__(self, size: float, fields: Dict[str, Tuple[str, str]],
+                 slide: Optional[float] = None, allowed_lateness: float = 0.0,
+                 idle_timeout: Optional[float] = None,
+                 on_close: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.size = float(size)
+        self.slide = float(slide or size)
+        if self.slide > self.size:
+            raise ValueError("Window slide must not exceed window size")
+        self.pane = math.gcd(round(self.size * 1000), round(self.slide * 1000)) / 1000.0
+        self.allowed_lateness = allowed_lateness
+        self.idle_timeout = allowed_lateness if idle_timeout is None else idle_timeout
+        self.clock = clock
+        self.fields = {
+            name: (source, COMBINERS[combiner]) for name, (source, combiner) in fields.items()
+        }
+        self.on_close = on_close
+
+        # key -> {pane_start: {'count': n, field: accumulator}}
+        self.panes: Dict[str, Dict[float, Dict[str, Any]]] = {}
+        self.next_end: Dict[str, float] = {}
+        # Start of the oldest window still open; earlier panes are final
+        self.closed_until: Dict[str, float] = {}
+        self.watermarks: Dict[str, float] = {}
+        # Processing time of each key's latest event
+        self.last_seen: Dict[str, float] = {}
+        self.metrics = {'events': 0, 'late_events': 0, 'windows_closed': 0}
+
+    def add(self, key: str, timestamp: float, values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fold one event into its pane and return any windows it closes."""
+        key = str(key)
+        self.metrics['events'] += 1
+        self.last_seen[key] = self.clock()
+
+        pane_start = math.floor(timestamp / self.pane) * self.pane
+        closed_until = self.closed_until.get(key, -math.inf)
+        if pane_start < closed_until:
+            self.metrics['late_events'] += 1
+            return []
+
+        panes = self.panes.setdefault(key, {})
+        pane = panes.get(pane_start)
+        if pane is None:
+            pane = panes[pane_start] = self._new_accumulators()
+        pane['count'] += 1
+        for name, (source, combiner) in self.fields.items():
+            value = values.get(source)
+            if value is not None:
+                pane[name] = combiner.add(pane[name], value)
+
+        if key not in self.next_end:
+            self.next_end[key] = max(self._first_end(timestamp), closed_until + self.size)
+
+        watermark = max(self.watermarks.get(key, -math.inf), timestamp - self.allowed_lateness)
+        self.watermarks[key] = watermark
+        return self._close(key, watermark)
+
+    def advance(self, key: str, watermark: float) -> List[Dict[str, Any]]:
+        """Move one key's watermark forward and close the windows it passes."""
+        key = str(key)
+        if watermark <= self.watermarks.get(key, -math.inf):
+            return []
+        self.watermarks[key] = watermark
+        return self._close(key, watermark)
+
+    def advance_all(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Close due windows of keys idle for `idle_timeout` at processing time `now`."""
+        now = self.clock() if now is None else now
+        closed = []
+        for key in list(self.next_end):
+            idle = now - self.last_seen.get(key, now)
+            if idle < self.idle_timeout or key not in self.watermarks:
+                continue
+            # Let the key's event time run on with the clock since its last event
+            closed.extend(self.advance(key, self.watermarks[key] + idle))
+            self.last_seen[key] = now
+        return closed
+
+    def remove(self, key: str) -> Dict[str, Any]:
+        """Drop a key and return its open state (see `restore`)."""
+        key = str(key)
+        self.last_seen.pop(key, None)
+        return {
+            'panes': self.panes.pop(key, {}),
+            'next_end': self.next_end.pop(key, None),
+            'closed_until': self.closed_until.pop(key, None),
+            'watermark': self.watermarks.pop(key, None)
+        }
+
+    def restore(self, key: str, state: Dict[str, Any]):
+        """Resume a key from state returned by `remove`."""
+        key = str(key)
+        if state.get('closed_until') is not None:
+            self.closed_until[key] = state['closed_until']
+        if state.get('next_end') is None:
+            return
+        self.panes[key] = {float(start): self._restore_pane(pane) for start, pane in state['panes'].items()}
+        self.next_end[key] = state['next_end']
+        self.last_seen[key] = self.clock()
+        if state.get('watermark') is not None:
+            self.watermarks[key] = state['watermark']
+
+    def keys(self) -> List[str]:
+        return list(self.next_end)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            'keys': len(self.next_end),
+            'open_panes': sum(len(p) for p in self.panes.values())
+        }
+
+    def _restore_pane(self, pane: Dict[str, Any]) -> Dict[str, Any]:
+        restored = {'count': pane['count']}
+        for name, (_, combiner) in self.fields.items():
+            restored[name] = combiner.restore(pane[name])
+        return restored
+
+    def _new_accumulators(self) -> Dict[str, Any]:
+        pane = {'count': 0}
+        for name, (_, combiner) in self.fields.items():
+            pane[name] = combiner.create()
+        return pane
+
+    def _first_end(self, timestamp: float) -> float:
+        """End of the earliest window that contains `timestamp`."""
+        start = (math.floor((timestamp - self.size) / self.slide) + 1) * self.slide
+        return start + self.size
+
+    def _close(self, key: str, watermark: float) -> List[Dict[str, Any]]:
+        closed = []
+        panes = self.panes.get(key, {})
+        while key in self.next_end and self.next_end[key] <= watermark:
+            end = self.next_end[key]
+            start = end - self.size
+            window_panes = [pane for pane_start, pane in panes.items() if start <= pane_start < end]
+            if window_panes:
+                closed.append(self._result(key, start, end, window_panes))
+
+            # Panes before the next window's start can no longer contribute
+            next_start = start + self.slide
+            self.closed_until[key] = next_start
+            for pane_start in [p for p in panes if p < next_start]:
+                del panes[pane_start]
+            if not panes:
+                # Nothing buffered: the next event picks the next window
+                del self.next_end[key]
+                self.panes.pop(key, None)
+                break
+            # Skip empty windows between here and the oldest remaining pane
+            self.next_end[key] = max(end + self.slide, self._first_end(min(panes)))
+
+        self.metrics['windows_closed'] += len(closed)
+        if self.on_close:
+            for window in closed:
+                try:
+                    self.on_close(window)
+                except Exception as e:
+                    logger.error(f"Error in window close handler for {key}: {str(e)}")
+        return closed
+
+    def _result(self, key: str, start: float, end: float,
+                panes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        result = {'key': key, 'window_start': start, 'window_end': end,
+                  'count': sum(pane['count'] for pane in panes)}
+        for name, (_, combiner) in self.fields.items():
+            acc = combiner.create()
+            for pane in panes:
+                acc = combiner.merge(acc, pane[name])
+            result[name] = combiner.result(acc)
+        return result
@@ -0,0 +1,144 @@
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional
+import numpy as np
+from pymongo.errors import BulkWriteError
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MongoWriteBatcher:
+    """Write-behind batcher for one MongoDB collection.
+
+    Documents are buffered and written with `insert_many(ordered=False)`
+    once `max_batch` documents are waiting or the oldest has waited
+    `max_delay` seconds. At most `max_pending` documents (buffered plus
+    being written) are held; `add` waits for room beyond that, which pushes
+    backpressure up to whoever produces the documents.
+    """
+
+    def __init__(self, collection, name: Optional[str] = None,
+                 max_batch: int = settings.MONGO_BATCH_SIZE,
+                 max_delay: float = settings.MONGO_BATCH_MAX_DELAY,
+                 max_pending: int = settings.MONGO_BATCH_MAX_PENDING):
+        self.collection = collection
+        self.name = name or getattr(collection, 'name', 'collection')
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max(max_pending, max_batch)
+
+        self.buffer: List[Dict[str, Any]] = []
+        self._room = asyncio.Semaphore(self.max_pending)
+        self._ready = asyncio.Event()
+        self._oldest: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.metrics = {
+            'documents': 0,
+            'written': 0,
+            'failed': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'backpressure_waits': 0
+        }
+        self._latencies = deque(maxlen=1000)
+        self._batch_sizes = deque(maxlen=1000)
+
+    def start(self):
+        """Start the background flush task on the running loop."""
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name=f'mongo-batcher-{self.name}')
+
+    async def stop(self):
+        """Flush everything still buffered and stop the flush task."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._ready.set()
+        await self._task
+        self._task = None
+
+    async def add(self, document: Dict[str, Any]):
+        """Queue a document for insertion, waiting while the batcher is full."""
+        if self._room.locked():
+            self.metrics['backpressure_waits'] += 1
+        await self._room.acquire()
+
+        if not self.buffer:
+            self._oldest = time.monotonic()
+        self.buffer.append(document)
+        self.metrics['documents'] += 1
+        if len(self.buffer) >= self.max_batch:
+            self._ready.set()
+
+    async def flush(self, full_only: bool = False):
+        """Write buffered documents in batches of at most `max_batch`.
+
+        With `full_only`, a trailing partial batch stays buffered until its
+        age or a later size trigger flushes it.
+        """
+        while len(self.buffer) >= self.max_batch or (self.buffer and not full_only):
+            batch = self.buffer[:self.max_batch]
+            del self.buffer[:self.max_batch]
+            self._oldest = time.monotonic() if self.buffer else None
+            await self._write(batch)
+
+    async def _run(self):
+        while True:
+            timeout = None
+            if self._oldest is not None:
+                timeout = max(0.0, self._oldest + self.max_delay - time.monotonic())
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+
+            # Age threshold or shutdown flush everything, size only full batches
+            if self.buffer:
+                expired = time.monotonic() - self._oldest >= self.max_delay
+                await self.flush(full_only=not (self._closing or expired))
+            if self._closing and not self.buffer:
+                return
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        try:
+            result = await self.collection.insert_many(batch, ordered=False)
+            self.metrics['written'] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Unordered: everything except the reported errors was written
+            failed = len(e.details.get('writeErrors', []))
+            self.metrics['written'] += e.details.get('nInserted', len(batch) - failed)
+            self.metrics['failed'] += failed
+            logger.error(f"{failed} of {len(batch)} inserts into {self.name} failed: "
+                         f"{e.details.get('writeErrors', [])[:1]}")
+        except Exception as e:
+            self.metrics['failed'] += len(batch)
+            self.metrics['flush_errors'] += 1
+            logger.error(f"Error flushing {len(batch)} documents to {self.name}: {str(e)}")
+        finally:
+            self.metrics['flushes'] += 1
+            self._latencies.append((time.perf_counter() - start) * 1000)
+            self._batch_sizes.append(len(batch))
+            for _ in batch:
+                self._room.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Write counters, batch sizes and flush latency percentiles."""
+        latencies = np.array(self._latencies) if self._latencies else np.zeros(1)
+        return {
+            **self.metrics,
+            'buffered': len(self.buffer),
+            'avg_batch_size': float(np.mean(self._batch_sizes)) if self._batch_sizes else 0.0,
+            'flush_latency_ms': {
+                'p50': float(np.percentile(latencies, 50)),
+                'p95': float(np.percentile(latencies, 95)),
+                'max': float(latencies.max())
+            }
+        }
@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+from typing import Optional, Sequence, Tuple, Hashable
+from collections import OrderedDict
+import threading
+import logging
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ZoneIndex:
+    """Zone polygons rasterized once into a packed bit mask.
+
+    Each pixel of the mask holds one bit per zone, so overlapping zones are
+    supported. The mask covers the bounding box of all polygons at a working
+    resolution whose longest side is at most `max_side`; membership for any
+    number of points is then a single array gather.
+    """
+
+    def __init__(self, polygons: Sequence[Sequence[Sequence[float]]],
+                 max_side: int = settings.ZONE_MASK_MAX_SIDE):
+        self.size = len(polygons)
+        self.mask: Optional[np.ndarray] = None
+        if not self.size:
+            return
+
+        arrays = [np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in polygons]
+        vertices = np.concatenate(arrays)
+        self.origin = vertices.min(axis=0)
+        extent = vertices.max(axis=0) - self.origin
+        self.scale = min(1.0, max_side / max(float(extent.max()), 1.0))
+        width = int(np.ceil(extent[0] * self.scale)) + 1
+        height = int(np.ceil(extent[1] * self.scale)) + 1
+
+        self.mask = np.zeros((height, width, (self.size + 7) // 8), dtype=np.uint8)
+        layer = np.zeros((height, width), dtype=np.uint8)
+        for i, polygon in enumerate(arrays):
+            layer.fill(0)
+            points = np.round((polygon - self.origin) * self.scale).astype(np.int32)
+            cv2.fillPoly(layer, [points], 1)
+            # Same bit order as np.packbits so rows unpack straight to zone order
+            self.mask[:, :, i // 8] |= layer << (7 - i % 8)
+
+    def membership(self, points: np.ndarray) -> np.ndarray:
+        """Boolean matrix (points x zones) of which zones contain each point."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.mask is None or len(points) == 0:
+            return np.zeros((len(points), self.size), dtype=bool)
+
+        cells = np.round((points - self.origin) * self.scale).astype(np.int64)
+        height, width = self.mask.shape[:2]
+        inside = (
+            (cells[:, 0] >= 0) & (cells[:, 0] < width) &
+            (cells[:, 1] >= 0) & (cells[:, 1] < height)
+        )
+        packed = np.zeros((len(points), self.mask.shape[2]), dtype=np.uint8)
+        packed[inside] = self.mask[cells[inside, 1], cells[inside, 0]]
+        return np.unpackbits(packed, axis=1, count=self.size).astype(bool)
+
+    def first_zone(self, points: np.ndarray) -> np.ndarray:
+        """Index of the first zone containing each point, or -1."""
+        member = self.membership(points)
+        if self.size == 0:
+            return np.full(len(member), -1, dtype=np.int64)
+        first = member.argmax(axis=1)
+        first[~member.any(axis=1)] = -1
+        return first
+
+    def counts(self, points: np.ndarray) -> np.ndarray:
+        """Number of points inside each zone."""
+        return self.membership(points).sum(axis=0)
+
+
+class ZoneIndexRegistry:
+    """Keeps a ZoneIndex per camera (or zone layout), rebuilt when zones change."""
+
+    def __init__(self, max_entries: int = settings.ZONE_INDEX_CACHE_SIZE,
+                 max_side: int = settings.ZONE_MASK_MAX_SIDE):
+        self.max_entries = max_entries
+        self.max_side = max_side
+        self._lock = threading.Lock()
+        self._indexes: 'OrderedDict[Hashable, Tuple[Hashable, ZoneIndex]]' = OrderedDict()
+
+    def get(self, polygons: Sequence[Sequence[Sequence[float]]],
+            key: Optional[Hashable] = None) -> ZoneIndex:
+        """Return the index for `polygons`, rasterizing only if they changed."""
+        signature = self.signature(polygons)
+        key = signature if key is None else key
+
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is not None and entry[0] == signature:
+                self._indexes.move_to_end(key)
+                return entry[1]
+
+        index = ZoneIndex(polygons, self.max_side)
+        with self._lock:
+            self._indexes[key] = (signature, index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one cached index, or all of them."""
+        with self._lock:
+            if key is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(key, None)
+
+    @staticmethod
+    def signature(polygons: Sequence[Sequence[Sequence[float]]]) -> Hashable:
+        return tuple(
+            np.asarray(polygon, dtype=np.float64).tobytes() for polygon in polygons
+        )
+
+
+zone_indexes = ZoneIndexRegistry()
@@ -2,8 +2,18 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+import asyncio
+import socketio
 import uvicorn
+from app.core.runtime import configure_runtime
+
+# Size framework thread pools for this worker before any model is loaded
+configure_runtime()
+
 from app.api.v1.endpoints import cameras, school, widgets, websockets
+from app.core.config import settings
+from app.services.vision_service import vision_service
+from app.services.socketio_server import sio
 
 app = FastAPI(
     title="Visioncave API",
@@ -33,6 +43,42 @@ app.include_router(school.router, prefix="/api/v1/school", tags=["school"])
 app.include_router(widgets.router, prefix="/api/v1/widgets", tags=["widgets"])
 app.include_router(websockets.router, prefix="/api/v1/ws", tags=["websockets"])
 
+@app.on_event("startup")
+async def start_inference_workers():
+    if settings.INFERENCE_POOL_ENABLED:
+        await vision_service.start_worker_pool()
+
+@app.on_event("shutdown")
+async def stop_inference_workers():
+    await vision_service.stop_worker_pool()
+
+realtime_consumers = None
+
+@app.on_event("startup")
+async def start_realtime_processor():
+    global realtime_consumers
+    if not settings.REALTIME_PROCESSOR_ENABLED:
+        return
+    from app.services.realtime_processor import RealtimeProcessor, RealtimeConsumerPool
+    if settings.REALTIME_CONSUMER_PROCESSES > 1:
+        realtime_consumers = RealtimeConsumerPool()
+        realtime_consumers.start()
+    else:
+        await RealtimeProcessor.get_instance().start()
+
+@app.on_event("shutdown")
+async def stop_realtime_processor():
+    if not settings.REALTIME_PROCESSOR_ENABLED:
+        return
+    from app.services.realtime_processor import RealtimeProcessor
+    if realtime_consumers is not None:
+        await asyncio.to_thread(realtime_consumers.stop)
+    else:
+        await RealtimeProcessor.get_instance().stop()
+
+# Socket.IO (realtime camera updates) is served next to the API at /socket.io
+asgi_app = socketio.ASGIApp(sio, other_asgi_app=app)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Visioncave API"}
@@ -41,5 +87,19 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/pipeline")
+async def pipeline_health():
+    """Depth, capacity and drop counters of every bounded pipeline stage,
+    and the hit rate of the scene result cache."""
+    from app.services.backpressure import stage_gauges
+    from app.services.inference_cache import scene_cache
+    return {
+        "stages": stage_gauges.get_stats(),
+        "scene_cache": {
+            "total": scene_cache.get_stats(),
+            "cameras": {camera_id: scene_cache.get_stats(camera_id) for camera_id in sorted(scene_cache.metrics)}
+        }
+    }
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("main:asgi_app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+
+from app.services import realtime_service, vision_service as vision_module
+from app.services.frame_context import FrameContext
+from app.services.inference_cache import SceneResultCache
+from app.services.realtime_service import ConnectionManager
+from app.services.vision_service import VisionService
+
+
+class CountingVision(VisionService):
+    def __init__(self, detections):
+        super().__init__()
+        self.detections = detections
+        self.passes = 0
+
+    async def _detect_objects(self, frame):
+        self.passes += 1
+        await asyncio.sleep(0.01)  # both processors are waiting on the pass
+        return self.detections
+
+
+def _box(label, x, y):
+    return {'class': label, 'bbox': [x, y, x + 10, y + 10], 'confidence': 0.9}
+
+
+def test_subscribed_processors_share_one_detection_pass(monkeypatch):
+    vision = CountingVision([_box('person', 0, 0), _box('person', 50, 50), _box('car', 100, 100)])
+    monkeypatch.setattr(realtime_service, 'vision_service', vision)
+    monkeypatch.setattr(vision_module, 'scene_cache', SceneResultCache(enabled=False))
+    manager = ConnectionManager()
+    manager.data_processors = {name: manager.data_processors[name] for name in ('occupancy', 'traffic')}
+    people = []
+    count_people = vision.count_people
+
+    async def recording_count_people(*args, **kwargs):
+        people.append(await count_people(*args, **kwargs))
+        return people[-1]
+
+    monkeypatch.setattr(vision, 'count_people', recording_count_people)
+
+    asyncio.run(manager.update_camera_frame('cam_cafeteria', np.zeros((48, 64, 3), dtype=np.uint8)))
+
+    assert vision.passes == 1
+    assert [(p['zone_id'], p['count']) for p in people] == [('2', 2)]
+    assert manager.data_processors['occupancy'].zones[2]['current'] == 2
+    assert manager.data_processors['traffic'].current_flow == 1
+
+
+def test_traffic_speed_is_measured_against_the_same_camera():
+    vision = VisionService()
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    async def speed(camera_id, x):
+        result = await vision.analyze_traffic(FrameContext(frame, camera_id), detections=[_box('car', x, 0)])
+        return result['avgSpeed']
+
+    async def run():
+        return [await speed('north', 0), await speed('south', 300), await speed('north', 4)]
+
+    assert asyncio.run(run()) == [0.0, 0.0, 4.0]
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.services.anomaly_stream import StreamingAnomalyDetector, hour_of_week
+
+MONDAY_9AM = datetime(2024, 1, 8, 9, tzinfo=timezone.utc).timestamp()
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def replace_one(self, query, document, upsert=False):
+        self.docs[query['_id']] = document
+
+    def find(self, query):
+        partitions = query.get('partition', {}).get('$in')
+        return FakeCursor(d for d in self.docs.values() if partitions is None or d['partition'] in partitions)
+
+
+def warm_up(detector, camera_id='cam', start=MONDAY_9AM, events=200):
+    rng = np.random.default_rng(0)
+    for i in range(events):
+        detector.score(camera_id, start + i, {'object_count': 10 + rng.normal(0, 2), 'average_speed': 1.0})
+
+
+def test_hour_of_week_starts_on_monday():
+    assert hour_of_week(datetime(2024, 1, 8, tzinfo=timezone.utc).timestamp()) == 0
+    assert hour_of_week(MONDAY_9AM) == 9
+    assert hour_of_week(datetime(2024, 1, 14, 23, 30, tzinfo=timezone.utc).timestamp()) == 167
+
+
+def test_spike_alerts_once_per_cooldown_and_stays_out_of_baseline():
+    detector = StreamingAnomalyDetector(threshold=4.0, min_samples=30, cooldown=60)
+    warm_up(detector)
+    before = detector.baseline('cam', 'object_count', MONDAY_9AM)
+    assert abs(before['mean'] - 10) < 0.5
+
+    alerts = detector.score('cam', MONDAY_9AM + 300, {'object_count': 60, 'average_speed': 1.0})
+    assert [(a['metric'], a['direction']) for a in alerts] == [('object_count', 'above')]
+    assert alerts[0]['hour_of_week'] == 9 and alerts[0]['z_score'] >= 4.0
+    assert detector.score('cam', MONDAY_9AM + 310, {'object_count': 60}) == []
+    assert detector.get_stats()['suppressed'] == 1
+
+    after = detector.baseline('cam', 'object_count', MONDAY_9AM)
+    assert after['count'] == before['count'] and after['mean'] == before['mean']
+
+
+def test_baselines_are_seasonal_and_need_warm_up():
+    detector = StreamingAnomalyDetector(min_samples=30)
+    warm_up(detector)
+    # Same camera at another hour of the week has no history yet
+    assert detector.score('cam', MONDAY_9AM + 3 * 3600, {'object_count': 500}) == []
+    assert detector.score('other', MONDAY_9AM, {'object_count': 500}) == []
+
+
+def test_checkpoint_and_load_restore_baselines_by_partition():
+    collection = FakeCollection()
+    detector = StreamingAnomalyDetector(collection)
+    warm_up(detector)
+    asyncio.run(detector.checkpoint({'cam': 3}))
+    assert detector.get_stats()['dirty'] == 0
+    assert len(collection.docs['cam']['stats']) == 2 * 168 * 5 * 8
+
+    restored = StreamingAnomalyDetector(collection, metrics=('object_count',))
+    assert asyncio.run(restored.load([1])) == 0
+    assert asyncio.run(restored.load([3])) == 1
+    assert restored.baseline('cam', 'object_count', MONDAY_9AM) == detector.baseline('cam', 'object_count', MONDAY_9AM)
+    assert restored.score('cam', MONDAY_9AM + 300, {'object_count': 60})
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.backpressure import StageQueue, ThreadStageQueue, stage_gauges
+
+
+def test_block_policy_pauses_producer_until_slow_sink_catches_up():
+    async def run():
+        stage = StageQueue('test:block', maxsize=2)
+        consumed = []
+
+        async def slow_sink():
+            while len(consumed) < 10:
+                consumed.append(await stage.get())
+                stage.task_done()
+                await asyncio.sleep(0.005)
+
+        sink = asyncio.create_task(slow_sink())
+        for i in range(10):
+            assert await stage.put(i)
+            assert stage.qsize() <= 2
+        await sink
+        return stage, consumed
+
+    stage, consumed = asyncio.run(run())
+    assert consumed == list(range(10))
+    stats = stage.get_stats()
+    assert stats['peak'] == 2 and stats['dropped'] == 0 and stats['blocked'] > 0
+
+
+def test_drop_oldest_keeps_freshest_items_and_join_completes():
+    async def run():
+        stage = StageQueue('test:drop', maxsize=3, policy='drop_oldest')
+        for i in range(10):
+            await stage.put(i)
+        items = [stage.get_nowait() for _ in range(stage.qsize())]
+        for _ in items:
+            stage.task_done()
+        await asyncio.wait_for(stage.join(), 1)
+        return stage, items
+
+    stage, items = asyncio.run(run())
+    assert items == [7, 8, 9]
+    assert stage.get_stats()['dropped'] == 7
+
+
+def test_sample_policy_thins_a_filling_queue_and_never_blocks():
+    stage = ThreadStageQueue('test:sample', maxsize=8, policy='sample', sample_every=2, sample_above=0.5)
+    results = [stage.put(i, timeout=0.01) for i in range(20)]
+
+    stats = stage.get_stats()
+    assert stage.qsize() == 8
+    assert results[:4] == [True] * 4
+    assert stats['sampled_out'] > 0 and stats['dropped'] > 0
+    assert stats['accepted'] + stats['sampled_out'] + stats['dropped'] == 20
+
+
+def test_thread_queue_block_policy_times_out_and_gauges_are_registered():
+    stage = ThreadStageQueue('test:thread-block', maxsize=1)
+    assert stage.put('a')
+    assert not stage.put('b', timeout=0.01)
+
+    taker = threading.Timer(0.02, stage.get)
+    taker.start()
+    assert stage.put('c', timeout=1)
+    taker.join()
+    assert stage_gauges.get_stats()['test:thread-block']['blocked'] == 2
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ThreadStageQueue('test:bad', maxsize=1, policy='spill')
+
+
+class FakeWebSocket:
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.delay)
+        self.received.append(message['n'])
+
+
+def test_slow_websocket_client_drops_oldest_without_stalling_broadcasts():
+    from app.services.websocket_service import ClientOutbox, ConnectionManager
+
+    async def run():
+        manager = ConnectionManager()
+        fast, slow = FakeWebSocket(0), FakeWebSocket(0.05)
+        await manager.connect(fast, 'traffic')
+        await manager.connect(slow, 'traffic')
+        manager.outboxes[slow].close()
+        manager.outboxes[slow] = ClientOutbox(slow, 'test:slow-client', maxsize=5)
+
+        started = asyncio.get_running_loop().time()
+        for n in range(50):
+            await manager.broadcast_to_module({'n': n}, 'traffic')
+            await asyncio.sleep(0)
+        elapsed = asyncio.get_running_loop().time() - started
+        await asyncio.sleep(0.5)
+        stats = manager.outboxes[slow].queue.get_stats()
+        manager.disconnect(fast, 'traffic')
+        manager.disconnect(slow, 'traffic')
+        return fast.received, slow.received, stats, elapsed
+
+    fast, slow, stats, elapsed = asyncio.run(run())
+    assert elapsed < 0.05
+    assert fast == list(range(50))
+    assert slow[-5:] == list(range(45, 50)) and len(slow) < 50
+    assert stats['dropped'] == 50 - len(slow) and stats['depth'] == 0
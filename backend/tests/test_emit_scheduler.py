@@ -0,0 +1,67 @@
+import asyncio
+
+import numpy as np
+
+from app.services.emit_scheduler import EmitScheduler
+
+
+class FakeManager:
+    def __init__(self, rooms):
+        self.rooms = {'/': {room: {'sid': 'eio'} for room in rooms}}
+
+
+class FakeServer:
+    def __init__(self, rooms=('camera_1',)):
+        self.manager = FakeManager(rooms)
+        self.sent = []
+
+    async def emit(self, event, data, room=None, namespace=None):
+        self.sent.append((event, room, data))
+
+
+def test_burst_is_coalesced_to_first_and_latest_update():
+    async def run():
+        sio = FakeServer()
+        scheduler = EmitScheduler(sio, max_rate=20)
+        for i in range(30):
+            await scheduler.emit('detection_update', {'frame': i}, room='camera_1')
+        await asyncio.sleep(0.1)
+        return sio, scheduler
+
+    sio, scheduler = asyncio.run(run())
+    assert [data['frame'] for _, _, data in sio.sent] == [0, 29]
+    assert scheduler.get_stats()['coalesced'] == 28
+
+
+def test_rooms_without_subscribers_are_skipped():
+    async def run():
+        sio = FakeServer(rooms=())
+        scheduler = EmitScheduler(sio)
+        await scheduler.emit('detection_update', {'frame': 0}, room='camera_9')
+        return sio, scheduler
+
+    sio, scheduler = asyncio.run(run())
+    assert sio.sent == []
+    assert scheduler.get_stats()['skipped_empty'] == 1
+
+
+def test_merge_policy_and_unthrottled_events():
+    def merge(previous, new):
+        return {'count': previous['count'] + new['count']}
+
+    async def run():
+        sio = FakeServer()
+        scheduler = EmitScheduler(sio, max_rate=1)
+        scheduler.configure('analytics_update', merge=merge)
+        scheduler.configure('aggregated_update', max_rate=0)
+        for _ in range(4):
+            await scheduler.emit('analytics_update', {'count': np.int64(1)}, room='camera_1')
+            await scheduler.emit('aggregated_update', {'window': 1}, room='camera_1')
+        await scheduler.stop()
+        return sio
+
+    sio = asyncio.run(run())
+    analytics = [data for event, _, data in sio.sent if event == 'analytics_update']
+    assert analytics == [{'count': 1}, {'count': 3}]
+    assert type(analytics[0]['count']) is int
+    assert len([event for event, _, _ in sio.sent if event == 'aggregated_update']) == 4
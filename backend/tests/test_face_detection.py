@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+
+from app.services import face_detection
+from app.services.face_detection import FaceDetector
+
+
+class FakeCascade:
+    loads = 0
+
+    def __init__(self, path):
+        FakeCascade.loads += 1
+        self.calls = []
+
+    def empty(self):
+        return False
+
+    def detectMultiScale(self, image, scale_factor, min_neighbors, minSize):
+        self.calls.append((image.shape, minSize))
+        return np.array([[100, 50, 40, 40]])
+
+
+def test_cascade_is_loaded_once_and_boxes_map_back_to_full_size(monkeypatch):
+    monkeypatch.setattr(cv2, 'CascadeClassifier', FakeCascade, raising=False)
+    face_detection.load_cascade.cache_clear()
+    try:
+        detector = FaceDetector(backend='haar', max_side=640, min_size=32)
+        frame = np.zeros((960, 1280, 3), dtype=np.uint8)
+        faces = [detector.detect(frame) for _ in range(3)]
+        cascade = face_detection.load_cascade()
+    finally:
+        face_detection.load_cascade.cache_clear()
+
+    assert FakeCascade.loads == 1
+    # Detection ran on the half size gray view with the minimum size scaled too
+    assert cascade.calls == [((480, 640), (16, 16))] * 3
+    assert faces == [[{'x': 200, 'y': 100, 'w': 80, 'h': 80}]] * 3
+
+
+def test_small_frames_are_not_upscaled(monkeypatch):
+    monkeypatch.setattr(cv2, 'CascadeClassifier', FakeCascade, raising=False)
+    face_detection.load_cascade.cache_clear()
+    try:
+        faces = FaceDetector(backend='haar', max_side=640, min_size=32).detect(np.zeros((240, 320, 3), dtype=np.uint8))
+        cascade = face_detection.load_cascade()
+    finally:
+        face_detection.load_cascade.cache_clear()
+
+    assert cascade.calls == [((240, 320), (32, 32))]
+    assert faces == [{'x': 100, 'y': 50, 'w': 40, 'h': 40}]
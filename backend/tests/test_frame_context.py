@@ -0,0 +1,47 @@
+import cv2
+import numpy as np
+
+from app.services.frame_context import FrameContext
+
+
+def _counting(monkeypatch, name):
+    calls = []
+    original = getattr(cv2, name)
+
+    def counted(*args, **kwargs):
+        calls.append(name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cv2, name, counted)
+    return calls
+
+
+def test_views_are_derived_on_first_use_and_only_once(monkeypatch):
+    conversions = _counting(monkeypatch, 'cvtColor')
+    blurs = _counting(monkeypatch, 'GaussianBlur')
+    resizes = _counting(monkeypatch, 'resize')
+    frame = np.random.default_rng(0).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+
+    ctx = FrameContext(frame, 'gate')
+    assert conversions == blurs == resizes == []
+
+    gray = ctx.gray
+    assert ctx.gray is gray and FrameContext.of(ctx).gray is gray
+    assert np.array_equal(gray, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    assert len(conversions) == 2  # ours plus the reference conversion above
+
+    # Derived views build on the cached gray view
+    blurred = ctx.blurred_gray((5, 5))
+    assert ctx.blurred_gray((5, 5)) is blurred and len(blurs) == 1
+    ctx.blurred_gray((9, 9))
+    assert len(blurs) == 2 and len(conversions) == 2
+
+    small, scale = ctx.downscaled(80)
+    assert small.shape[:2] == (60, 80) and scale == 0.5
+    assert ctx.downscaled(80)[0] is small and len(resizes) == 1
+    assert ctx.thumbnail(16) is ctx.thumbnail(16) and len(resizes) == 2
+
+    ctx.rgb
+    ctx.letterbox(64)
+    ctx.letterbox(64)
+    assert len(conversions) == 3 and len(resizes) == 3
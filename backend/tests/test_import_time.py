@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Services imported by a plain API worker; none of them may load ML frameworks
+SERVICE_MODULES = [
+    'app.services.vision_service',
+    'app.services.realtime_service',
+    'app.services.specialized_processors',
+    'app.services.advanced_analytics',
+    'app.services.video_analytics_service',
+    'app.services.model_processor_service',
+]
+
+HEAVY_MODULES = ['torch', 'tensorflow', 'sklearn', 'scipy', 'pandas', 'plotly']
+
+IMPORT_BUDGET_SECONDS = 3.0
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'elapsed': elapsed,
+    'loaded': [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def _import_services():
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT.format(modules=SERVICE_MODULES, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_service_imports_do_not_load_ml_frameworks():
+    report = _import_services()
+    assert report['loaded'] == []
+
+
+def test_service_imports_within_budget():
+    report = _import_services()
+    assert report['elapsed'] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,100 @@
+import asyncio
+
+import numpy as np
+
+from app.services import video_analytics_service as video_module
+from app.services.inference_cache import SceneResultCache
+from app.services.video_analytics_service import VideoAnalyticsService
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {'run': self.calls}
+
+
+def _frame(value):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def _lookup(cache, model, camera_id, frame):
+    return asyncio.run(cache.get_or_compute(camera_id, 'detections', frame, model))
+
+
+def test_unchanged_scene_reuses_the_cached_result():
+    cache, model = SceneResultCache(tolerance=2.0, max_age=60), CountingModel()
+    first = _lookup(cache, model, 'gate', _frame(100))
+    noisy = _frame(100)
+    noisy[:10] += 1  # sensor noise stays within the tolerance
+    assert _lookup(cache, model, 'gate', noisy) == first == {'run': 1}
+    assert model.calls == 1
+    assert cache.get_stats('gate')['hits'] == 1
+
+
+def test_scene_change_runs_the_model_again():
+    cache, model = SceneResultCache(tolerance=2.0, max_age=60), CountingModel()
+    _lookup(cache, model, 'gate', _frame(100))
+    changed = _frame(100)
+    changed[:, :80] = 200  # something entered half of the view
+    assert _lookup(cache, model, 'gate', changed) == {'run': 2}
+    assert _lookup(cache, model, 'gate', changed) == {'run': 2}
+    stats = cache.get_stats('gate')
+    assert (stats['hits'], stats['misses'], stats['scene_changes']) == (1, 2, 1)
+
+
+def test_cameras_do_not_share_results():
+    cache, model = SceneResultCache(tolerance=2.0, max_age=60), CountingModel()
+    assert _lookup(cache, model, 'north', _frame(100)) == {'run': 1}
+    # Same picture, other camera: computed separately
+    assert _lookup(cache, model, 'south', _frame(100)) == {'run': 2}
+    assert _lookup(cache, model, 'north', _frame(100)) == {'run': 1}
+    assert cache.get_stats('south')['hits'] == 0
+
+    cache.invalidate('north')
+    assert _lookup(cache, model, 'north', _frame(100)) == {'run': 3}
+    assert _lookup(cache, model, 'south', _frame(100)) == {'run': 2}
+
+
+class FakeYolo:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, image):
+        self.calls += 1
+        return self
+
+    def pandas(self):
+        return type('Results', (), {'xyxy': [[{'name': 'person'}]]})()
+
+
+def test_frames_tagged_with_a_camera_hit_the_cache(monkeypatch):
+    cache = SceneResultCache(tolerance=2.0, max_age=60)
+    monkeypatch.setattr(video_module, 'scene_cache', cache)
+    service = VideoAnalyticsService()
+    service.models['yolov5s'] = model = FakeYolo()
+    service.processing_modules['probe'] = service._detect
+
+    async def run():
+        for camera_id in ('client-a', 'client-a', 'client-b'):
+            await service.process_frame(_frame(100), 'probe', camera_id=camera_id)
+
+    asyncio.run(run())
+    assert model.calls == 2
+    assert cache.get_stats('client-a')['hits'] == 1
+
+
+def test_camera_roi_and_tolerance_apply_to_that_camera_only():
+    cache, model = SceneResultCache(tolerance=2.0, max_age=60), CountingModel()
+    cache.configure_camera('dock', {'roi': [0, 0, 80, 120], 'tolerance': 10.0})
+    busy = _frame(100)
+    busy[:, 80:] = 250  # traffic outside the dock's region of interest
+    busy[:, :80] += 5  # lighting drift within the dock's looser tolerance
+
+    _lookup(cache, model, 'dock', _frame(100))
+    assert _lookup(cache, model, 'dock', busy) == {'run': 1}
+
+    _lookup(cache, model, 'yard', _frame(100))
+    assert _lookup(cache, model, 'yard', busy) == {'run': 3}
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.services.inference_workers import InferenceWorkerPool
+
+HANDLER = 'tests.test_inference_workers:frame_stats_handler'
+
+
+def frame_stats_handler():
+    """Worker handler used by these tests; runs inside the worker processes."""
+    def handle(frame, options):
+        if options.get('crash'):
+            os._exit(1)
+        if options.get('fail'):
+            raise ValueError('bad frame')
+        if options.get('sleep'):
+            time.sleep(options['sleep'])
+        return {'sum': int(frame.sum()), 'shape': frame.shape, 'pid': os.getpid()}
+    return handle
+
+
+async def _with_pool(body, **kwargs):
+    pool = InferenceWorkerPool(HANDLER, workers=2, slots_per_worker=2,
+                               max_frame_bytes=64 * 64 * 3, **kwargs)
+    await pool.start()
+    try:
+        return await body(pool)
+    finally:
+        await pool.stop()
+
+
+def test_frames_round_trip_through_shared_memory():
+    async def body(pool):
+        frames = [np.full((64, 64, 3), i, dtype=np.uint8) for i in range(12)]
+        results = await asyncio.gather(*(pool.submit(frame) for frame in frames))
+        # Oversized frames are sent pickled instead of through a slot
+        large = await pool.submit(np.ones((128, 128, 3), dtype=np.uint8))
+        return results, large, pool.get_stats()
+
+    results, large, stats = asyncio.run(_with_pool(body))
+    assert [r['sum'] for r in results] == [i * 64 * 64 * 3 for i in range(12)]
+    assert large['sum'] == 128 * 128 * 3
+    assert sum(w['processed'] for w in stats['workers']) == 13
+    assert all(w['in_flight'] == 0 for w in stats['workers'])
+
+
+def test_handler_errors_and_crashes_are_isolated():
+    async def body(pool):
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        with pytest.raises(RuntimeError, match='bad frame'):
+            await pool.submit(frame, {'fail': True})
+        with pytest.raises(RuntimeError, match='crashed'):
+            await pool.submit(frame, {'crash': True})
+        # The crashed worker is replaced and the pool keeps serving
+        results = await asyncio.gather(*(pool.submit(frame) for _ in range(4)))
+        return results, pool.get_stats()
+
+    results, stats = asyncio.run(_with_pool(body))
+    assert len(results) == 4
+    assert sum(w['restarts'] for w in stats['workers']) == 1
+
+
+def test_crash_under_load_fails_in_flight_frames_promptly():
+    async def body(pool):
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        stuck = asyncio.ensure_future(pool.submit(frame, {'sleep': 30}))
+        await asyncio.sleep(0.2)
+        victim = next(w for w in pool.workers if w.in_flight)
+
+        # Keep results flowing from the other worker so the queue never runs empty
+        stop = asyncio.Event()
+        served = []
+
+        async def load():
+            while not stop.is_set():
+                try:
+                    served.append(await pool.submit(frame))
+                except RuntimeError:
+                    pass
+
+        loader = asyncio.ensure_future(load())
+        await asyncio.sleep(0.3)
+        victim.process.kill()
+        started = time.monotonic()
+        with pytest.raises(RuntimeError, match='crashed'):
+            await asyncio.wait_for(stuck, 5)
+        detected_after = time.monotonic() - started
+        while not victim.accepting and time.monotonic() - started < 10:
+            await asyncio.sleep(0.05)
+        stop.set()
+        await loader
+        return detected_after, len(served), victim.restarts, pool.get_stats()
+
+    detected_after, served, restarts, stats = asyncio.run(_with_pool(body))
+    assert detected_after < 2
+    assert served > 10
+    assert restarts == 1
+    assert all(w['alive'] and w['accepting'] for w in stats['workers'])
+
+
+def test_hung_worker_times_out_and_is_recycled():
+    async def body(pool):
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await pool.submit(frame, {'sleep': 60})
+        timed_out_after = time.monotonic() - started
+        hung = next(w for w in pool.workers if w.restarts)
+        while not hung.accepting and time.monotonic() - started < 10:
+            await asyncio.sleep(0.05)
+        results = await asyncio.gather(*(pool.submit(frame) for _ in range(4)))
+        return timed_out_after, results, pool.get_stats()
+
+    timed_out_after, results, stats = asyncio.run(_with_pool(body, request_timeout=0.5))
+    assert 0.5 <= timed_out_after < 2
+    assert len(results) == 4
+    assert sum(w['restarts'] for w in stats['workers']) == 1
+    assert all(w['alive'] and w['accepting'] and w['in_flight'] == 0 for w in stats['workers'])
+
+
+def test_rolling_restart_replaces_every_worker():
+    async def body(pool):
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        before = {w.process.pid for w in pool.workers}
+        pending = [asyncio.ensure_future(pool.submit(frame)) for _ in range(4)]
+        await pool.restart_all()
+        done = await asyncio.gather(*pending)
+        after = {w.process.pid for w in pool.workers}
+        return before, after, done
+
+    before, after, done = asyncio.run(_with_pool(body))
+    assert before.isdisjoint(after)
+    assert len(done) == 4
@@ -0,0 +1,118 @@
+import numpy as np
+
+from app.services.load_governor import LoadGovernor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _governor():
+    clock = FakeClock()
+    governor = LoadGovernor(high_watermark=0.8, low_watermark=0.4, latency_budget_ms=100,
+                            interval=1.0, restore_cooldown=5.0, clock=clock)
+    governor.register_camera('mine_gate', {'priority': 'critical', 'frameRate': 30})
+    governor.register_camera('corridor', {'priority': 'normal', 'frameRate': 30})
+    governor.register_camera('lobby', {'priority': 'low', 'frameRate': 30})
+    return governor, clock
+
+
+def _run(governor, clock, seconds, fill):
+    events = []
+    for _ in range(seconds):
+        clock.now += 1.0
+        governor.report_queue('capture', int(fill * 30), 30)
+        event = governor.evaluate()
+        if event:
+            events.append(event)
+    return events
+
+
+def test_overload_degrades_low_priority_first_and_never_critical():
+    governor, clock = _governor()
+    events = _run(governor, clock, 20, fill=1.0)
+
+    degraded = [e['camera_id'] for e in events]
+    assert degraded[:3] == ['lobby', 'lobby', 'lobby']
+    assert 'mine_gate' not in degraded
+    assert governor.get_tier('mine_gate')['name'] == 'full'
+    assert governor.get_tier('lobby')['name'] == 'minimal'
+    assert governor.get_tier('corridor')['name'] == 'low'
+
+
+def test_recovery_restores_high_priority_first_with_cooldown():
+    governor, clock = _governor()
+    _run(governor, clock, 20, fill=1.0)
+
+    events = _run(governor, clock, 10, fill=0.0)
+    assert [e['reason'] for e in events] == ['recovered', 'recovered']
+    assert events[0]['camera_id'] == 'corridor'
+
+    _run(governor, clock, 60, fill=0.0)
+    assert all(governor.get_tier(c)['name'] == 'full' for c in ('mine_gate', 'corridor', 'lobby'))
+
+
+def test_hysteresis_holds_tiers_between_watermarks():
+    governor, clock = _governor()
+    _run(governor, clock, 2, fill=1.0)
+    assert _run(governor, clock, 30, fill=0.6) == []
+
+
+def test_degraded_camera_analyses_fewer_frames():
+    governor, clock = _governor()
+    _run(governor, clock, 3, fill=1.0)
+
+    processed = {'lobby': 0, 'mine_gate': 0}
+    for _ in range(300):
+        clock.now += 1 / 30
+        for camera_id in processed:
+            processed[camera_id] += governor.should_process(camera_id)
+
+    assert processed['mine_gate'] >= 290
+    assert processed['lobby'] <= 0.12 * processed['mine_gate']
+
+
+def test_detections_on_downscaled_frames_map_back_to_capture_pixels():
+    governor, clock = _governor()
+    _run(governor, clock, 3, fill=1.0)
+    assert governor.get_tier('lobby')['name'] == 'minimal'
+
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    analysed = governor.apply_resolution('lobby', frame)
+    assert analysed.shape[:2] == (270, 480)
+
+    detections = [{'bbox': [120, 50, 240, 135], 'confidence': 0.9, 'class': 0}]
+    mapped = governor.to_capture_coordinates(detections, analysed.shape, frame.shape)
+    assert mapped == [{'bbox': [480, 200, 960, 540], 'confidence': 0.9, 'class': 0}]
+    # Full tier frames are passed through untouched
+    assert governor.to_capture_coordinates(detections, frame.shape, frame.shape) is detections
+
+
+def test_configured_resize_is_capped_by_the_tier_and_boxes_map_back():
+    governor, clock = _governor()
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    detections = [{'bbox': [120, 50, 240, 135], 'confidence': 0.9, 'class': 0}]
+
+    # Full tier: the configured resolution is what gets analysed
+    analysed = governor.apply_resolution('lobby', frame, (1280, 720))
+    assert analysed.shape[:2] == (720, 1280)
+    assert governor.to_capture_coordinates(detections, analysed.shape, frame.shape)[0]['bbox'] == [180, 75, 360, 202]
+
+    # Under pressure the tier still sheds pixels below the configured size
+    _run(governor, clock, 3, fill=1.0)
+    analysed = governor.apply_resolution('lobby', frame, (1280, 720))
+    assert analysed.shape[:2] == (270, 480)
+    assert governor.to_capture_coordinates(detections, analysed.shape, frame.shape)[0]['bbox'] == [480, 200, 960, 540]
+
+
+def test_listeners_are_registered_once():
+    governor, clock = _governor()
+    events = []
+    for _ in range(3):
+        governor.add_listener(events.append)
+    _run(governor, clock, 1, fill=1.0)
+    assert [e['camera_id'] for e in events] == ['lobby']
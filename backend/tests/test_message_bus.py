@@ -0,0 +1,68 @@
+import threading
+import time
+
+from app.services.message_bus import InProcessBus, TopicPartition, create_message_bus
+
+
+class RecordingListener:
+    def __init__(self):
+        self.assigned = []
+
+    def on_partitions_revoked(self, revoked):
+        pass
+
+    def on_partitions_assigned(self, assigned):
+        self.assigned.append(set(assigned))
+
+
+def test_objects_pass_through_in_order_per_topic():
+    bus = InProcessBus(maxsize=100)
+    listener = RecordingListener()
+    consumer = bus.subscribe(['detections', 'analytics'], listener=listener)
+
+    payload = {'camera_id': 1, 'detections': [{'class': 0}]}
+    for i in range(3):
+        bus.publish('detections', {**payload, 'seq': i}, key=1)
+    bus.publish('analytics', {'camera_id': 1}, key=1)
+    bus.publish('camera_tier_changes', {'camera_id': 1})
+
+    batches = consumer.poll(timeout_ms=0)
+    assert listener.assigned == [{TopicPartition('detections', 0), TopicPartition('analytics', 0)}]
+    assert consumer.assignment() == listener.assigned[0]
+    assert [r.value['seq'] for r in batches[TopicPartition('detections', 0)]] == [0, 1, 2]
+    assert [r.offset for r in batches[TopicPartition('detections', 0)]] == [0, 1, 2]
+    assert len(batches[TopicPartition('analytics', 0)]) == 1
+    assert consumer.poll(timeout_ms=0) == {}
+
+
+def test_poll_wakes_up_when_a_message_is_published():
+    bus = InProcessBus()
+    consumer = bus.subscribe(['analytics'])
+    threading.Timer(0.05, bus.publish, args=('analytics', {'n': 1})).start()
+
+    start = time.monotonic()
+    batches = consumer.poll(timeout_ms=2000)
+    assert time.monotonic() - start < 1.0
+    assert batches[TopicPartition('analytics', 0)][0].value == {'n': 1}
+
+
+def test_full_topic_blocks_publisher_until_consumed():
+    bus = InProcessBus(maxsize=2)
+    consumer = bus.subscribe(['detections'])
+    for i in range(2):
+        bus.publish('detections', i)
+
+    publisher = threading.Thread(target=bus.publish, args=('detections', 2))
+    publisher.start()
+    publisher.join(0.1)
+    assert publisher.is_alive()
+
+    first = consumer.poll(timeout_ms=0)[TopicPartition('detections', 0)]
+    publisher.join(1.0)
+    assert not publisher.is_alive()
+    assert [r.value for r in first] == [0, 1]
+    assert bus.get_stats()['detections'] == {'depth': 1, 'published': 3}
+
+
+def test_backend_is_selected_by_name():
+    assert isinstance(create_message_bus('inprocess'), InProcessBus)
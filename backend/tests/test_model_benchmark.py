@@ -0,0 +1,97 @@
+import numpy as np
+import onnx
+import onnxruntime
+from onnx import TensorProto, helper, numpy_helper
+
+from app.services import model_benchmark as benchmark_module
+from app.services.model_benchmark import ModelBenchmark, _benchmark_config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+class FakeSession:
+    """Session whose runs take preset latencies on a fake clock."""
+
+    def __init__(self, clock, latencies_ms):
+        self.clock = clock
+        self.latencies = iter(latencies_ms)
+        self.feeds = []
+
+    def get_inputs(self):
+        return [type('Input', (), {'name': 'images', 'shape': ['N', 3, 'H', 'W']})()]
+
+    def run(self, outputs, feed):
+        self.feeds.append(feed['images'].shape)
+        self.clock.now += next(self.latencies) / 1000.0
+
+
+def _dynamic_conv_model(path):
+    weights = numpy_helper.from_array(np.ones((2, 3, 1, 1), dtype=np.float32), 'W')
+    graph = helper.make_graph(
+        [helper.make_node('Conv', ['images', 'W'], ['output'])],
+        'tiny',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, ['N', 3, 'H', 'W'])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, ['N', 2, 'H', 'W'])],
+        initializer=[weights]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+
+
+def test_config_reports_latency_percentiles_of_the_timed_runs(monkeypatch):
+    clock = FakeClock()
+    # Two warmup runs that must not be counted, then 1..100 ms
+    session = FakeSession(clock, [1000, 1000] + list(range(1, 101)))
+    monkeypatch.setattr(benchmark_module.time, 'perf_counter', clock.perf_counter)
+    monkeypatch.setattr(onnxruntime, 'InferenceSession', lambda *args, **kwargs: session)
+
+    result = _benchmark_config('model.onnx', batch_size=4, resolution=32, threads=2, runs=100, warmup=2)
+
+    assert session.feeds == [(4, 3, 32, 32)] * 102
+    assert (result['batch_size'], result['resolution'], result['threads']) == (4, 32, 2)
+    latency = result['latency_ms']
+    assert np.allclose([latency['p50'], latency['p95'], latency['p99'], latency['mean']],
+                       [50.5, 95.05, 99.01, 50.5])
+    assert np.isclose(result['throughput_fps'], 4 * 1000 / 50.5)
+    assert result['load_time_ms'] == 0.0 and result['peak_rss_mb'] > 0
+
+
+def test_sweep_runs_every_configuration_and_summarizes_it(tmp_path):
+    model_path = tmp_path / 'tiny.onnx'
+    _dynamic_conv_model(model_path)
+    sweep = {'batch_sizes': [1, 2], 'resolutions': [16, 32], 'threads': [1], 'runs': 5, 'warmup': 1}
+
+    results = ModelBenchmark().run_sweep(str(model_path), sweep)
+
+    assert [(r['batch_size'], r['resolution'], r['threads']) for r in results] == [
+        (1, 16, 1), (1, 32, 1), (2, 16, 1), (2, 32, 1)
+    ]
+    for r in results:
+        assert set(r) == {'batch_size', 'resolution', 'threads', 'latency_ms', 'throughput_fps',
+                          'load_time_ms', 'peak_rss_mb', 'session_rss_mb'}
+        assert set(r['latency_ms']) == {'p50', 'p95', 'p99', 'mean'}
+        assert 0 < r['latency_ms']['p50'] <= r['latency_ms']['p95'] <= r['latency_ms']['p99']
+
+    summary = ModelBenchmark.summarize(results)
+    # Single frame latency at the largest resolution
+    assert summary['resolution'] == 32.0 and summary['latency_p50_ms'] == results[1]['latency_ms']['p50']
+    assert summary['max_throughput_fps'] == max(r['throughput_fps'] for r in results)
+
+
+def test_static_model_dims_restrict_the_sweep(tmp_path):
+    model_path = tmp_path / 'tiny.onnx'
+    _dynamic_conv_model(model_path)
+    model = onnx.load(str(model_path))
+    dims = model.graph.input[0].type.tensor_type.shape.dim
+    dims[0].dim_value, dims[2].dim_value, dims[3].dim_value = 1, 64, 64
+    onnx.save(model, str(model_path))
+
+    shapes = ModelBenchmark._supported_shapes(str(model_path), {'batch_sizes': [1, 4], 'resolutions': [320, 640]})
+    assert shapes == ([1], [64])
@@ -0,0 +1,111 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.model_processor_service import ModelProcessorService
+
+
+class FakeTable:
+    """The slice of the DataFrame API the processor uses on YOLOv5 results."""
+
+    def __init__(self, rows, columns=('confidence', 'name')):
+        self.rows = rows
+        self.columns = list(columns)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return np.array([row[key] for row in self.rows])
+        return FakeTable([row for row, keep in zip(self.rows, key) if keep], self.columns)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def to_dict(self, orient):
+        return list(self.rows)
+
+
+class FakeResults:
+    def __init__(self, name, columns=('confidence', 'name')):
+        self.xyxy = [FakeTable([{'confidence': 0.9, 'name': name}], columns)]
+
+    def pandas(self):
+        return self
+
+
+class FakeModel:
+    def __init__(self, name, delay=0.0, broken=False):
+        self.name = name
+        self.delay = delay
+        self.broken = broken
+
+    def __call__(self, frame):
+        import time
+        time.sleep(self.delay)
+        if self.broken:
+            return FakeResults(self.name, columns=())
+        return FakeResults(self.name)
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    service = ModelProcessorService()
+    loaded = []
+
+    def load(model_type, config):
+        if config.get('model_size') == 'missing':
+            raise FileNotFoundError('no such weights')
+        model = FakeModel(config['model_size'], delay=config.get('delay', 0.0),
+                          broken=config.get('model_size') == 'broken')
+        loaded.append(model)
+        return model
+
+    monkeypatch.setattr(service, '_load_model', load)
+    service.loaded = loaded
+    return service
+
+
+def test_threshold_change_does_not_reload(processor):
+    async def run():
+        await processor.initialize_model('yolov5', {'model_size': 'yolov5s'})
+        status = await processor.update_model_config(
+            'yolov5', {'model_size': 'yolov5s', 'confidence_threshold': 0.5}
+        )
+        return status
+
+    assert asyncio.run(run())['status'] == 'updated'
+    assert len(processor.loaded) == 1
+    assert processor.configs['yolov5']['confidence_threshold'] == 0.5
+
+
+def test_swap_keeps_serving_and_drains_old_model(processor):
+    async def run():
+        await processor.initialize_model('yolov5', {'model_size': 'yolov5s', 'delay': 0.2})
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        in_flight = asyncio.ensure_future(processor.process_frame('yolov5', frame))
+        await asyncio.sleep(0.05)
+        status = await processor.update_model_config('yolov5', {'model_size': 'yolov5m'})
+        old_result = await in_flight
+        new_result = await processor.process_frame('yolov5', frame)
+        await asyncio.sleep(0.1)
+        return status, old_result, new_result
+
+    status, old_result, new_result = asyncio.run(run())
+    assert status['status'] == 'swapped'
+    assert old_result['detections'][0]['name'] == 'yolov5s'
+    assert new_result['detections'][0]['name'] == 'yolov5m'
+    assert processor._in_flight == {}
+
+
+@pytest.mark.parametrize('model_size', ['missing', 'broken'])
+def test_failed_swap_keeps_current_model(processor, model_size):
+    async def run():
+        await processor.initialize_model('yolov5', {'model_size': 'yolov5s'})
+        status = await processor.update_model_config('yolov5', {'model_size': model_size})
+        result = await processor.process_frame('yolov5', np.zeros((8, 8, 3), dtype=np.uint8))
+        return status, result
+
+    status, result = asyncio.run(run())
+    assert status['status'] == 'failed'
+    assert processor.models['yolov5'].name == 'yolov5s'
+    assert result['detections'][0]['name'] == 'yolov5s'
@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+import onnx
+import onnxruntime as ort
+import pytest
+from onnx import TensorProto, helper, numpy_helper
+
+from app.services.model_optimizer import ModelOptimizer
+
+
+def _tiny_conv_model(path):
+    """Conv + Relu over a 3x32x32 image, small enough to quantize in a test."""
+    rng = np.random.default_rng(0)
+    weights = numpy_helper.from_array(rng.normal(0, 0.3, (8, 3, 3, 3)).astype(np.float32), 'W')
+    bias = numpy_helper.from_array(rng.normal(0, 0.1, (8,)).astype(np.float32), 'B')
+    graph = helper.make_graph(
+        [helper.make_node('Conv', ['images', 'W', 'B'], ['conv'], pads=[1, 1, 1, 1]),
+         helper.make_node('Relu', ['conv'], ['output'])],
+        'tiny',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, [1, 3, 32, 32])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, [1, 8, 32, 32])],
+        initializer=[weights, bias]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+
+
+def _stored_frames(directory, count=8):
+    """Smooth gradients with a bright block, like a static scene with one object."""
+    directory.mkdir()
+    for i in range(count):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[:] = np.linspace(0, 200, 64, dtype=np.uint8)[None, :, None]
+        frame[10 + i:30 + i, 5 * i:5 * i + 16] = (40 * i % 255, 255, 128)
+        cv2.imwrite(str(directory / f'frame_{i}.png'), frame)
+    return directory
+
+
+def test_quantized_variants_round_trip_and_stay_close_to_fp32(tmp_path):
+    model_path = tmp_path / 'tiny.onnx'
+    _tiny_conv_model(model_path)
+    original = model_path.read_bytes()
+    optimizer = ModelOptimizer(frames_dir=_stored_frames(tmp_path / 'frames'))
+
+    report = optimizer.optimize(str(model_path), {
+        'quantization': True, 'benchmark_runs': 5, 'calibration_samples': 8, 'min_agreement': 0.95
+    })
+
+    variants = {v['variant']: v for v in report['variants']}
+    assert set(variants) == {'fp32', 'fused', 'int8_dynamic', 'int8_static'}
+    assert report['calibration_source'] == 'frames'
+    # Agreement is measured on frames held out of calibration
+    assert (report['calibration_samples'], report['validation_samples']) == (6, 2)
+    assert all(v['agreement'] >= 0.95 for v in variants.values())
+    assert report['variant'] in variants and report['agreement'] >= 0.95
+
+    # The chosen variant is written back in place and still loads and runs
+    if report['variant'] == 'fp32':
+        assert model_path.read_bytes() == original
+    session = ort.InferenceSession(str(model_path), providers=['CPUExecutionProvider'])
+    sample = optimizer._load_samples([1, 3, 32, 32], 1)[0][0]
+    assert session.run(None, {'images': sample})[0].shape == (1, 8, 32, 32)
+
+
+def test_static_quantization_inserts_int8_nodes_calibrated_on_frames(tmp_path):
+    model_path = tmp_path / 'tiny.onnx'
+    _tiny_conv_model(model_path)
+    optimizer = ModelOptimizer(frames_dir=_stored_frames(tmp_path / 'frames'))
+    samples, source = optimizer._load_samples([1, 3, 32, 32], 4)
+    assert source == 'frames' and len(samples) == 4
+
+    quantized_path = optimizer._quantize_static(str(model_path), str(tmp_path), 'images', samples)
+    ops = {node.op_type for node in onnx.load(quantized_path).graph.node}
+    assert {'QuantizeLinear', 'DequantizeLinear'} <= ops
+
+    fp32 = ort.InferenceSession(str(model_path), providers=['CPUExecutionProvider'])
+    int8 = ort.InferenceSession(quantized_path, providers=['CPUExecutionProvider'])
+    for sample in samples:
+        expected = fp32.run(None, {'images': sample})
+        actual = int8.run(None, {'images': sample})
+        assert ModelOptimizer._detection_agreement(expected, actual) > 0.99
+
+
+def test_random_input_is_recorded_and_never_used_for_static_calibration(tmp_path):
+    model_path = tmp_path / 'tiny.onnx'
+    _tiny_conv_model(model_path)
+    optimizer = ModelOptimizer(frames_dir=tmp_path / 'no_frames')
+
+    report = optimizer.optimize(str(model_path), {'quantization': True, 'benchmark_runs': 3})
+
+    assert report['calibration_source'] == 'random'
+    assert {v['variant'] for v in report['variants']} == {'fp32', 'fused', 'int8_dynamic'}
+
+
+def test_fp32_is_kept_when_no_variant_agrees(tmp_path):
+    model_path = tmp_path / 'tiny.onnx'
+    _tiny_conv_model(model_path)
+    original = model_path.read_bytes()
+    optimizer = ModelOptimizer(frames_dir=_stored_frames(tmp_path / 'frames'))
+
+    report = optimizer.optimize(str(model_path), {
+        'quantization': True, 'benchmark_runs': 3, 'min_agreement': 1.5
+    })
+
+    assert report['variant'] == 'fp32' and len(report['variants']) == 4
+    assert model_path.read_bytes() == original
+
+
+def test_failed_fp32_benchmark_raises_and_keeps_the_model(tmp_path, monkeypatch):
+    model_path = tmp_path / 'tiny.onnx'
+    _tiny_conv_model(model_path)
+    original = model_path.read_bytes()
+    optimizer = ModelOptimizer(frames_dir=_stored_frames(tmp_path / 'frames'))
+    evaluate = optimizer._evaluate_variant
+
+    def failing_fp32(name, *args):
+        if name == 'fp32':
+            raise RuntimeError('out of memory')
+        return evaluate(name, *args)
+
+    monkeypatch.setattr(optimizer, '_evaluate_variant', failing_fp32)
+    with pytest.raises(RuntimeError, match='FP32'):
+        optimizer.optimize(str(model_path), {'quantization': True, 'benchmark_runs': 3})
+    assert model_path.read_bytes() == original
@@ -0,0 +1,67 @@
+import socket
+
+import numpy as np
+import pytest
+
+from app.services.model_store import ModelArtifactStore, ModelArtifactError
+
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    """Fail any attempt to open a socket, like an air-gapped site."""
+    def refuse(*args, **kwargs):
+        raise OSError("network access disabled in test")
+
+    monkeypatch.setattr(socket, 'socket', refuse)
+    monkeypatch.setattr(socket, 'create_connection', refuse)
+
+
+def _tiny_model(path):
+    from onnx import helper, TensorProto
+
+    weight = helper.make_tensor('w', TensorProto.FLOAT, [1], [2.0])
+    node = helper.make_node('Mul', ['x', 'w'], ['y'])
+    graph = helper.make_graph(
+        [node], 'scale',
+        [helper.make_tensor_value_info('x', TensorProto.FLOAT, [1, 3])],
+        [helper.make_tensor_value_info('y', TensorProto.FLOAT, [1, 3])],
+        initializer=[weight]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return path
+
+
+def test_archive_round_trip_loads_offline(tmp_path, no_network):
+    source = ModelArtifactStore(tmp_path / 'connected')
+    source.import_file('scale', _tiny_model(tmp_path / 'scale.onnx'))
+    archive = source.export_archive(tmp_path / 'models.tar.gz')
+
+    store = ModelArtifactStore(tmp_path / 'site', allow_download=False)
+    assert store.import_archive(archive) == ['scale']
+
+    session = store.load_onnx('scale')
+    output = session.run(None, {'x': np.ones((1, 3), dtype=np.float32)})[0]
+    assert np.allclose(output, 2.0)
+
+
+def test_tampered_artifact_is_rejected(tmp_path):
+    store = ModelArtifactStore(tmp_path / 'store')
+    store.import_file('scale', _tiny_model(tmp_path / 'scale.onnx'))
+
+    with open(tmp_path / 'store' / 'scale' / 'scale.onnx', 'ab') as f:
+        f.write(b'\0')
+
+    with pytest.raises(ModelArtifactError):
+        ModelArtifactStore(tmp_path / 'store').verify('scale')
+
+
+def test_missing_artifact_never_downloads_when_disabled(tmp_path, no_network):
+    store = ModelArtifactStore(tmp_path / 'empty', allow_download=False)
+
+    with pytest.raises(ModelArtifactError):
+        store.ensure_yolov5('yolov5s')
@@ -0,0 +1,46 @@
+import numpy as np
+
+from app.services.pose_estimation import PoseEstimator
+
+
+class CountingPoseEstimator(PoseEstimator):
+    """Returns every keypoint at the centre of the crop."""
+
+    def __init__(self, **kwargs):
+        super().__init__(backend='onnx', crop_size=(64, 128), cache_frames=5, **kwargs)
+        self.crops = 0
+
+    def _infer(self, ctx, boxes):
+        self.crops += len(boxes)
+        keypoints = np.tile(np.array([[32.0, 64.0, 1.0]], dtype=np.float32), (self.NUM_KEYPOINTS, 1))
+        return [{'keypoints': keypoints, 'confidence': 0.9} for _ in boxes]
+
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+PERSON = {'id': 7, 'bbox': [100, 100, 200, 300]}
+
+
+def test_poses_are_cached_per_camera():
+    estimator = CountingPoseEstimator()
+    estimator.estimate(FRAME, [PERSON], 'north')
+    estimator.estimate(FRAME, [PERSON], 'north')
+    assert estimator.crops == 1
+
+    # Tracker id 7 on another camera is someone else
+    estimator.estimate(FRAME, [PERSON], 'south')
+    assert estimator.crops == 2
+    assert set(estimator.pose_cache) == {'north', 'south'}
+
+    # The cached pose follows the person's current box
+    moved = {'id': 7, 'bbox': [300, 100, 400, 300]}
+    pose = estimator.estimate(FRAME, [moved], 'north')[0]
+    assert estimator.crops == 2
+    assert np.allclose(pose['keypoints'][0, :2], [350, 200])
+
+
+def test_frames_without_a_camera_are_never_cached():
+    estimator = CountingPoseEstimator()
+    for _ in range(3):
+        assert len(estimator.estimate(FRAME, [PERSON])) == 1
+    assert estimator.crops == 3
+    assert estimator.pose_cache == {} and estimator.frame_index == {}
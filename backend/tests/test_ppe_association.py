@@ -0,0 +1,34 @@
+from app.services.specialized_processors import SafetyMonitorProcessor
+
+associate = SafetyMonitorProcessor._associate_ppe
+
+
+def _ppe(label, bbox):
+    return {'class': label, 'bbox': bbox, 'confidence': 0.9}
+
+
+def test_each_item_goes_to_the_person_containing_most_of_it():
+    # Two workers standing shoulder to shoulder; their boxes overlap by 40px
+    left, right = (100, 100, 200, 400), (160, 100, 260, 400)
+    ppe = [
+        _ppe('helmet', [110, 100, 170, 140]),  # wholly inside the left worker
+        _ppe('vest', [175, 180, 250, 300]),    # overlaps both, wholly inside the right
+        _ppe('gloves', [600, 600, 620, 620])   # nobody's
+    ]
+
+    assert associate([left, right], ppe) == [{'helmet'}, {'vest'}]
+
+
+def test_shared_item_is_credited_once():
+    # A helmet fully inside two nested boxes goes to the closer fitting person
+    crowd, worker = (0, 0, 400, 400), (150, 100, 250, 380)
+    helmet = _ppe('helmet', [170, 100, 230, 150])
+
+    owners = associate([crowd, worker], [helmet])
+    assert owners == [set(), {'helmet'}]
+    assert sum('helmet' in items for items in owners) == 1
+
+
+def test_items_barely_touching_a_person_are_ignored():
+    assert associate([(100, 100, 200, 400)], [_ppe('helmet', [180, 80, 260, 120])], min_containment=0.5) == [set()]
+    assert associate([], [_ppe('helmet', [0, 0, 10, 10])]) == []
@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import bson
+
+from app.services import realtime_processor
+from app.services.backpressure import StageQueue
+from app.services.message_bus import InProcessBus, TopicPartition
+from app.services.realtime_processor import PartitionHandover, RealtimeProcessor
+
+
+async def _iterate(docs):
+    for doc in docs:
+        yield doc
+
+
+class FakeCollection:
+    """In-memory collection that round trips documents through BSON like MongoDB."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def replace_one(self, query, document, upsert=False):
+        self.docs[query['_id']] = bson.encode(document)
+
+    def _matching(self, query):
+        partitions = query.get('partition', {}).get('$in')
+        for key, raw in list(self.docs.items()):
+            doc = bson.decode(raw)
+            if partitions is None or doc['partition'] in partitions:
+                yield key, doc
+
+    def find(self, query):
+        return _iterate([doc for _, doc in self._matching(query)])
+
+    async def delete_many(self, query):
+        for key, _ in list(self._matching(query)):
+            del self.docs[key]
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(0.01)  # a slow sink, so work is still queued at stop()
+        for document in documents:
+            self.docs[len(self.docs)] = bson.encode(document)
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def bulk_write(self, operations, ordered=True):
+        pass
+
+
+class FakeClient(dict):
+    def __missing__(self, name):
+        self[name] = FakeDatabase()
+        return self[name]
+
+    def close(self):
+        pass
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class FakeSocketServer:
+    def __init__(self, rooms):
+        self.manager = type('Manager', (), {'rooms': {'/': {room: {'sid': 'eio'} for room in rooms}}})()
+        self.sent = []
+
+    async def emit(self, event, data, room=None, namespace=None):
+        await asyncio.sleep(0.001)
+        self.sent.append((event, data['camera_id']))
+
+
+def _processor(window_state, baselines):
+    processor = RealtimeProcessor()
+    processor.window_state = window_state
+    processor.anomalies.collection = baselines
+    processor.loop = asyncio.get_running_loop()
+    processor.queues = {'ingest': StageQueue('test:handover-ingest', 10)}
+    return processor
+
+
+def _analytics(speed):
+    return {'object_count': 1, 'average_speed': speed, 'direction_histogram': {'north': 1}}
+
+
+def test_camera_moves_mid_window_and_closes_once_with_combined_counts():
+    async def run():
+        window_state, baselines = FakeCollection(), FakeCollection()
+        partition = TopicPartition('analytics', 3)
+
+        first = _processor(window_state, baselines)
+        first.camera_partitions[('analytics', '7')] = 3
+        closed = []
+        for t in range(30):
+            closed += first.windows.add(7, 1_700_000_040 + t, _analytics(2.0))
+            first.rollups.add(7, 1_700_000_040 + t, _analytics(2.0))
+            first.anomalies.score(7, 1_700_000_040 + t, _analytics(2.0))
+        # Revocation arrives on the consumer thread
+        await asyncio.to_thread(PartitionHandover(first).on_partitions_revoked, [partition])
+
+        second = _processor(window_state, baselines)
+        await asyncio.to_thread(PartitionHandover(second).on_partitions_assigned, [partition])
+        restored = {
+            'windows': second.windows.keys(),
+            'rollups': second.rollups.windows.keys(),
+            'baseline': second.anomalies.baseline(7, 'average_speed', 1_700_000_040)['count'],
+            'saved_left': len(window_state.docs),
+            'mean_accumulators': {type(pane['average_speed']) for pane in second.windows.panes['7'].values()}
+        }
+        for t in range(30, 60):
+            closed += second.windows.add(7, 1_700_000_040 + t, _analytics(4.0))
+        closed += second.windows.add(7, 1_700_000_040 + 70, _analytics(4.0))
+        return first, closed, restored
+
+    first, closed, restored = asyncio.run(run())
+    assert first.windows.keys() == [] and first.anomalies.baselines == {}
+    assert restored == {'windows': ['7'], 'rollups': ['7'], 'baseline': 30, 'saved_left': 0,
+                        'mean_accumulators': {tuple}}
+
+    assert len(closed) == 1
+    window = closed[0]
+    assert (window['window_start'], window['window_end']) == (1_700_000_040, 1_700_000_100)
+    assert window['count'] == 60 and window['total_objects'] == 60
+    # Mean accumulators come back from BSON as lists and keep combining
+    assert window['average_speed'] == 3.0
+    assert window['direction_histogram'] == {'north': 60}
+
+
+def test_stop_delivers_every_consumed_message_and_leaves_no_tasks(monkeypatch):
+    bus = InProcessBus(maxsize=1000)
+    monkeypatch.setattr(realtime_processor, 'message_bus', bus)
+    monkeypatch.setattr(realtime_processor, 'AsyncIOMotorClient', lambda url: FakeClient())
+    messages = 100
+
+    async def run():
+        processor = RealtimeProcessor()
+        sio = FakeSocketServer(rooms=('camera_1', 'camera_2'))
+        processor.emitter.sio = sio
+        processor.emitter.default_rate = 0  # unthrottled, so every update is sent
+
+        now = time.time()
+        for i in range(messages):
+            camera_id = 1 + i % 2
+            bus.publish('detections', {'camera_id': camera_id, 'timestamp': now, 'detections': []}, key=camera_id)
+            bus.publish('analytics', {'camera_id': camera_id, 'timestamp': now,
+                                      'analytics': {'object_count': 1}}, key=camera_id)
+
+        await processor.start()
+        deadline = time.monotonic() + 10
+        while processor.metrics['received'] < 2 * messages and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        queued = sum(q.qsize() for q in processor.queues.values())
+        await processor.stop()
+
+        leftover = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return processor, sio, queued, leftover
+
+    processor, sio, queued, leftover = asyncio.run(run())
+    db = processor.db
+    stats = processor.get_stats()
+
+    assert queued > 0  # stop() had work left to drain
+    assert stats['received'] == 2 * messages and stats['failed'] == 0
+    assert stats['emitted'] == stats['stored'] == 2 * messages
+    assert sorted(event for event, _ in sio.sent) == ['analytics_update'] * messages + ['detection_update'] * messages
+    assert len(db['detections'].docs) == len(db['analytics'].docs) == messages
+    assert all(q.qsize() == 0 for q in processor.queues.values())
+    assert processor.tasks == [] and leftover == []
+    assert processor.running is False and not processor.consumer_thread.is_alive()
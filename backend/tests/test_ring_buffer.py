@@ -0,0 +1,43 @@
+import numpy as np
+
+from app.services.ring_buffer import RingBuffer
+
+
+def _filled(capacity, count, keep_payload=False):
+    buffer = RingBuffer(('timestamp', 'object_count'), capacity, keep_payload=keep_payload)
+    for i in range(count):
+        buffer.append((float(i), float(i * 2)), payload={'i': i})
+    return buffer
+
+
+def test_wraps_and_keeps_newest_rows_in_order():
+    buffer = _filled(capacity=5, count=12)
+
+    assert len(buffer) == 5
+    assert buffer.column('timestamp').tolist() == [7, 8, 9, 10, 11]
+    assert buffer.latest(2)[:, 1].tolist() == [20, 22]
+    assert buffer.nbytes == 5 * 2 * 8
+
+
+def test_window_queries_on_partially_filled_buffer():
+    buffer = _filled(capacity=10, count=4)
+
+    assert buffer.window(start=1, end=3)[:, 0].tolist() == [1, 2]
+    summary = buffer.summary(start=2)
+    assert summary['count'] == 2
+    assert summary['object_count']['sum'] == 10
+    assert buffer.summary(start=100) == {'count': 0}
+
+
+def test_payloads_follow_their_rows_across_wraparound():
+    buffer = _filled(capacity=4, count=6, keep_payload=True)
+
+    assert buffer.window_payloads(start=3) == [{'i': 3}, {'i': 4}, {'i': 5}]
+    assert _filled(capacity=4, count=6).window_payloads() == []
+
+
+def test_append_record_fills_missing_fields_with_zero():
+    buffer = RingBuffer(('timestamp', 'speed', 'count'), 3)
+    buffer.append_record({'timestamp': 1.0, 'count': 4})
+
+    assert np.array_equal(buffer.rows(), [[1.0, 0.0, 4.0]])
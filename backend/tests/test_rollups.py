@@ -0,0 +1,69 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services import rollups as rollups_module
+from app.services.rollups import RollupStore, get_query_store
+
+
+class FakeCollection:
+    def __init__(self):
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        assert ordered is False
+        self.operations.extend(operations)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def test_closed_minutes_upsert_minute_hour_and_day_buckets():
+    db = FakeDatabase()
+    rollups = RollupStore(db)
+    start = 1_700_000_040  # 22:14:00 UTC
+    minutes = []
+    for second in range(0, 120, 10):
+        minutes += rollups.add('cam', start + second, {'object_count': 2, 'average_speed': second % 20,
+                                                      'direction_histogram': {'north': 1, 'up': 1}})
+    # Camera went quiet: five minutes of processing time later
+    minutes += rollups.advance(time.monotonic() + 300)
+    asyncio.run(rollups.write_minutes(minutes))
+
+    assert len(minutes) == 2
+    hour = [op._doc for op in db['rollup_hour'].operations if op._filter['metric'] == 'object_count']
+    assert hour == [{'$inc': {'count': 6, 'sum': 12.0}, '$min': {'min': 2.0}, '$max': {'max': 2.0}}] * 2
+    assert db['rollup_hour'].operations[0]._filter['bucket'] == datetime(2023, 11, 14, 22, tzinfo=timezone.utc)
+
+    histogram = [op._doc for op in db['rollup_day'].operations if op._filter['metric'] == 'direction_histogram']
+    assert histogram[0] == {'$inc': {'count': 6, 'bins.north': 6.0, 'bins.other': 6.0}}
+
+
+def test_query_granularity_fits_points_and_retention():
+    rollups = RollupStore(FakeDatabase())
+    now = datetime(2024, 1, 31, tzinfo=timezone.utc)
+
+    assert rollups.choose_granularity(now - timedelta(hours=6), now, now=now) == 'minute'
+    assert rollups.choose_granularity(now - timedelta(days=30), now, now=now) == 'hour'
+    assert rollups.choose_granularity(now - timedelta(days=365), now, now=now) == 'day'
+    # Minute buckets older than their TTL are gone, even for a short range
+    old = now - timedelta(days=30)
+    assert rollups.choose_granularity(old, old + timedelta(hours=1), now=now) == 'hour'
+
+
+def test_trend_queries_share_one_store_on_the_api_database(monkeypatch):
+    clients = []
+
+    def client(url):
+        clients.append(url)
+        return {'visioncave': FakeDatabase()}
+
+    monkeypatch.setattr(rollups_module, 'AsyncIOMotorClient', client)
+    monkeypatch.setattr(rollups_module, '_query_store', None)
+
+    store = get_query_store()
+    assert get_query_store() is store and len(clients) == 1
+    assert isinstance(store.collections['hour'], FakeCollection)
@@ -0,0 +1,57 @@
+import os
+import sys
+import types
+
+import cv2
+import pytest
+
+from app.core import runtime
+
+
+@pytest.fixture
+def node(monkeypatch):
+    """An 8 core node with the layout, env vars and OpenCV threads restorable."""
+    monkeypatch.setattr(runtime, '_layout', None)
+    monkeypatch.setattr(runtime, '_configured_frameworks', set())
+    monkeypatch.setattr(runtime, 'available_cores', lambda: list(range(8)))
+    for name in runtime.THREAD_ENV_VARS + ('TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS'):
+        monkeypatch.setenv(name, 'unset')
+    applied = {}
+    monkeypatch.setattr(cv2, 'setNumThreads', lambda n: applied.__setitem__('opencv', n))
+    monkeypatch.setattr(os, 'sched_setaffinity', lambda pid, cores: applied.__setitem__('affinity', list(cores)),
+                        raising=False)
+    return applied
+
+
+def test_workers_get_disjoint_core_slices_and_matching_threads(node):
+    layout = runtime.configure_runtime(workers=4, worker_index=2, affinity=True)
+
+    assert layout['cores'] == [4, 5] and layout['intra_op_threads'] == 2
+    assert [os.environ[name] for name in runtime.THREAD_ENV_VARS] == ['2', '2', '2']
+    assert (os.environ['TF_NUM_INTRAOP_THREADS'], os.environ['TF_NUM_INTEROP_THREADS']) == ('2', '1')
+    assert node == {'opencv': 1, 'affinity': [4, 5]}
+    # Later calls keep the layout the process started with
+    assert runtime.configure_runtime(workers=1) is layout
+    assert runtime.get_runtime_layout() is layout
+
+
+def test_forced_layout_is_applied_to_already_imported_frameworks(node, monkeypatch):
+    calls = []
+    torch = types.ModuleType('torch')
+    torch.set_num_threads = lambda n: calls.append(('intra', n))
+    torch.set_num_interop_threads = lambda n: calls.append(('inter', n))
+    monkeypatch.setitem(sys.modules, 'torch', torch)
+
+    runtime.configure_runtime(workers=2, worker_index=0)
+    layout = runtime.configure_runtime(workers=1, threads=3, affinity=False, force=True)
+
+    assert layout['cores'] == list(range(8)) and layout['intra_op_threads'] == 3
+    assert os.environ['OMP_NUM_THREADS'] == '3' and 'affinity' not in node
+    assert calls == [('intra', 4), ('inter', 1), ('intra', 3), ('inter', 1)]
+
+
+def test_onnx_sessions_use_the_layout_threads(node):
+    runtime.configure_runtime(workers=2, worker_index=1)
+    options = runtime.ort_session_options()
+    assert (options.intra_op_num_threads, options.inter_op_num_threads) == (4, 1)
+    assert runtime.ort_session_options(threads=1).intra_op_num_threads == 1
@@ -0,0 +1,20 @@
+import asyncio
+
+from app.services.emit_scheduler import EmitScheduler
+from app.services.socketio_server import create_socketio_server
+
+
+def test_subscribe_joins_camera_room_for_realtime_emits():
+    async def run():
+        server = create_socketio_server()
+        scheduler = EmitScheduler(server)
+        sid = await server.manager.connect('eio-1', '/')
+
+        await server._trigger_event('subscribe', '/', sid, {'camera_id': 7})
+        joined = scheduler.has_subscribers('camera_7'), scheduler.has_subscribers('camera_8')
+        await server._trigger_event('unsubscribe', '/', sid, {'camera_id': 7})
+        return joined, scheduler.has_subscribers('camera_7')
+
+    joined, after_leave = asyncio.run(run())
+    assert joined == (True, False)
+    assert after_leave is False
@@ -0,0 +1,106 @@
+from app.services.window_aggregation import WindowAggregator
+
+FIELDS = {
+    'total': ('count', 'sum'),
+    'peak': ('count', 'max'),
+    'speed': ('speed', 'mean'),
+    'directions': ('directions', 'histogram'),
+}
+
+
+def test_tumbling_windows_close_once_when_watermark_passes():
+    windows = WindowAggregator(size=10, fields=FIELDS)
+
+    assert windows.add('cam', 1, {'count': 2, 'speed': 1.0, 'directions': {'north': 1}}) == []
+    assert windows.add('cam', 9, {'count': 4, 'speed': 3.0, 'directions': {'north': 1, 'south': 2}}) == []
+    closed = windows.add('cam', 12, {'count': 1, 'speed': 5.0})
+
+    assert len(closed) == 1
+    window = closed[0]
+    assert (window['window_start'], window['window_end'], window['count']) == (0, 10, 2)
+    assert window['total'] == 6 and window['peak'] == 4 and window['speed'] == 2.0
+    assert window['directions'] == {'north': 2, 'south': 2}
+
+    # Replaying the watermark never closes the same window again
+    assert windows.advance('cam', 15) == []
+    assert windows.advance_all(15) == []
+
+
+def test_sliding_windows_share_panes():
+    windows = WindowAggregator(size=10, slide=5, fields=FIELDS)
+    for t in (1, 6, 11):
+        windows.add('cam', t, {'count': 1})
+
+    closed = windows.advance('cam', 20)
+    assert [(w['window_start'], w['window_end'], w['total']) for w in closed] == [
+        (5, 15, 2), (10, 20, 1)
+    ]
+    assert windows.metrics['windows_closed'] == 4  # [-5, 5) and [0, 10) closed on arrival
+    assert windows.get_stats()['open_panes'] == 0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_quiet_cameras_flush_once_and_late_events_are_dropped():
+    clock = FakeClock()
+    windows = WindowAggregator(size=10, fields=FIELDS, allowed_lateness=2, idle_timeout=6, clock=clock)
+    windows.add('quiet', 3, {'count': 1})
+    windows.add('busy', 3, {'count': 1})
+
+    clock.now += 4
+    windows.add('busy', 7, {'count': 1})
+    assert windows.advance_all() == []
+
+    # 'quiet' idle for 9s: its event time is taken to be 3 + 9 = 12, watermark 10
+    clock.now += 5
+    assert [w['key'] for w in windows.advance_all()] == ['quiet']
+    clock.now += 10
+    assert [(w['key'], w['count']) for w in windows.advance_all()] == [('busy', 2)]
+    assert windows.advance_all() == []
+
+    assert windows.add('quiet', 8, {'count': 1}) == []
+    assert windows.metrics['late_events'] == 1
+    clock.now += 100
+    assert windows.advance_all() == []
+
+
+def test_lagging_active_camera_keeps_every_event():
+    clock = FakeClock()
+    windows = WindowAggregator(size=60, fields=FIELDS, allowed_lateness=5, idle_timeout=10, clock=clock)
+    lag = 10.0
+    closed = []
+    # One event per second, each delivered `lag` seconds after it happened
+    for second in range(180):
+        clock.now = 1000.0 + second + lag
+        closed += windows.add('cam', 1000.0 + second, {'count': 1})
+        closed += windows.advance_all()
+
+    # [960, 1020) only saw events from t=1000; later windows are complete
+    assert [w['total'] for w in closed] == [20, 60, 60]
+    assert windows.metrics['late_events'] == 0
+
+    clock.now += 30
+    closed = windows.advance_all()
+    assert [w['total'] for w in closed] == [40]
+    assert windows.metrics['late_events'] == 0
+
+
+def test_state_handover_resumes_open_windows():
+    source = WindowAggregator(size=10, fields=FIELDS)
+    source.add('cam', 1, {'count': 3})
+    source.add('cam', 12, {'count': 1})
+
+    target = WindowAggregator(size=10, fields=FIELDS)
+    target.restore('cam', source.remove('cam'))
+    target.add('cam', 15, {'count': 2})
+
+    assert source.keys() == []
+    assert [w['total'] for w in target.advance('cam', 20)] == [3]
+    assert target.add('cam', 5, {'count': 9}) == []
+    assert target.metrics['late_events'] == 1
@@ -0,0 +1,91 @@
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from app.services.write_batcher import MongoWriteBatcher
+
+
+class FakeResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class FakeCollection:
+    name = 'detections'
+
+    def __init__(self, delay=0.0, fail_indexes=()):
+        self.delay = delay
+        self.fail_indexes = set(fail_indexes)
+        self.batches = []
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        await asyncio.sleep(self.delay)
+        self.batches.append(list(documents))
+        if self.fail_indexes:
+            errors = [{'index': i} for i in sorted(self.fail_indexes)]
+            raise BulkWriteError({'writeErrors': errors,
+                                  'nInserted': len(documents) - len(errors)})
+        return FakeResult(list(range(len(documents))))
+
+
+def test_flushes_full_batches_and_remainder_on_stop():
+    async def run():
+        collection = FakeCollection()
+        batcher = MongoWriteBatcher(collection, max_batch=10, max_delay=60, max_pending=100)
+        batcher.start()
+        for i in range(25):
+            await batcher.add({'i': i})
+        await asyncio.sleep(0.01)
+        sizes_before_stop = [len(b) for b in collection.batches]
+        await batcher.stop()
+        return collection, batcher, sizes_before_stop
+
+    collection, batcher, sizes_before_stop = asyncio.run(run())
+    assert sizes_before_stop == [10, 10]
+    assert [len(b) for b in collection.batches] == [10, 10, 5]
+    assert batcher.get_stats()['written'] == 25
+
+
+def test_time_threshold_flushes_partial_batch():
+    async def run():
+        collection = FakeCollection()
+        batcher = MongoWriteBatcher(collection, max_batch=100, max_delay=0.05, max_pending=100)
+        batcher.start()
+        await batcher.add({'i': 0})
+        await asyncio.sleep(0.2)
+        flushed = len(collection.batches)
+        await batcher.stop()
+        return flushed
+
+    assert asyncio.run(run()) == 1
+
+
+def test_producers_wait_when_pending_limit_reached():
+    async def run():
+        collection = FakeCollection(delay=0.05)
+        batcher = MongoWriteBatcher(collection, max_batch=5, max_delay=60, max_pending=10)
+        batcher.start()
+        await asyncio.gather(*(batcher.add({'i': i}) for i in range(40)))
+        await batcher.stop()
+        return batcher.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats['written'] == 40
+    assert stats['backpressure_waits'] > 0
+    assert stats['avg_batch_size'] == 5
+    assert stats['flush_latency_ms']['p50'] >= 40
+
+
+def test_partial_bulk_failure_counts_only_failed_documents():
+    async def run():
+        batcher = MongoWriteBatcher(FakeCollection(fail_indexes=[1]), max_batch=4)
+        batcher.start()
+        for i in range(4):
+            await batcher.add({'i': i})
+        await batcher.stop()
+        return batcher.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats['written'] == 3
+    assert stats['failed'] == 1
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+from app.services.zone_index import ZoneIndex, ZoneIndexRegistry
+
+
+def _reference_membership(points, polygons):
+    return np.array([
+        [cv2.pointPolygonTest(np.array(polygon, dtype=np.float32), (float(x), float(y)), True) >= 0
+         for polygon in polygons]
+        for x, y in points
+    ])
+
+
+def _random_zones(rng, count):
+    zones = []
+    for _ in range(count):
+        cx, cy = rng.uniform(100, 1800), rng.uniform(100, 980)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 6))
+        radius = rng.uniform(40, 200, 6)
+        zones.append(np.stack([cx + radius * np.cos(angles), cy + radius * np.sin(angles)], axis=1).round().tolist())
+    return zones
+
+
+def test_membership_matches_polygon_test_away_from_edges():
+    rng = np.random.default_rng(0)
+    zones = _random_zones(rng, 60)
+    points = rng.uniform(0, [1920, 1080], (500, 2))
+
+    expected = _reference_membership(points, zones)
+    actual = ZoneIndex(zones, max_side=1920).membership(points)
+
+    # Points within a pixel of a zone edge may legitimately round either way
+    distances = np.array([
+        [abs(cv2.pointPolygonTest(np.array(z, dtype=np.float32), (float(x), float(y)), True)) for z in zones]
+        for x, y in points
+    ])
+    clear = distances > 1.5
+    assert np.array_equal(actual[clear], expected[clear])
+
+
+def test_overlapping_zones_and_points_outside():
+    zones = [
+        [[0, 0], [100, 0], [100, 100], [0, 100]],
+        [[50, 50], [150, 50], [150, 150], [50, 150]],
+    ]
+    index = ZoneIndex(zones)
+    points = np.array([[25, 25], [75, 75], [125, 125], [500, 500], [-10, 20]])
+
+    assert index.membership(points).tolist() == [
+        [True, False], [True, True], [False, True], [False, False], [False, False]
+    ]
+    assert index.first_zone(points).tolist() == [0, 0, 1, -1, -1]
+    assert index.counts(points).tolist() == [2, 2]
+
+
+def test_registry_rebuilds_only_when_zones_change():
+    registry = ZoneIndexRegistry()
+    zones = [[[0, 0], [10, 0], [10, 10], [0, 10]]]
+
+    first = registry.get(zones, key='cam_1')
+    assert registry.get([list(map(list, z)) for z in zones], key='cam_1') is first
+
+    moved = [[[20, 20], [30, 20], [30, 30], [20, 30]]]
+    rebuilt = registry.get(moved, key='cam_1')
+    assert rebuilt is not first
+    assert rebuilt.first_zone(np.array([[25, 25]])).tolist() == [0]